@@ -34,10 +34,13 @@ class NowPlayingView(discord.ui.View):
                             content="You don't have the correct permissions to use this command!  Please refer to /help for more information.", ephemeral=True)
             return
 
-        self.player.queue.add_at(self.player.song, 0)
-        self.player.vc.stop()
+        # Seeking can repopulate the Song and wait on ffmpeg, longer than an interaction can go unanswered
+        await interaction.response.defer(thinking=True)
+        if not await self.player.seek(0):
+            await interaction.followup.send(embed=Utils.get_embed(interaction, title='Nothing to seek in!', content="The song hasn't started yet."), ephemeral=True)
+            return
         self.player.last_np_message = await self.player.last_np_message.edit(embed=Utils.get_now_playing_embed(self.player), view=self)
-        await interaction.response.send_message(embed=Utils.get_embed(interaction, title="⏪ Rewound"))
+        await interaction.followup.send(embed=Utils.get_embed(interaction, title="⏪ Rewound"))
     
     async def pause_play_button(self, interaction: discord.Interaction) -> None:
         if not await Utils.Pretests.playing_audio(interaction):
@@ -221,7 +224,8 @@ class GuildSettingsSelect(discord.ui.Select):
             GuildSettingsSelect.__create_select_option(interaction, label='Verbose Control Buttons', value='verbose_np', description='Adds verbose text to the control buttons.'),
             GuildSettingsSelect.__create_select_option(interaction, label='Remove Orphaned Songs', value='remove_orphaned_songs', description='Removes all the songs a user queued when they leave.'),
             GuildSettingsSelect.__create_select_option(interaction, label='Allow Playlist', value='allow_playlist', description='Whether the bot should allow users to queue playlists.'),
-            GuildSettingsSelect.__create_select_option(interaction, label='Leave Song Breadcrumbs', value='song_breadcrumbs', description='Whether the bot should leave breadcrumbs to songs.')
+            GuildSettingsSelect.__create_select_option(interaction, label='Leave Song Breadcrumbs', value='song_breadcrumbs', description='Whether the bot should leave breadcrumbs to songs.'),
+            GuildSettingsSelect.__create_select_option(interaction, label='Crossfade', value='crossfade', description='How many seconds songs fade into each other for.', emojis=['❎', '✅'])
         ]
         super().__init__(placeholder='Select a setting to edit.', options=options, row=1)
 
@@ -250,6 +254,9 @@ class GuildSettingsSelect(discord.ui.Select):
             case 'song_breadcrumbs':
                 self.placeholder = 'Leave Song Breadcrumbs'
                 self.view.add_item(ToggleButton(current_state, value))
+            case 'crossfade':
+                self.placeholder = 'Crossfade'
+                self.view.add_item(CycleButton(current_state, value, [0, 2, 4, 6, 8]))
             case default:
                 raise NotImplementedError(f"We is boned... returned '{default}' in GuildSettingsView selection")
 
@@ -257,7 +264,8 @@ class GuildSettingsSelect(discord.ui.Select):
 
     @staticmethod
     def __create_select_option(interaction: discord.Interaction, label: str, value: str, description: str, emojis: list[str] = ['❎', '✅', '💽']) -> discord.SelectOption:
-        emoji = emojis[DB.GuildSettings.get(interaction.guild_id, value)]
+        # Settings with more values than emojis use the last emoji for all of the rest
+        emoji = emojis[min(DB.GuildSettings.get(interaction.guild_id, value), len(emojis) - 1)]
         return discord.SelectOption(label=label, value=value, description=description, emoji=emoji)
 
 class ToggleButton(discord.ui.Button):
@@ -285,6 +293,7 @@ class ToggleButton(discord.ui.Button):
         embed.add_field(name='Remove Orphaned Songs', value=f"Whether the bot should remove all the songs a user queued when they leave the VC. The current value is: `{bool(DB.GuildSettings.get(interaction.guild_id, 'remove_orphaned_songs'))}`")
         embed.add_field(name='Allow Playlist', value=f"Whether the bot should allow users to queue playlists. The current value is: `{('No', 'Yes', 'DJ Only')[DB.GuildSettings.get(interaction.guild_id, 'allow_playlist')]}`")
         embed.add_field(name='Leave Song Breadcrumbs', value=f"Whether the bot should leave breadcrumbs to previously played songs to be able trace back the queue. The current value is: `{bool(DB.GuildSettings.get(interaction.guild_id, 'song_breadcrumbs'))}`")
+        embed.add_field(name='Crossfade', value=f"How many seconds songs fade into each other for. The current value is: `{DB.GuildSettings.get(interaction.guild_id, 'crossfade') or 'Off'}`")
 
         # Update Select by clearing the View
         self.view.clear_items().add_item(GuildSettingsSelect(interaction))
@@ -309,6 +318,23 @@ class TripleButton(ToggleButton):
 
         await super().update(interaction)
 
+class CycleButton(ToggleButton):
+    def __init__(self, state: int, value: str, choices: list[int]):
+        self.choices = choices
+        super().__init__(False, value, [f'{choice}s' if choice else 'Off' for choice in choices])
+        self.state = state
+        self.style = discord.ButtonStyle.green if state else discord.ButtonStyle.red
+        self.label = f'{state}s' if state else 'Off'
+
+    async def callback(self, interaction: discord.Interaction):
+        # Values that aren't a choice anymore start the cycle over
+        index = self.choices.index(self.state) + 1 if self.state in self.choices else 0
+        self.state = self.choices[index % len(self.choices)]
+        self.style = discord.ButtonStyle.green if self.state else discord.ButtonStyle.red
+        self.label = f'{self.state}s' if self.state else 'Off'
+
+        await super().update(interaction)
+
 
 class HelpView(discord.ui.View):
     def __init__(self) -> None:
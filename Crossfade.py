@@ -0,0 +1,121 @@
+import discord
+import numpy as np
+
+
+class CrossfadeAudio(discord.AudioSource):
+    """
+    The AudioSource a Player plays through while one Song fades into the next.
+
+    Every 20ms frame of the outgoing and incoming sources is blended with equal-power gain ramps
+    (the outgoing one follows a cosine, the incoming one a sine) so the loudness stays level through the fade.
+    The ramps and the sum are numpy operations on whole frames written into buffers allocated once,
+    so a fade costs the same handful of small arrays however long it is.
+
+    Once the fade is over it passes the incoming source's frames through, so discord.py's player keeps going
+    while the Player moves on to the incoming Song and hands it that source directly, on_faded tells it when.
+    Both sources belong to the Player, the CrossfadeAudio never cleans them up.
+
+    ...
+
+    Attributes
+    ----------
+    outgoing : `discord.AudioSource`
+        The source fading out.
+    incoming : `discord.AudioSource`
+        The source fading in.
+    frames : `int`
+        How many frames the fade lasts.
+    index : `int`
+        How many frames have been blended.
+    on_faded : `Callable[[], None]` | `None`
+        Runs in the voice thread once the last frame of the fade has been blended.
+
+    Methods
+    -------
+    is_faded():
+        Whether the fade is over and the incoming source is being passed through.
+    """
+    SAMPLES_PER_FRAME = discord.opus.Encoder.SAMPLES_PER_FRAME
+    CHANNELS = discord.opus.Encoder.CHANNELS
+    # The sample offsets within a frame, shared by every fade
+    __OFFSETS = np.arange(SAMPLES_PER_FRAME, dtype=np.float32)
+
+    def __init__(self, outgoing: discord.AudioSource, incoming: discord.AudioSource, frames: int) -> None:
+        """
+        Creates a CrossfadeAudio object.
+
+        Parameters
+        ----------
+        outgoing : `discord.AudioSource`
+            The 16-bit stereo PCM source to fade out.
+        incoming : `discord.AudioSource`
+            The 16-bit stereo PCM source to fade in.
+        frames : `int`
+            How many 20ms frames the fade lasts.
+        """
+        self.outgoing = outgoing
+        self.incoming = incoming
+        self.frames = max(frames, 1)
+        self.index = 0
+        self.on_faded = None
+        # Radians per sample, a quarter turn over the whole fade
+        self.__step = np.float32(np.pi / 2 / (self.frames * CrossfadeAudio.SAMPLES_PER_FRAME))
+        self.__angle = np.empty(CrossfadeAudio.SAMPLES_PER_FRAME, dtype=np.float32)
+        self.__gain = np.empty((CrossfadeAudio.SAMPLES_PER_FRAME, 1), dtype=np.float32)
+        self.__mix = np.empty((CrossfadeAudio.SAMPLES_PER_FRAME, CrossfadeAudio.CHANNELS), dtype=np.float32)
+        self.__layer = np.empty((CrossfadeAudio.SAMPLES_PER_FRAME, CrossfadeAudio.CHANNELS), dtype=np.float32)
+
+    def read(self) -> bytes:
+        if self.index >= self.frames:
+            return self.incoming.read()
+        outgoing = self.outgoing.read()
+        incoming = self.incoming.read()
+        if not outgoing and not incoming:
+            return b''
+
+        # The angle of every sample in this frame, from 0 at the start of the fade to pi/2 at its end
+        np.add(self.__OFFSETS, self.index * CrossfadeAudio.SAMPLES_PER_FRAME, out=self.__angle)
+        np.multiply(self.__angle, self.__step, out=self.__angle)
+        self.index += 1
+
+        # Either Song may end before the fade does, it's silence after it ends
+        if outgoing:
+            np.cos(self.__angle, out=self.__gain[:, 0])
+            np.multiply(self.__frame(outgoing), self.__gain, out=self.__mix)
+        else:
+            self.__mix.fill(0)
+        if incoming:
+            np.sin(self.__angle, out=self.__gain[:, 0])
+            np.multiply(self.__frame(incoming), self.__gain, out=self.__layer)
+            np.add(self.__mix, self.__layer, out=self.__mix)
+        # Equal-power ramps can add up past full scale on loud, similar material
+        np.clip(self.__mix, -32768, 32767, out=self.__mix)
+        if self.index == self.frames and self.on_faded is not None:
+            on_faded, self.on_faded = self.on_faded, None
+            on_faded()
+        return self.__mix.astype(np.int16).tobytes()
+
+    def is_faded(self) -> bool:
+        """
+        Whether the fade is over and the incoming source is being passed through.
+
+        Returns
+        -------
+        bool
+            True once every frame of the fade has been blended.
+        """
+        return self.index >= self.frames
+
+    def is_opus(self) -> bool:
+        return False
+
+    def cleanup(self) -> None:
+        # The Player cleans the outgoing source once the Song is over and plays the incoming one next,
+        # a seek drops the fade and carries on with the outgoing one
+        pass
+
+    def __frame(self, data: bytes) -> np.ndarray:
+        """
+        Views a frame of interleaved 16-bit PCM as a samples by channels array, without copying it.
+        """
+        return np.frombuffer(data, dtype=np.int16).reshape(-1, CrossfadeAudio.CHANNELS)
@@ -3,6 +3,8 @@ from datetime import datetime
 
 from discord.utils import SequenceProxy
 from discord import Guild
+
+from Metrics import Metrics
 class DB:
     """
     A static class containing subclasses for accessing and mutating columns in various SQL tables.
@@ -35,7 +37,8 @@ class DB:
                         np_sent_to_vc BOOLEAN DEFAULT '1',
                         verbose_np BOOLEAN DEFAULT '1',
                         remove_orphaned_songs BOOLEAN DEFAULT '0',
-                        song_breadcrumbs BOOLEAN DEFAULT '1'
+                        song_breadcrumbs BOOLEAN DEFAULT '1',
+                        crossfade INTEGER DEFAULT '0'
                     )
             """)
 
@@ -44,7 +47,7 @@ class DB:
             pass
 
     def fix_column_values() -> None:
-        columns = [['np_sent_to_vc',"1"], ['verbose_np', "1"], ['remove_orphaned_songs',"0"], ['allow_playlist',"1"], ['song_breadcrumbs', "1"]]
+        columns = [['np_sent_to_vc',"1"], ['verbose_np', "1"], ['remove_orphaned_songs',"0"], ['allow_playlist',"1"], ['song_breadcrumbs', "1"], ['crossfade', "0"]]
         for i in columns:
             try:
                 DB._cursor.execute(f"ALTER TABLE GuildSettings ADD COLUMN {i[0]} BOOLEAN DEFAULT '{i[1]}'")
@@ -76,12 +79,14 @@ class DB:
             Sets a requested column from a guild by ID
         """
         def create_new_guild(guild_id: int) -> None:
-            DB._cursor.execute(f"INSERT OR IGNORE INTO GuildSettings (guild_id) VALUES ({guild_id})")
-            DB._settings_db.commit()
+            with Metrics.db_seconds.time('create_guild'):
+                DB._cursor.execute(f"INSERT OR IGNORE INTO GuildSettings (guild_id) VALUES ({guild_id})")
+                DB._settings_db.commit()
 
         def remove_guild(guild_id: int) -> None:
-            DB._cursor.execute(f"DELETE FROM GuildSettings WHERE guild_id = {guild_id}")
-            DB._settings_db.commit()
+            with Metrics.db_seconds.time('remove_guild'):
+                DB._cursor.execute(f"DELETE FROM GuildSettings WHERE guild_id = {guild_id}")
+                DB._settings_db.commit()
 
         def __setting_check(setting: str) -> str:
             """
@@ -115,6 +120,8 @@ class DB:
                     return setting
                 case 'song_breadcrumbs':
                     return setting
+                case 'crossfade':
+                    return setting
                 case default:
                     raise ValueError(f'Invalid setting value supplied ({default})')
 
@@ -143,9 +150,12 @@ class DB:
                     > allow_playlist
 
                     > song_breadcrumbs
+
+                    > crossfade
             """
-            DB._cursor.execute(f"SELECT {DB.GuildSettings.__setting_check(setting)} FROM GuildSettings WHERE guild_id = ?", (guild_id,))
-            return DB._cursor.fetchone()[0]
+            with Metrics.db_seconds.time('get'):
+                DB._cursor.execute(f"SELECT {DB.GuildSettings.__setting_check(setting)} FROM GuildSettings WHERE guild_id = ?", (guild_id,))
+                return DB._cursor.fetchone()[0]
         
         def set(guild_id: int, setting: str, value: str | bool | int) -> None:
             """
@@ -169,9 +179,12 @@ class DB:
                     > remove_orphaned_songs
 
                     > song_breadcrumbs
+
+                    > crossfade
             value : `str` | `bool` | `int`
                 The value to update the field with.
             """
-            DB._cursor.execute(f"UPDATE GuildSettings SET {DB.GuildSettings.__setting_check(setting)} = ? WHERE guild_id = ?", (value, guild_id))
-            DB._settings_db.commit()
+            with Metrics.db_seconds.time('set'):
+                DB._cursor.execute(f"UPDATE GuildSettings SET {DB.GuildSettings.__setting_check(setting)} = ? WHERE guild_id = ?", (value, guild_id))
+                DB._settings_db.commit()
             return
\ No newline at end of file
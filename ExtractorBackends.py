@@ -0,0 +1,331 @@
+import abc
+import asyncio
+import copy
+import functools
+import hashlib
+import json
+import os
+import random
+
+
+# Generic replay error class
+class ReplayError(Exception):
+    """
+    Raised by a ReplayBackend when it is missing a fixture or injects an error.
+
+    YTDLInterface.is_dlp_error treats it as one of yt-dlp's errors, so replays fail the way live extractions do.
+    """
+    def __init__(self, message: str) -> None:
+        super().__init__(message)
+        # Mirrors yt-dlp's DownloadError, which error handlers read the message from
+        self.exc_info = (ReplayError, self, None)
+
+
+class ExtractorBackend(abc.ABC):
+    """
+    Base class for whatever YTDLInterface gets its info dicts from.
+
+    ...
+
+    Methods
+    -------
+    async extract(kind: `str`, options: `dict`, link: `str`):
+        Extracts information about a link.
+    """
+    @abc.abstractmethod
+    async def extract(self, kind: str, options: dict, link: str) -> dict:
+        """
+        Extracts information about a link.
+
+        Parameters
+        ----------
+        kind : `str`
+            The YTDLInterface method making the call, ie: `scrape_link` or `query_link`.
+        options : `dict`
+            The yt-dlp options the call was made with.
+        link : `str`
+            A string containing a URL or query.
+
+        Returns
+        -------
+        dict
+            The info dict for the link.
+        """
+
+
+class YTDLPBackend(ExtractorBackend):
+    """
+    The live backend, runs yt-dlp within an executor.
+    """
+    async def extract(self, kind: str, options: dict, link: str) -> dict:
+        partial = functools.partial(YTDLPBackend.extract_info, options, link)
+        return await asyncio.get_running_loop().run_in_executor(None, partial)
+
+    @staticmethod
+    def extract_info(options: dict, link: str) -> dict:
+        """
+        Runs yt-dlp synchronously, meant to be called from within an executor.
+
+        Importing yt-dlp and building the YoutubeDL object both happen here
+        so neither of them block the event loop.
+
+        Parameters
+        ----------
+            options : `dict`
+                A dictionary of yt-dlp arguments.
+            link : `str`
+                A string containing a URL or query that yt-dlp will interpret.
+
+        Returns
+        -------
+        dict
+            A dictionary containing the result of the yt-dlp call.
+        """
+        import yt_dlp
+
+        with yt_dlp.YoutubeDL(options) as ytdlp:
+            return ytdlp.extract_info(link, download=False)
+
+
+class RecordingBackend(ExtractorBackend):
+    """
+    Passes calls on to another backend and saves every result as a fixture file for a ReplayBackend.
+
+    ...
+
+    Attributes
+    ----------
+    backend : `ExtractorBackend`
+        The backend results are recorded from.
+    fixture_dir : `str`
+        The directory fixtures are written to.
+    """
+    def __init__(self, fixture_dir: str, backend: ExtractorBackend | None = None) -> None:
+        """
+        Creates a RecordingBackend object.
+
+        Parameters
+        ----------
+        fixture_dir : `str`
+            The directory fixtures are written to.
+        backend : `ExtractorBackend` | `None`, optional
+            The backend to record from, defaults to live yt-dlp.
+        """
+        self.backend = backend or YTDLPBackend()
+        self.fixture_dir = fixture_dir
+
+    async def extract(self, kind: str, options: dict, link: str) -> dict:
+        data = await self.backend.extract(kind, options, link)
+        fixture = {'kind': kind, 'link': link, 'data': RecordingBackend.__sanitize(data)}
+        path = fixture_path(self.fixture_dir, kind, link)
+        # Writing is quick but still blocking, keep it off of the loop
+        await asyncio.get_running_loop().run_in_executor(None, RecordingBackend.__write, path, fixture)
+        return data
+
+    @staticmethod
+    def __sanitize(data: dict) -> dict:
+        """
+        Makes an info dict JSON serializable.
+
+        Parameters
+        ----------
+        data : `dict`
+            The info dict.
+
+        Returns
+        -------
+        dict
+            The sanitized info dict.
+        """
+        try:
+            import yt_dlp
+            # sanitize_info fills in missing top level keys, leave the caller's dict alone
+            return yt_dlp.YoutubeDL.sanitize_info(dict(data))
+        except ImportError:
+            return json.loads(json.dumps(data, default=str))
+
+    @staticmethod
+    def __write(path: str, fixture: dict) -> None:
+        """
+        Writes a fixture to disk.
+
+        Parameters
+        ----------
+        path : `str`
+            The file to write to.
+        fixture : `dict`
+            The fixture.
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(fixture, f)
+
+
+class ReplayBackend(ExtractorBackend):
+    """
+    Serves recorded fixtures without touching the network, with configurable latency and error injection.
+
+    Replays are deterministic when a seed is given.
+
+    ...
+
+    Attributes
+    ----------
+    fixture_dir : `str` | `None`
+        The directory fixtures are read from.
+    latency : `float`
+        The seconds every call waits before returning.
+    jitter : `float`
+        Up to this many seconds are randomly added to latency.
+    error_rate : `float`
+        The chance from 0 to 1 of a call raising a ReplayError.
+    calls : `int`
+        How many calls the backend has served.
+
+    Methods
+    -------
+    add(kind: `str`, link: `str`, data: `dict`):
+        Adds a fixture in memory.
+    """
+    def __init__(self, fixture_dir: str | None = None, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, seed: int | None = None) -> None:
+        """
+        Creates a ReplayBackend object.
+
+        Parameters
+        ----------
+        fixture_dir : `str` | `None`, optional
+            The directory fixtures are read from.  None to only use fixtures added with add().
+        latency : `float`, optional
+            The seconds every call waits before returning.
+        jitter : `float`, optional
+            Up to this many seconds are randomly added to latency.
+        error_rate : `float`, optional
+            The chance from 0 to 1 of a call raising a ReplayError.
+        seed : `int` | `None`, optional
+            Seeds the jitter and the error injection.
+        """
+        self.fixture_dir = fixture_dir
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.calls = 0
+        self.__random = random.Random(seed)
+        self.__fixtures = {}
+
+    def add(self, kind: str, link: str, data: dict) -> None:
+        """
+        Adds a fixture in memory.
+
+        Parameters
+        ----------
+        kind : `str`
+            The YTDLInterface method the fixture answers.
+        link : `str`
+            The link the fixture answers.
+        data : `dict`
+            The info dict to return.
+        """
+        self.__fixtures[(kind, link)] = data
+
+    async def extract(self, kind: str, options: dict, link: str) -> dict:
+        self.calls += 1
+        delay = self.latency + self.__random.uniform(0, self.jitter)
+        failed = self.__random.random() < self.error_rate
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if failed:
+            raise ReplayError(f'Injected error for {kind} `{link}`')
+
+        data = self.__fixtures.get((kind, link))
+        if data is None:
+            data = self.__load(kind, link)
+        # Callers change what they're given, every call gets a fresh copy
+        return copy.deepcopy(data)
+
+    def __load(self, kind: str, link: str) -> dict:
+        """
+        Loads a fixture from fixture_dir and keeps it in memory.
+
+        Parameters
+        ----------
+        kind : `str`
+            The YTDLInterface method the fixture answers.
+        link : `str`
+            The link the fixture answers.
+
+        Raises
+        ------
+        `ReplayError`
+            If there is no fixture for the call.
+
+        Returns
+        -------
+        dict
+            The info dict.
+        """
+        if self.fixture_dir is None:
+            raise ReplayError(f'No fixture recorded for {kind} `{link}`')
+        try:
+            with open(fixture_path(self.fixture_dir, kind, link), 'r', encoding='utf-8') as f:
+                data = json.load(f)['data']
+        except OSError:
+            raise ReplayError(f'No fixture recorded for {kind} `{link}`') from None
+        self.__fixtures[(kind, link)] = data
+        return data
+
+
+def fixture_path(fixture_dir: str, kind: str, link: str) -> str:
+    """
+    Gets the file a fixture is stored in.
+
+    Parameters
+    ----------
+    fixture_dir : `str`
+        The directory fixtures are stored in.
+    kind : `str`
+        The YTDLInterface method the fixture answers.
+    link : `str`
+        The link the fixture answers.
+
+    Returns
+    -------
+    str
+        The path to the fixture file.
+    """
+    return os.path.join(fixture_dir, kind, hashlib.sha1(link.encode('utf-8')).hexdigest() + '.json')
+
+
+def create_backend(name: str, fixture_dir: str = 'fixtures', latency: float = 0.0, error_rate: float = 0.0) -> ExtractorBackend:
+    """
+    Creates a backend by name, for use with the .env file.
+
+    Parameters
+    ----------
+    name : `str`
+        `live`, `record` or `replay`.
+    fixture_dir : `str`, optional
+        The directory fixtures are recorded to or replayed from.
+    latency : `float`, optional
+        The latency of a replay backend.
+    error_rate : `float`, optional
+        The error rate of a replay backend.
+
+    Raises
+    ------
+    `ValueError`
+        If the name is not a backend.
+
+    Returns
+    -------
+    ExtractorBackend
+        The backend.
+    """
+    match name:
+        case 'live':
+            return YTDLPBackend()
+        case 'record':
+            return RecordingBackend(fixture_dir)
+        case 'replay':
+            return ReplayBackend(fixture_dir, latency=latency, error_rate=error_rate)
+        case default:
+            raise ValueError(f'Invalid extractor backend supplied ({default})')
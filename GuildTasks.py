@@ -0,0 +1,106 @@
+import asyncio
+from typing import Coroutine
+
+import Utils
+
+
+class GuildTasks:
+    """
+    A class that owns every background task a guild's Player starts, ie: playback and Song population.
+
+    Every task is named `<kind> in <guild id>` and forgotten once it is done, its exception is logged if it raised one.
+    cancel() stops all of them at once when the Player is cleaned, after which no new tasks are started.
+
+    Cancelling a task that is waiting on a yt-dlp extraction drops the extraction if it hasn't started yet,
+    one that is already running in the executor is left to finish and its result is thrown away.
+
+    ...
+
+    Attributes
+    ----------
+    guild_id : `int`
+        The guild the tasks belong to.
+    closed : `bool`
+        Whether cancel() has been called.
+
+    Methods
+    -------
+    create(coro: `Coroutine`, kind: `str`):
+        Starts a task owned by the guild.
+    cancel():
+        Cancels every task and stops new ones from being started.
+    counts():
+        How many tasks are running by kind.
+    """
+    def __init__(self, guild_id: int) -> None:
+        """
+        Creates a GuildTasks object.
+
+        Parameters
+        ----------
+        guild_id : `int`
+            The guild the tasks belong to.
+        """
+        self.guild_id = guild_id
+        self.closed = False
+        # task: kind
+        self.__tasks = {}
+
+    def __len__(self) -> int:
+        return len(self.__tasks)
+
+    def create(self, coro: Coroutine, kind: str) -> asyncio.Task | None:
+        """
+        Starts a task owned by the guild.
+
+        Parameters
+        ----------
+        coro : `Coroutine`
+            What the task runs.
+        kind : `str`
+            What the task does, ie: populate.
+
+        Returns
+        -------
+        asyncio.Task or None
+            The task, None if the tasks were already cancelled, the coroutine is closed without running.
+        """
+        if self.closed:
+            coro.close()
+            return None
+        task = asyncio.create_task(coro, name=f'{kind} in {self.guild_id}')
+        self.__tasks[task] = kind
+        task.add_done_callback(self.__done)
+        return task
+
+    def cancel(self) -> None:
+        """
+        Cancels every task and stops new ones from being started.
+
+        The task calling this is cancelled too, so it should be the last thing it does.
+        """
+        self.closed = True
+        for task in list(self.__tasks):
+            task.cancel()
+
+    def counts(self) -> dict[str, int]:
+        """
+        How many tasks are running by kind.
+
+        Returns
+        -------
+        dict[str, int]
+            The kind of task to how many of them are running.
+        """
+        counts = {}
+        for kind in list(self.__tasks.values()):
+            counts[kind] = counts.get(kind, 0) + 1
+        return counts
+
+    def __done(self, task: asyncio.Task) -> None:
+        """
+        Forgets a finished task and logs what it raised, so nothing is left unretrieved.
+        """
+        self.__tasks.pop(task, None)
+        if not task.cancelled() and task.exception() is not None:
+            Utils.pront(f'{task.get_name()} raised {task.exception()!r}', 'ERROR', guild_id=self.guild_id)
@@ -0,0 +1,198 @@
+import re
+import time
+
+from YTDLInterface import YTDLInterface
+
+
+class LinkResolver:
+    """
+    Static class that classifies what was given to /play and resolves it with a single yt-dlp call.
+
+    Each class of input (tier) has the one extraction strategy that is known to work for it,
+    which avoids scraping a link and then querying the same link again when the scrape comes back incomplete.
+
+    ...
+
+    Tiers
+    -----
+    youtube:
+        A YouTube video URL or a bare video ID, queried directly without its playlist.
+        A bare ID that doesn't resolve is searched for instead.
+    playlist:
+        A playlist URL, scraped so only the first entry's shell information is retrieved.
+    extractor:
+        Any other URL, queried so the extractor only has to run once.
+    search:
+        Free text, queried so the top search result comes back fully resolved.
+
+    Attributes
+    ----------
+    stats : `dict[str, dict]`
+        How many times each tier was used and how long its extractions took.
+
+    Methods
+    -------
+    classify(link: `str`):
+        Works out which tier a link or query belongs to.
+    async resolve(link: `str`):
+        Resolves a link or query with the extraction strategy of its tier.
+    get_stats():
+        The usage and average latency of every tier.
+    """
+    YOUTUBE_URL = re.compile(r'^(https?://)?([a-z0-9-]+\.)?(youtube\.com|youtu\.be|youtube-nocookie\.com)/', re.IGNORECASE)
+    YOUTUBE_ID = re.compile(r'^[A-Za-z0-9_-]{11}$')
+    PLAYLIST_URL = re.compile(r'([?&]list=|/playlist\b|/sets/|/album/)', re.IGNORECASE)
+    URL = re.compile(r'^[a-z][a-z0-9+.-]*://', re.IGNORECASE)
+
+    stats = {tier: {'count': 0, 'errors': 0, 'seconds': 0.0, 'max_seconds': 0.0} for tier in ('youtube', 'playlist', 'extractor', 'search')}
+
+    @staticmethod
+    def classify(link: str) -> str:
+        """
+        Works out which tier a link or query belongs to.
+
+        Parameters
+        ----------
+        link : `str`
+            The link or query to classify.
+
+        Returns
+        -------
+        str
+            One of `youtube`, `playlist`, `extractor` or `search`.
+        """
+        link = link.strip()
+        if LinkResolver.YOUTUBE_URL.match(link):
+            # A video inside of a playlist still plays the video
+            if LinkResolver.PLAYLIST_URL.search(link) and 'v=' not in link and 'youtu.be/' not in link.lower():
+                return 'playlist'
+            return 'youtube'
+        if LinkResolver.URL.match(link):
+            if LinkResolver.PLAYLIST_URL.search(link):
+                return 'playlist'
+            return 'extractor'
+        if LinkResolver.__is_video_id(link):
+            return 'youtube'
+        return 'search'
+
+    @staticmethod
+    async def resolve(link: str) -> dict:
+        """
+        Resolves a link or query with the extraction strategy of its tier.
+
+        Parameters
+        ----------
+        link : `str`
+            The link or query to resolve.
+
+        Returns
+        -------
+        dict
+            The yt-dlp output for the link.
+            `original_url` is always set to the link the result should be known by.
+        """
+        link = link.strip()
+        tier = LinkResolver.classify(link)
+        if tier == 'youtube' and not LinkResolver.YOUTUBE_URL.match(link):
+            # Bare IDs are turned into a link so yt-dlp doesn't search for them
+            url = f'https://www.youtube.com/watch?v={link}'
+            try:
+                data = await LinkResolver.__extract(tier, url)
+            except Exception as e:
+                if not YTDLInterface.is_dlp_error(e):
+                    raise
+                # It was a word that looked like an ID after all
+                data = await LinkResolver.__extract('search', link)
+            else:
+                link = url
+        else:
+            data = await LinkResolver.__extract(tier, link)
+
+        if not data.get('original_url'):
+            data['original_url'] = link
+        return data
+
+    @staticmethod
+    def get_stats() -> dict[str, dict]:
+        """
+        The usage and average latency of every tier.
+
+        Returns
+        -------
+        dict[str, dict]
+            For every tier, its count, errors, average and max seconds.
+        """
+        return {tier: {'count': stat['count'],
+                       'errors': stat['errors'],
+                       'average_seconds': stat['seconds'] / stat['count'] if stat['count'] else 0.0,
+                       'max_seconds': stat['max_seconds']}
+                for tier, stat in LinkResolver.stats.items()}
+
+    @staticmethod
+    async def __extract(tier: str, link: str) -> dict:
+        """
+        Runs the extraction strategy of a tier and records how long it took.
+
+        Parameters
+        ----------
+        tier : `str`
+            The tier whose strategy is used.
+        link : `str`
+            The link or query to extract.
+
+        Returns
+        -------
+        dict
+            The yt-dlp output for the link.
+        """
+        start = time.perf_counter()
+        try:
+            if tier == 'playlist':
+                data = await YTDLInterface.scrape_link(link)
+            else:
+                data = await YTDLInterface.query_link(link)
+        except Exception:
+            LinkResolver.__record(tier, time.perf_counter() - start, error=True)
+            raise
+        LinkResolver.__record(tier, time.perf_counter() - start)
+        return data
+
+    @staticmethod
+    def __record(tier: str, seconds: float, error: bool = False) -> None:
+        """
+        Records a resolution in stats.
+
+        Parameters
+        ----------
+        tier : `str`
+            The tier that was used.
+        seconds : `float`
+            How long the extraction took.
+        error : `bool`, optional
+            Whether the extraction raised.
+        """
+        stat = LinkResolver.stats[tier]
+        stat['count'] += 1
+        stat['errors'] += error
+        stat['seconds'] += seconds
+        stat['max_seconds'] = max(stat['max_seconds'], seconds)
+
+    @staticmethod
+    def __is_video_id(link: str) -> bool:
+        """
+        Whether a query is a bare YouTube video ID rather than a word that happens to be 11 characters long.
+
+        Parameters
+        ----------
+        link : `str`
+            The query to check.
+
+        Returns
+        -------
+        bool
+            True if the query looks like a video ID.
+        """
+        if not LinkResolver.YOUTUBE_ID.match(link):
+            return False
+        # Real IDs are random, camelCase words and names mix cases too but rarely contain digits or symbols
+        return any(c.isdigit() or c in '-_' for c in link)
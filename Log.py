@@ -0,0 +1,329 @@
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable
+
+
+class RotatingFile:
+    """
+    A class that appends lines to a file and starts a new one once it grows past a size, keeping a few old ones.
+
+    Only the Log writer thread should write to it.
+
+    ...
+
+    Attributes
+    ----------
+    path : `str`
+        The file being written to, old files get .1, .2 and so on appended.
+    max_bytes : `int`
+        How big the file can grow before it is rotated.
+    backups : `int`
+        How many old files to keep.
+
+    Methods
+    -------
+    write(line: `str`):
+        Appends a line, rotating the file first if it is full.
+    flush():
+        Flushes the file to the OS.
+    close():
+        Closes the file.
+    """
+    def __init__(self, path: str, max_bytes: int = 10_000_000, backups: int = 5) -> None:
+        """
+        Creates a RotatingFile object, the file is opened by the first write.
+
+        Parameters
+        ----------
+        path : `str`
+            The file to write to.
+        max_bytes : `int`, optional
+            How big the file can grow before it is rotated.
+        backups : `int`, optional
+            How many old files to keep.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.__file = None
+        self.__size = 0
+
+    def write(self, line: str) -> None:
+        """
+        Appends a line, rotating the file first if it is full.
+
+        Parameters
+        ----------
+        line : `str`
+            The line, without the newline.
+        """
+        data = line + '\n'
+        if self.__file is None:
+            self.__file = open(self.path, 'a', encoding='utf-8')
+            self.__size = self.__file.tell()
+        if self.max_bytes and self.__size + len(data) > self.max_bytes and self.__size > 0:
+            self.__rotate()
+        self.__file.write(data)
+        self.__size += len(data)
+
+    def flush(self) -> None:
+        """
+        Flushes the file to the OS.
+        """
+        if self.__file is not None:
+            self.__file.flush()
+
+    def close(self) -> None:
+        """
+        Closes the file.
+        """
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+
+    def __rotate(self) -> None:
+        """
+        Shifts every old file up by one, dropping the oldest, and starts a new file.
+        """
+        self.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f'{self.path}.{i}'):
+                os.replace(f'{self.path}.{i}', f'{self.path}.{i + 1}')
+        if self.backups > 0:
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.remove(self.path)
+        self.__file = open(self.path, 'a', encoding='utf-8')
+        self.__size = 0
+
+
+class Log:
+    """
+    Static class that writes logs (and anything else that shouldn't block, ie: trace spans) from a background thread.
+
+    Logging only checks the level and puts a record on a queue, the writer thread does the formatting
+    and the writing.  Every record goes to the console the way pront always printed it and, if a log file
+    is set, to that file as a JSON line with its structured fields.
+    If the writer falls too far behind, records are dropped and counted instead of blocking the caller.
+
+    ...
+
+    Attributes
+    ----------
+    LEVELS : `dict[str, int]`
+        How severe every level pront accepts is, the colored levels are informational.
+    level : `int`
+        Records below this severity are dropped before they are queued.
+    dropped : `int`
+        How many records were dropped because the queue was full.
+
+    Methods
+    -------
+    configure(level: `str` | `None`, file: `str` | `None`, max_bytes: `int`, backups: `int`):
+        Sets the level and the file logs are written to.
+    set_level(level: `str`):
+        Changes which records are kept, can be called at any time.
+    enabled(level: `str`):
+        Whether records at a level are currently kept.
+    write(content: `any`, lvl: `str`, end: `str`, **fields):
+        Queues a log record.
+    submit(function: `Callable`, *args):
+        Queues any function to be run on the writer thread.
+    flush(timeout: `float`):
+        Waits until everything queued so far has been written.
+    """
+    LEVELS = {'DEBUG': 10, 'LOG': 20, 'OKBLUE': 20, 'OKCYAN': 20, 'OKGREEN': 20, 'NONE': 20, 'WARNING': 30, 'ERROR': 40}
+    COLORS = {
+        "LOG": "",
+        "DEBUG": "\033[1;95m",
+        "OKBLUE": "\033[94m",
+        "OKCYAN": "\033[96m",
+        "OKGREEN": "\033[92m",
+        "WARNING": "\033[93m",
+        "ERROR": "\033[91m",
+        "NONE": "\033[0m"
+    }
+    level = LEVELS['DEBUG']
+    dropped = 0
+    __queue = queue.Queue(maxsize=10000)
+    __file = None
+    __thread = None
+    __lock = threading.Lock()
+
+    @staticmethod
+    def configure(level: str | None = None, file: str | None = None, max_bytes: int = 10_000_000, backups: int = 5) -> None:
+        """
+        Sets the level and the file logs are written to.
+
+        Parameters
+        ----------
+        level : `str` | `None`, optional
+            The least severe level to keep, one of LEVELS.
+        file : `str` | `None`, optional
+            The file to also write JSON lines to, None only logs to the console.
+        max_bytes : `int`, optional
+            How big the file can grow before it is rotated.
+        backups : `int`, optional
+            How many rotated files to keep.
+        """
+        if level is not None:
+            Log.set_level(level)
+        new_file = RotatingFile(file, max_bytes, backups) if file else None
+
+        # Swapped on the writer thread so nothing is written halfway through the change
+        def swap() -> None:
+            if Log.__file is not None:
+                Log.__file.close()
+            Log.__file = new_file
+        Log.submit(swap)
+
+    @staticmethod
+    def set_level(level: str) -> None:
+        """
+        Changes which records are kept, can be called at any time.
+
+        Parameters
+        ----------
+        level : `str`
+            The least severe level to keep, one of LEVELS.
+
+        Raises
+        ------
+        `ValueError`
+            If the level isn't one of LEVELS.
+        """
+        if level.upper() not in Log.LEVELS:
+            raise ValueError(f'Invalid log level supplied ({level})')
+        Log.level = Log.LEVELS[level.upper()]
+
+    @staticmethod
+    def enabled(lvl: str) -> bool:
+        """
+        Whether records at a level are currently kept, to skip building expensive messages.
+
+        Parameters
+        ----------
+        lvl : `str`
+            The level to check.
+
+        Returns
+        -------
+        bool
+            True if a record at lvl would be written.
+        """
+        return Log.LEVELS.get(lvl, 20) >= Log.level
+
+    @staticmethod
+    def write(content: Any, lvl: str = "DEBUG", end: str = "\n", **fields) -> None:
+        """
+        Queues a log record.
+
+        Parameters
+        ----------
+        content : `any`
+            The value to log, it is turned into a string on the writer thread.
+        lvl : `str`, optional
+            The level of the record, one of LEVELS.
+        end : `str`, optional
+            What the console line ends with.
+        **fields
+            Structured information about the record, ie: guild_id, song_id or trace_id.
+        """
+        if Log.LEVELS.get(lvl, 20) < Log.level:
+            return
+        Log.submit(Log.__emit, time.time(), lvl, content, end, fields)
+
+    @staticmethod
+    def submit(function: Callable, *args) -> None:
+        """
+        Queues any function to be run on the writer thread, it is dropped if the queue is full.
+
+        Parameters
+        ----------
+        function : `Callable`
+            The function to run.
+        *args
+            The arguments to run it with.
+        """
+        if Log.__thread is None:
+            Log.__start()
+        try:
+            Log.__queue.put_nowait((function, args))
+        except queue.Full:
+            Log.dropped += 1
+
+    @staticmethod
+    def flush(timeout: float = 5.0) -> bool:
+        """
+        Waits until everything queued so far has been written.
+
+        Parameters
+        ----------
+        timeout : `float`, optional
+            The most seconds to wait.
+
+        Returns
+        -------
+        bool
+            Whether everything was written in time.
+        """
+        if Log.__thread is None or threading.current_thread() is Log.__thread:
+            return True
+        done = threading.Event()
+        try:
+            Log.__queue.put((done.set, ()), timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    @staticmethod
+    def __start() -> None:
+        """
+        Starts the writer thread, once.
+        """
+        with Log.__lock:
+            if Log.__thread is not None:
+                return
+            Log.__thread = threading.Thread(target=Log.__run, name='log-writer', daemon=True)
+            Log.__thread.start()
+        # Write out whatever is still queued when the bot exits
+        atexit.register(Log.flush)
+
+    @staticmethod
+    def __run() -> None:
+        """
+        The writer thread, runs every queued function in order.
+        """
+        while True:
+            function, args = Log.__queue.get()
+            try:
+                function(*args)
+                # Only flush once the queue is empty, so bursts are written together
+                if Log.__queue.empty():
+                    sys.stdout.flush()
+                    if Log.__file is not None:
+                        Log.__file.flush()
+            except Exception as e:
+                # The writer can't log its own errors, print them and keep going
+                print(f'log writer failed: {e!r}', file=sys.stderr)
+
+    @staticmethod
+    def __emit(created: float, lvl: str, content: Any, end: str, fields: dict) -> None:
+        """
+        Writes a record to the console and the log file, runs on the writer thread.
+        """
+        timestamp = datetime.fromtimestamp(created)
+        message = str(content)
+        if Log.dropped:
+            dropped, Log.dropped = Log.dropped, 0
+            print(f'{Log.COLORS["WARNING"]}{{{timestamp.strftime("%x %X")}}} WARNING: dropped {dropped} log records, the writer fell behind{Log.COLORS["NONE"]}')
+        print(Log.COLORS.get(lvl, "") + "{" + timestamp.strftime("%x %X") + "} " + lvl + ": " + message + Log.COLORS["NONE"], end=end)
+        if Log.__file is not None:
+            Log.__file.write(json.dumps({'time': timestamp.isoformat(timespec='milliseconds'), 'level': lvl, 'message': message,
+                                         **{key: value for key, value in fields.items() if value is not None}}, default=str))
@@ -0,0 +1,286 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from os import path
+from typing import Callable
+
+from Timings import percentiles
+
+ASYNCIO_DIR = path.dirname(asyncio.__file__)
+
+
+class LagSampler:
+    """
+    A class that measures event loop lag by how late a periodic sleep wakes up.
+
+    A loop that is blocked by synchronous work can't wake the sampler on time,
+    so the overshoot is roughly how long every other coroutine had to wait as well.
+
+    ...
+
+    Attributes
+    ----------
+    interval : `float`
+        The seconds between samples.
+    samples : `deque[float]`
+        The most recent lag samples in seconds.
+    on_sample : `Callable[[float], None]` | `None`
+        Called with every sample as it is taken, ie: to feed a metric.
+
+    Methods
+    -------
+    start():
+        Starts sampling on the running loop.
+    stop():
+        Stops sampling.
+    is_running():
+        Whether the sampler is running.
+    get_percentiles():
+        The percentiles of the recorded lag.
+    reset():
+        Clears every recorded sample.
+    """
+    def __init__(self, interval: float = 0.05, size: int = 12000, on_sample: Callable[[float], None] | None = None) -> None:
+        """
+        Creates a LagSampler object.
+
+        Parameters
+        ----------
+        interval : `float`, optional
+            The seconds between samples.
+        size : `int`, optional
+            How many samples to keep.
+        on_sample : `Callable[[float], None]` | `None`, optional
+            Called with every sample as it is taken.
+        """
+        self.interval = interval
+        self.samples = deque(maxlen=size)
+        self.on_sample = on_sample
+        self.__task = None
+
+    def start(self) -> None:
+        """
+        Starts sampling on the running loop.
+        """
+        if self.is_running():
+            return
+        self.__task = asyncio.create_task(self.__sample(), name='loop-lag-sampler')
+
+    def stop(self) -> None:
+        """
+        Stops sampling.
+        """
+        if self.__task is not None:
+            self.__task.cancel()
+            self.__task = None
+
+    def is_running(self) -> bool:
+        """
+        Whether the sampler is running.
+
+        Returns
+        -------
+        bool
+            True if the sampler has been started and not stopped.
+        """
+        return self.__task is not None and not self.__task.done()
+
+    def get_percentiles(self) -> dict[str, float]:
+        """
+        The percentiles of the recorded lag.
+
+        Returns
+        -------
+        dict[str, float]
+            The p50, p90, p99 and max lag in seconds.
+        """
+        return percentiles(list(self.samples))
+
+    def reset(self) -> None:
+        """
+        Clears every recorded sample.
+        """
+        self.samples.clear()
+
+    async def __sample(self) -> None:
+        """
+        Sleeps for interval forever and records how late every wake up was.
+        """
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - start - self.interval)
+            self.samples.append(lag)
+            if self.on_sample is not None:
+                self.on_sample(lag)
+
+
+class BlockDetector:
+    """
+    A class that catches the event loop being blocked and records what was running when it happened.
+
+    The loop schedules a heartbeat every interval while a watcher thread checks that it keeps arriving.
+    Once a heartbeat is more than threshold late the watcher samples the loop thread's stack
+    and the task it is running, the block's duration is filled in when the loop frees up again.
+
+    ...
+
+    Attributes
+    ----------
+    threshold : `float`
+        The seconds the loop has to be blocked for before it is recorded.
+    interval : `float`
+        The seconds between heartbeats.
+    blocks : `deque[dict]`
+        The most recent blocks, oldest first.
+
+    Methods
+    -------
+    start():
+        Starts watching the running loop.
+    stop():
+        Stops watching.
+    is_running():
+        Whether the detector is running.
+    dump():
+        Every recorded block as human readable text.
+    reset():
+        Clears every recorded block.
+    """
+    def __init__(self, threshold: float = 0.1, size: int = 100, interval: float | None = None) -> None:
+        """
+        Creates a BlockDetector object.
+
+        Parameters
+        ----------
+        threshold : `float`, optional
+            The seconds the loop has to be blocked for before it is recorded.
+        size : `int`, optional
+            How many blocks to keep.
+        interval : `float` | `None`, optional
+            The seconds between heartbeats, defaults to a quarter of threshold.
+        """
+        self.threshold = threshold
+        self.interval = interval if interval is not None else threshold / 4
+        self.blocks = deque(maxlen=size)
+        self.__loop = None
+        self.__loop_thread = None
+        self.__handle = None
+        self.__watcher = None
+        self.__stopped = threading.Event()
+        self.__lock = threading.Lock()
+        # When the next heartbeat is due, as a perf_counter() value
+        self.__due = 0.0
+        # The block being waited out, if any
+        self.__pending = None
+
+    def start(self) -> None:
+        """
+        Starts watching the running loop, must be called from the loop's thread.
+        """
+        if self.is_running():
+            return
+        self.__loop = asyncio.get_running_loop()
+        self.__loop_thread = threading.get_ident()
+        self.__stopped.clear()
+        self.__beat()
+        self.__watcher = threading.Thread(target=self.__watch, name='loop-block-detector', daemon=True)
+        self.__watcher.start()
+
+    def stop(self) -> None:
+        """
+        Stops watching.
+        """
+        self.__stopped.set()
+        if self.__handle is not None:
+            self.__handle.cancel()
+            self.__handle = None
+        self.__watcher = None
+
+    def is_running(self) -> bool:
+        """
+        Whether the detector is running.
+
+        Returns
+        -------
+        bool
+            True if the detector has been started and not stopped.
+        """
+        return self.__watcher is not None and self.__watcher.is_alive()
+
+    def dump(self) -> str:
+        """
+        Every recorded block as human readable text.
+
+        Returns
+        -------
+        str
+            The blocks, oldest first, each with the task that was running and its stack.
+        """
+        with self.__lock:
+            blocks = list(self.blocks)
+        if not blocks:
+            return f'No blocks over {self.threshold * 1000:.0f}ms recorded.\n'
+        lines = []
+        for block in blocks:
+            seconds = 'still blocked' if block['seconds'] is None else f"blocked {block['seconds'] * 1000:.0f}ms"
+            lines.append(f"{block['at']} {seconds} in {block['task'] or 'a callback'}" + (f" ({block['coroutine']})" if block['coroutine'] else ''))
+            lines.extend('  ' + line for line in ''.join(block['stack']).rstrip().split('\n'))
+            lines.append('')
+        return '\n'.join(lines)
+
+    def reset(self) -> None:
+        """
+        Clears every recorded block.
+        """
+        with self.__lock:
+            self.blocks.clear()
+
+    def __beat(self) -> None:
+        """
+        Runs on the loop every interval, closes the pending block if the loop was stuck until now.
+        """
+        now = time.perf_counter()
+        with self.__lock:
+            if self.__pending is not None:
+                self.__pending['seconds'] = now - self.__pending.pop('since')
+                self.__pending = None
+            self.__due = now + self.interval
+        if not self.__stopped.is_set():
+            self.__handle = self.__loop.call_later(self.interval, self.__beat)
+
+    def __watch(self) -> None:
+        """
+        Runs in the watcher thread, samples the loop thread whenever a heartbeat is overdue.
+        """
+        while not self.__stopped.wait(self.interval / 2):
+            with self.__lock:
+                if self.__pending is not None or time.perf_counter() - self.__due < self.threshold:
+                    continue
+                self.__pending = self.__sample()
+                self.blocks.append(self.__pending)
+
+    def __sample(self) -> dict:
+        """
+        Records the stack and task of the loop thread as it is right now.
+
+        Returns
+        -------
+        dict
+            The block, its seconds are None until the loop frees up.
+        """
+        frame = sys._current_frames().get(self.__loop_thread)
+        task = asyncio.current_task(self.__loop)
+        return {
+            'at': datetime.now().isoformat(timespec='milliseconds'),
+            'since': self.__due,
+            'seconds': None,
+            'task': task.get_name() if task is not None else None,
+            'coroutine': getattr(task.get_coro(), '__qualname__', None) if task is not None else None,
+            # The loop's own frames are the same for every block
+            'stack': traceback.format_list([entry for entry in traceback.extract_stack(frame) if not entry.filename.startswith(ASYNCIO_DIR)]) if frame is not None else [],
+        }
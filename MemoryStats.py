@@ -0,0 +1,535 @@
+import asyncio
+import enum
+import gc
+import itertools
+import linecache
+import subprocess
+import sys
+import threading
+import tracemalloc
+import time
+import types
+import weakref
+from collections import deque
+from datetime import datetime
+
+import discord
+from discord.state import ConnectionState
+
+from Log import Log
+from Metrics import Metrics
+from Timings import PlaybackStats
+
+
+class MemoryStats:
+    """
+    Static class that estimates how much memory the bot's objects use and tracks allocations with tracemalloc.
+
+    Sizes are estimates: objects are walked through their containers and attributes and every object is counted once,
+    stopping at objects that are shared by the whole bot (guilds, channels, members, the event loop...) so a Player
+    is only charged for what it keeps alive by itself.  Large discord.py caches are estimated from a sample of their entries.
+
+    tracemalloc is off until start_tracing() is called as it slows every allocation down.
+
+    ...
+
+    Attributes
+    ----------
+    SHARED_TYPES : `tuple[type, ...]`
+        Objects of these types are never counted as part of something else.
+    SAMPLE_SIZE : `int`
+        How many entries of a large cache are sized to estimate the whole cache.
+    baseline : `tuple[datetime, tracemalloc.Snapshot]` | `None`
+        The first snapshot taken since tracing started, and when it was taken.
+    previous : `tuple[datetime, tracemalloc.Snapshot]` | `None`
+        The most recent snapshot, only it and the baseline are kept as every snapshot holds every traced allocation.
+
+    Methods
+    -------
+    sizeof(obj: `any`, seen: `set[int]` | `None`):
+        The estimated bytes of an object and everything it owns.
+    player(player: `Player`):
+        The estimated bytes of a Player by part.
+    totals(bot: `discord.Client`, players: `list[Player]`):
+        The estimated bytes of every subsystem.
+    start_tracing(frames: `int`):
+        Starts tracking allocations.
+    stop_tracing():
+        Stops tracking allocations and drops the snapshots.
+    snapshot():
+        Takes a snapshot and compares it to the previous one and the baseline.
+    """
+    SHARED_TYPES = (
+        type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType, types.CodeType, types.FrameType,
+        enum.Enum, asyncio.AbstractEventLoop, asyncio.Future, threading.Thread, subprocess.Popen,
+        ConnectionState, discord.Client, discord.Guild, discord.abc.GuildChannel, discord.abc.PrivateChannel, discord.Thread,
+        discord.Member, discord.User, discord.ClientUser, discord.VoiceProtocol, discord.AudioSource,
+    )
+    SAMPLE_SIZE = 50
+    baseline = None
+    previous = None
+
+    @staticmethod
+    def sizeof(obj, seen: set[int] | None = None) -> int:
+        """
+        The estimated bytes of an object and everything it owns.
+
+        Parameters
+        ----------
+        obj : `any`
+            The object to size.
+        seen : `set[int]` | `None`, optional
+            The ids of objects that were already counted, they are skipped and the new ones are added.
+            Passing the same set to several calls counts objects they share only once.
+
+        Returns
+        -------
+        int
+            The estimated bytes.
+        """
+        if seen is None:
+            seen = set()
+        size = 0
+        # Walked without recursion, a long Queue is a deep chain of objects
+        stack = [obj]
+        while stack:
+            current = stack.pop()
+            if id(current) in seen or isinstance(current, MemoryStats.SHARED_TYPES):
+                continue
+            seen.add(id(current))
+            size += sys.getsizeof(current)
+            if isinstance(current, (str, bytes, bytearray, int, float, bool)) or current is None:
+                continue
+            if isinstance(current, dict):
+                stack.extend(current.keys())
+                stack.extend(current.values())
+            elif isinstance(current, (list, tuple, set, frozenset, deque)):
+                stack.extend(current)
+            if hasattr(current, '__dict__'):
+                stack.append(current.__dict__)
+            for cls in type(current).__mro__:
+                for slot in cls.__dict__.get('__slots__', ()):
+                    if slot != '__dict__' and hasattr(current, slot):
+                        stack.append(getattr(current, slot))
+        return size
+
+    @staticmethod
+    def player(player) -> dict[str, int]:
+        """
+        The estimated bytes of a Player by part, every object is only counted under the first part that owns it.
+
+        Parameters
+        ----------
+        player : `Player`
+            The Player to size.
+
+        Returns
+        -------
+        dict[str, int]
+            The bytes of the queue, the current song, the views and the messages, and their total.
+        """
+        # The parts all point back at the Player, it is sized on its own at the end
+        seen = {id(player)}
+        parts = {
+            'queue': MemoryStats.sizeof(player.queue, seen),
+            'song': MemoryStats.sizeof(player.song, seen),
+            'views': MemoryStats.sizeof(player.np_view, seen),
+            'messages': MemoryStats.sizeof(player.last_np_message, seen),
+        }
+        seen.discard(id(player))
+        parts['total'] = sum(parts.values()) + MemoryStats.sizeof(player, seen)
+        return parts
+
+    @staticmethod
+    def totals(bot: discord.Client, players: list) -> dict[str, int]:
+        """
+        The estimated bytes of every subsystem.
+
+        Parameters
+        ----------
+        bot : `discord.Client`
+            The bot, its discord.py caches are sized.
+        players : `list[Player]`
+            Every Player, ie: Servers.dict's values.
+
+        Returns
+        -------
+        dict[str, int]
+            The bytes of the Players, the message, member and view caches and the diagnostics buffers.
+        """
+        state = bot._connection
+        player_views = {id(player.np_view) for player in players}
+        return {
+            'players': sum(MemoryStats.player(player)['total'] for player in players),
+            'messages': MemoryStats.__estimate(state._messages or ()),
+            'members': sum(MemoryStats.__estimate(guild.members) for guild in bot.guilds),
+            'views': sum(MemoryStats.sizeof(view) for view in MemoryStats.__views(getattr(state, '_view_store', None)) if id(view) not in player_views),
+            'diagnostics': MemoryStats.sizeof([PlaybackStats.recent, PlaybackStats.guilds, getattr(bot, 'lag_sampler', None),
+                                               getattr(bot, 'block_detector', None), *(metric._values for metric in Metrics.registry.values())]),
+        }
+
+    @staticmethod
+    def start_tracing(frames: int = 10) -> None:
+        """
+        Starts tracking allocations, every allocation is slower until stop_tracing() is called.
+
+        Parameters
+        ----------
+        frames : `int`, optional
+            How many frames of every allocation's traceback are kept.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        MemoryStats.baseline = None
+        MemoryStats.previous = None
+
+    @staticmethod
+    def stop_tracing() -> None:
+        """
+        Stops tracking allocations and drops the snapshots.
+        """
+        tracemalloc.stop()
+        MemoryStats.baseline = None
+        MemoryStats.previous = None
+
+    @staticmethod
+    def snapshot(count: int = 10) -> dict[str, list[tracemalloc.StatisticDiff]]:
+        """
+        Takes a snapshot and compares it to the previous one and the baseline, blocks for a while with many allocations.
+
+        Parameters
+        ----------
+        count : `int`, optional
+            How many of the lines that grew the most are returned per comparison.
+
+        Returns
+        -------
+        dict[str, list[tracemalloc.StatisticDiff]]
+            The lines that grew the most since the previous snapshot and since the baseline, empty for the first snapshot.
+
+        Raises
+        ------
+        `RuntimeError`
+            If start_tracing() wasn't called.
+        """
+        if not tracemalloc.is_tracing():
+            raise RuntimeError('tracemalloc is not tracing, call start_tracing() first')
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, linecache.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        ))
+        diffs = {}
+        if MemoryStats.previous is not None:
+            diffs['previous'] = MemoryStats.__grown(snapshot, MemoryStats.previous[1], count)
+        if MemoryStats.baseline is not None and MemoryStats.baseline is not MemoryStats.previous:
+            diffs['baseline'] = MemoryStats.__grown(snapshot, MemoryStats.baseline[1], count)
+        MemoryStats.previous = (datetime.now(), snapshot)
+        if MemoryStats.baseline is None:
+            MemoryStats.baseline = MemoryStats.previous
+        return diffs
+
+    @staticmethod
+    def __grown(snapshot: tracemalloc.Snapshot, old: tracemalloc.Snapshot, count: int) -> list[tracemalloc.StatisticDiff]:
+        """
+        The lines whose allocations grew the most between two snapshots.
+        """
+        return [diff for diff in snapshot.compare_to(old, 'lineno') if diff.size_diff > 0][:count]
+
+    @staticmethod
+    def __views(view_store) -> list:
+        """
+        Every view discord.py is keeping for interactions, ViewStore doesn't expose them so this reads its internals.
+        """
+        if view_store is None:
+            return []
+        views = {id(view): view for view in getattr(view_store, '_synced_message_views', {}).values()}
+        for items in getattr(view_store, '_views', {}).values():
+            for item in items.values():
+                view = getattr(item, 'view', None)
+                if view is not None:
+                    views[id(view)] = view
+        return list(views.values())
+
+    @staticmethod
+    def __estimate(items) -> int:
+        """
+        Estimates the bytes of a large collection from a sample of its entries.
+
+        Every entry is sized from its attributes, so entries of a shared type (ie: Members) still count.
+        """
+        items = list(items)
+        if not items:
+            return 0
+        seen = set()
+        sampled = 0
+        for item in itertools.islice(items, MemoryStats.SAMPLE_SIZE):
+            sampled += sys.getsizeof(item) + sum(MemoryStats.sizeof(getattr(item, slot, None), seen)
+                                                 for cls in type(item).__mro__ for slot in cls.__dict__.get('__slots__', ()) if slot != '__dict__')
+            sampled += MemoryStats.sizeof(getattr(item, '__dict__', None), seen)
+        return sampled * len(items) // min(len(items), MemoryStats.SAMPLE_SIZE)
+
+
+class LeakTracker:
+    """
+    Static class that keeps weak references to objects that should be freed once they are released, ie: Players after clean().
+
+    Anything still alive a while after being released is leaking, the periodic check logs it once along with
+    the chain of references keeping it alive, from a module, class, pending task or thread down to the object.
+
+    ...
+
+    Attributes
+    ----------
+    grace : `float`
+        The seconds an object has to be freed after it is released before it counts as leaked.
+
+    Methods
+    -------
+    track(obj: `any`):
+        Starts tracking an object.
+    release(obj: `any`):
+        Marks an object as no longer used, it should be freed soon.
+    counts():
+        How many tracked objects are alive and how many of those were released.
+    leaks():
+        The objects still alive grace seconds after being released.
+    referrer_chain(obj: `any`, max_depth: `int`, max_objects: `int`):
+        Describes the references keeping an object alive.
+    start(interval: `float`, grace: `float`):
+        Starts checking for leaks periodically on the running loop.
+    stop():
+        Stops checking for leaks.
+    """
+    grace = 60.0
+    # id to the weak reference, when the object was tracked and when it was released
+    __tracked = {}
+    __reported = set()
+    __task = None
+
+    @staticmethod
+    def track(obj) -> None:
+        """
+        Starts tracking an object, it stops being tracked as soon as it is freed.
+
+        Parameters
+        ----------
+        obj : `any`
+            The object, it must support weak references.
+        """
+        key = id(obj)
+
+        # Runs wherever the object is freed, ids are only reused after that
+        def freed(_) -> None:
+            LeakTracker.__tracked.pop(key, None)
+            LeakTracker.__reported.discard(key)
+        LeakTracker.__tracked[key] = [weakref.ref(obj, freed), time.monotonic(), None]
+
+    @staticmethod
+    def release(obj) -> None:
+        """
+        Marks an object as no longer used, it should be freed soon.  Releasing it again changes nothing.
+
+        Parameters
+        ----------
+        obj : `any`
+            A tracked object.
+        """
+        entry = LeakTracker.__tracked.get(id(obj))
+        if entry is not None and entry[2] is None:
+            entry[2] = time.monotonic()
+
+    @staticmethod
+    def counts() -> tuple[int, int]:
+        """
+        How many tracked objects are alive and how many of those were released.
+
+        Returns
+        -------
+        tuple[int, int]
+            The objects alive and the released objects alive.
+        """
+        entries = list(LeakTracker.__tracked.values())
+        return len(entries), sum(entry[2] is not None for entry in entries)
+
+    @staticmethod
+    def leaks() -> list[tuple[object, float]]:
+        """
+        The objects still alive grace seconds after being released, collects garbage first if there could be any.
+
+        Returns
+        -------
+        list[tuple[object, float]]
+            The objects and the seconds since they were released.
+        """
+        cutoff = time.monotonic() - LeakTracker.grace
+        if not any(entry[2] is not None and entry[2] < cutoff for entry in list(LeakTracker.__tracked.values())):
+            return []
+        # Released objects are often in reference cycles (ie: a Player and its task), those aren't leaks
+        gc.collect()
+        now = time.monotonic()
+        leaks = []
+        for reference, _, released in list(LeakTracker.__tracked.values()):
+            obj = reference()
+            if obj is not None and released is not None and released < cutoff:
+                leaks.append((obj, now - released))
+        return leaks
+
+    @staticmethod
+    def referrer_chain(obj, max_depth: int = 12, max_objects: int = 2000) -> str | None:
+        """
+        Describes the references keeping an object alive, searching outwards from it until a module, class,
+        pending task or thread is found.  Blocks while searching, every step scans every object the gc tracks.
+
+        Parameters
+        ----------
+        obj : `any`
+            The object to explain.
+        max_depth : `int`, optional
+            The most references between the object and what keeps it alive.
+        max_objects : `int`, optional
+            The most objects to look at before giving up.
+
+        Returns
+        -------
+        str or None
+            The chain, ie: `class Servers.dict -> dict[1] -> Player`, None if none was found.
+        """
+        modules = {id(vars(module)): name for name, module in list(sys.modules.items()) if module is not None}
+        # Only ids and this dict refer to the objects looked at, so the search doesn't find itself
+        objects = {id(obj): obj}
+        parent_of = {id(obj): None}
+        depths = {id(obj): 0}
+        pending = deque([id(obj)])
+        # The callers' frames hold the object too
+        ignore = {id(objects)}
+        frame = sys._getframe()
+        while frame is not None:
+            ignore.add(id(frame))
+            frame = frame.f_back
+        root = None
+        while pending and len(objects) < max_objects:
+            current = pending.popleft()
+            if LeakTracker.__is_root(objects[current], modules):
+                root = current
+                break
+            if depths[current] >= max_depth:
+                continue
+            referrers = gc.get_referrers(objects[current])
+            ignore.add(id(referrers))
+            for referrer in referrers:
+                if id(referrer) in ignore or id(referrer) in objects:
+                    continue
+                objects[id(referrer)] = referrer
+                parent_of[id(referrer)] = current
+                depths[id(referrer)] = depths[current] + 1
+                pending.append(id(referrer))
+            ignore.discard(id(referrers))
+            del referrers
+        if root is None:
+            return None
+
+        chain = []
+        key = root
+        while key is not None:
+            chain.append(objects[key])
+            key = parent_of[key]
+        parts = []
+        for i, node in enumerate(chain[:-1]):
+            # A module's or an object's __dict__ reads better as their attribute
+            if isinstance(node, dict) and id(node) in modules:
+                parts.append(f"module '{modules[id(node)]}'{LeakTracker.__link(node, chain[i + 1], True)}")
+            elif isinstance(node, dict) and parts and (isinstance(chain[i - 1], type) or getattr(chain[i - 1], '__dict__', None) is node):
+                parts[-1] += LeakTracker.__link(node, chain[i + 1], True)
+            else:
+                parts.append(LeakTracker.__describe(node) + LeakTracker.__link(node, chain[i + 1]))
+        parts.append(LeakTracker.__describe(chain[-1]))
+        return ' -> '.join(parts)
+
+    @staticmethod
+    def start(interval: float = 60.0, grace: float = 60.0) -> None:
+        """
+        Starts checking for leaks periodically on the running loop, every leak is logged once.
+
+        Parameters
+        ----------
+        interval : `float`, optional
+            The seconds between checks.
+        grace : `float`, optional
+            The seconds an object has to be freed after it is released.
+        """
+        LeakTracker.grace = grace
+        if LeakTracker.__task is None or LeakTracker.__task.done():
+            LeakTracker.__task = asyncio.create_task(LeakTracker.__check(interval), name='leak-tracker')
+
+    @staticmethod
+    def stop() -> None:
+        """
+        Stops checking for leaks.
+        """
+        if LeakTracker.__task is not None:
+            LeakTracker.__task.cancel()
+            LeakTracker.__task = None
+
+    @staticmethod
+    async def __check(interval: float) -> None:
+        """
+        Logs every new leak with what is keeping it alive, until cancelled.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            for obj, seconds in LeakTracker.leaks():
+                if id(obj) in LeakTracker.__reported:
+                    continue
+                LeakTracker.__reported.add(id(obj))
+                Log.write(f'{type(obj).__name__} still alive {seconds:.0f}s after being released, kept alive by: '
+                          f'{LeakTracker.referrer_chain(obj) or "nothing found, it may be a C extension or a thread local"}', 'WARNING')
+                del obj
+
+    @staticmethod
+    def __is_root(obj, modules: dict[int, str]) -> bool:
+        """
+        Whether an object lives for as long as the bot does, or for as long as it is running.
+        """
+        return (id(obj) in modules or isinstance(obj, (type, threading.Thread))
+                or (isinstance(obj, asyncio.Task) and not obj.done()))
+
+    @staticmethod
+    def __describe(obj) -> str:
+        """
+        A short description of an object in a referrer chain.
+        """
+        if isinstance(obj, asyncio.Task):
+            return f"task '{obj.get_name()}'"
+        if isinstance(obj, threading.Thread):
+            return f"thread '{obj.name}'"
+        if isinstance(obj, type):
+            return f'class {obj.__qualname__}'
+        if isinstance(obj, types.FrameType):
+            return f"frame of {getattr(obj.f_code, 'co_qualname', obj.f_code.co_name)}"
+        if isinstance(obj, (types.CoroutineType, types.GeneratorType, types.FunctionType)):
+            return f'{type(obj).__name__} {obj.__qualname__}'
+        if isinstance(obj, types.MethodType):
+            return f'bound method {obj.__func__.__qualname__}'
+        return type(obj).__qualname__
+
+    @staticmethod
+    def __link(holder, child, attribute: bool = False) -> str:
+        """
+        How an object in a referrer chain refers to the next one, attribute formats a dict's keys as attributes.
+        """
+        if isinstance(holder, dict):
+            for key, value in list(holder.items()):
+                if value is child:
+                    return f'.{key}' if attribute and isinstance(key, str) else f'[{key!r}]'
+            return ' (key)'
+        if isinstance(holder, (list, tuple, deque)):
+            for i, value in enumerate(list(holder)):
+                if value is child:
+                    return f'[{i}]'
+        if isinstance(holder, types.FrameType):
+            for name, value in holder.f_locals.items():
+                if value is child:
+                    return f' local {name}'
+        return ''
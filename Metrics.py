@@ -0,0 +1,450 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = '') -> str:
+    """
+    Formats label names and values the way the Prometheus text format expects them, ie: {kind="query_link"}.
+    """
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """
+    The base of every metric, a named family of values split up by label values.
+
+    ...
+
+    Attributes
+    ----------
+    name : `str`
+        The name the metric is exported under.
+    documentation : `str`
+        The HELP text of the metric.
+    label_names : `tuple[str, ...]`
+        The names of the labels every value of the metric has.
+
+    Methods
+    -------
+    render():
+        The metric in the Prometheus text format.
+    """
+    type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = ()) -> None:
+        """
+        Creates a Metric object, it is not exported until it is registered with Metrics.
+
+        Parameters
+        ----------
+        name : `str`
+            The name the metric is exported under.
+        documentation : `str`
+            The HELP text of the metric.
+        label_names : `tuple[str, ...]`, optional
+            The names of the labels every value of the metric has.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        # Observations can come from the voice threads as well as the event loop
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: tuple) -> tuple[str, ...]:
+        if len(labels) != len(self.label_names):
+            raise ValueError(f'{self.name} expects the labels {self.label_names}, got {labels}')
+        return tuple(str(label) for label in labels)
+
+    def _samples(self) -> list[tuple[str, str, float]]:
+        """
+        The (suffix, labels, value) of every sample of the metric.
+        """
+        with self._lock:
+            return [('', _format_labels(self.label_names, key), value) for key, value in self._values.items()]
+
+    def render(self) -> str:
+        """
+        The metric in the Prometheus text format.
+
+        Returns
+        -------
+        str
+            The HELP, TYPE and sample lines of the metric.
+        """
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        lines.extend(f'{self.name}{suffix}{labels} {_format_value(value)}' for suffix, labels, value in self._samples())
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """
+    A value that only ever goes up, ie: how many yt-dlp calls were made.
+
+    ...
+
+    Methods
+    -------
+    inc(*labels: `str`, amount: `float`):
+        Adds to the counter.
+    get(*labels: `str`):
+        The current value of the counter.
+    """
+    type = 'counter'
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        """
+        Adds to the counter.
+
+        Parameters
+        ----------
+        *labels : `str`
+            The value of every label, in the order of label_names.
+        amount : `float`, optional
+            How much to add, defaults to 1.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, *labels: str) -> float:
+        """
+        The current value of the counter.
+
+        Parameters
+        ----------
+        *labels : `str`
+            The value of every label, in the order of label_names.
+
+        Returns
+        -------
+        float
+            The value, 0 if the counter was never incremented.
+        """
+        return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(Metric):
+    """
+    A value that can go up and down, ie: how many Players are active.
+
+    Gauges that describe state the bot already keeps track of are given a function
+    that is called on every scrape instead of being set.
+
+    ...
+
+    Methods
+    -------
+    set(*labels: `str`, value: `float`):
+        Sets the gauge.
+    set_function(function: `Callable`):
+        Sets a function that computes the gauge when it is scraped.
+    """
+    type = 'gauge'
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, label_names)
+        self.__function = None
+
+    def set(self, *labels: str, value: float) -> None:
+        """
+        Sets the gauge.
+
+        Parameters
+        ----------
+        *labels : `str`
+            The value of every label, in the order of label_names.
+        value : `float`
+            The new value.
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function: Callable[[], float | dict[tuple, float]]) -> None:
+        """
+        Sets a function that computes the gauge when it is scraped.
+
+        Parameters
+        ----------
+        function : `Callable`
+            Returns the value of an unlabelled gauge, or a dict of label value tuples to values.
+        """
+        self.__function = function
+
+    def _samples(self) -> list[tuple[str, str, float]]:
+        if self.__function is None:
+            return super()._samples()
+        result = self.__function()
+        if not isinstance(result, dict):
+            result = {(): result}
+        return [('', _format_labels(self.label_names, self._key(key)), value) for key, value in result.items()]
+
+
+class Histogram(Metric):
+    """
+    Counts observations into cumulative buckets, ie: how long yt-dlp calls took.
+
+    ...
+
+    Attributes
+    ----------
+    buckets : `tuple[float, ...]`
+        The upper bounds of the buckets, +Inf is always added.
+
+    Methods
+    -------
+    observe(*labels: `str`, value: `float`):
+        Records an observation.
+    time(*labels: `str`):
+        Context manager that observes the seconds the code within it took.
+    """
+    type = 'histogram'
+    # Seconds, from a fast DB query to a slow playlist extraction
+    DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        """
+        Creates a Histogram object.
+
+        Parameters
+        ----------
+        name : `str`
+            The name the metric is exported under.
+        documentation : `str`
+            The HELP text of the metric.
+        label_names : `tuple[str, ...]`, optional
+            The names of the labels every value of the metric has.
+        buckets : `tuple[float, ...]`, optional
+            The upper bounds of the buckets.
+        """
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, *labels: str, value: float) -> None:
+        """
+        Records an observation.
+
+        Parameters
+        ----------
+        *labels : `str`
+            The value of every label, in the order of label_names.
+        value : `float`
+            The observed value.
+        """
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # One count per bucket plus +Inf, then the sum
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, *labels: str):
+        """
+        Context manager that observes the seconds the code within it took.
+
+        Parameters
+        ----------
+        *labels : `str`
+            The value of every label, in the order of label_names.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(*labels, value=time.perf_counter() - start)
+
+    def _samples(self) -> list[tuple[str, str, float]]:
+        samples = []
+        with self._lock:
+            items = [(key, list(counts)) for key, counts in self._values.items()]
+        for key, counts in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                samples.append(('_bucket', _format_labels(self.label_names, key, f'le="{_format_value(bound)}"'), cumulative))
+            samples.append(('_sum', _format_labels(self.label_names, key), counts[-1]))
+            samples.append(('_count', _format_labels(self.label_names, key), cumulative))
+        return samples
+
+
+class Metrics:
+    """
+    Static class that holds every metric the bot exports.
+
+    The metrics are always recorded, they are only served over HTTP if `metrics_port` is set in the .env file.
+
+    ...
+
+    Attributes
+    ----------
+    registry : `dict[str, Metric]`
+        Every registered metric by name.
+    ytdl_calls : `Counter`
+        yt-dlp extractions by call type and outcome.
+    ytdl_seconds : `Histogram`
+        How long yt-dlp extractions took by call type.
+    command_seconds : `Histogram`
+        Seconds from an interaction being created to its command finishing, by command and outcome.
+    db_seconds : `Histogram`
+        How long DB queries took by operation.
+    cache_lookups : `Counter`
+        Lookups by cache and whether they hit or missed.
+    ffmpeg_spawns : `Counter`
+        How many ffmpeg processes the Players started.
+    loop_lag_seconds : `Histogram`
+        How late the event loop woke up the lag sampler.
+    first_audio_seconds : `Histogram`
+        Seconds from a Player taking a Song off the Queue to its first audio frame, by cache result and source.
+    song_gap_seconds : `Histogram`
+        Seconds of silence between Songs, by cache result and source.
+    active_players : `Gauge`
+        Players currently registered with Servers.
+    queued_songs : `Gauge`
+        Songs waiting in every Queue combined.
+    ffmpeg_processes : `Gauge`
+        ffmpeg processes currently running under the bot.
+    memory_bytes : `Gauge`
+        The estimated bytes used by every subsystem, see MemoryStats.
+    guild_tasks : `Gauge`
+        Background tasks the Players are running, by kind.
+    ffmpeg_restarts : `Counter`
+        ffmpeg processes the Players replaced mid-Song, by reason, ie: stall or url_refresh.
+    ffmpeg_cpu_percent : `Gauge`
+        The CPU used by the ffmpeg process of every playing guild.
+    ffmpeg_rss_bytes : `Gauge`
+        The resident memory of the ffmpeg process of every playing guild.
+    ffmpeg_read_age_seconds : `Gauge`
+        Seconds since the last frame was read from every playing guild's ffmpeg process.
+
+    Methods
+    -------
+    register(metric: `Metric`):
+        Adds a metric to the registry so it is exported.
+    render():
+        Every registered metric in the Prometheus text format.
+    async start_server(host: `str`, port: `int`):
+        Serves the metrics at /metrics.
+    async stop_server():
+        Stops serving the metrics.
+    """
+    ytdl_calls = Counter('mabals_ytdl_calls_total', 'yt-dlp extractions by call type and outcome.', ('kind', 'outcome'))
+    ytdl_seconds = Histogram('mabals_ytdl_seconds', 'How long yt-dlp extractions took by call type.', ('kind',))
+    command_seconds = Histogram('mabals_command_seconds', 'Seconds from an interaction being created to its command finishing.', ('command', 'outcome'))
+    db_seconds = Histogram('mabals_db_query_seconds', 'How long DB queries took by operation.', ('operation',),
+                           buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5))
+    cache_lookups = Counter('mabals_cache_lookups_total', 'Lookups by cache and whether they hit or missed.', ('cache', 'result'))
+    ffmpeg_spawns = Counter('mabals_ffmpeg_spawns_total', 'How many ffmpeg processes the Players started.')
+    loop_lag_seconds = Histogram('mabals_event_loop_lag_seconds', 'How late the event loop woke up the lag sampler.',
+                                 buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+    first_audio_seconds = Histogram('mabals_first_audio_seconds', 'Seconds from a Player taking a Song off the Queue to its first audio frame.', ('cache', 'source'))
+    song_gap_seconds = Histogram('mabals_song_gap_seconds', 'Seconds of silence between a Song ending and the next one being heard.', ('cache', 'source'))
+    # The gauges that read Servers and /proc are given their functions in musS_D.py
+    active_players = Gauge('mabals_active_players', 'Players currently registered with Servers.')
+    queued_songs = Gauge('mabals_queued_songs', 'Songs waiting in every Queue combined.')
+    ffmpeg_processes = Gauge('mabals_ffmpeg_processes', 'ffmpeg processes currently running under the bot.')
+    memory_bytes = Gauge('mabals_memory_bytes', 'The estimated bytes used by every subsystem.', ('subsystem',))
+    guild_tasks = Gauge('mabals_guild_tasks', 'Background tasks the Players are running, by kind.', ('kind',))
+    ffmpeg_restarts = Counter('mabals_ffmpeg_restarts_total', "ffmpeg processes the Players replaced mid-Song, by reason, ie: stall or url_refresh.", ('reason',))
+    ffmpeg_cpu_percent = Gauge('mabals_ffmpeg_cpu_percent', 'The CPU used by the ffmpeg process of every playing guild.', ('guild',))
+    ffmpeg_rss_bytes = Gauge('mabals_ffmpeg_rss_bytes', 'The resident memory of the ffmpeg process of every playing guild.', ('guild',))
+    ffmpeg_read_age_seconds = Gauge('mabals_ffmpeg_read_age_seconds', "Seconds since the last frame was read from every playing guild's ffmpeg process.", ('guild',))
+
+    registry = {metric.name: metric for metric in (
+        ytdl_calls, ytdl_seconds, command_seconds, db_seconds, cache_lookups, ffmpeg_spawns,
+        loop_lag_seconds, first_audio_seconds, song_gap_seconds, active_players, queued_songs, ffmpeg_processes, memory_bytes, guild_tasks,
+        ffmpeg_restarts, ffmpeg_cpu_percent, ffmpeg_rss_bytes, ffmpeg_read_age_seconds)}
+    # The aiohttp AppRunner while the endpoint is being served
+    __runner = None
+
+    @staticmethod
+    def register(metric: Metric) -> Metric:
+        """
+        Adds a metric to the registry so it is exported.
+
+        Parameters
+        ----------
+        metric : `Metric`
+            The metric to add.
+
+        Returns
+        -------
+        Metric
+            The metric that was passed in.
+
+        Raises
+        ------
+        `ValueError`
+            If a metric with the same name was already registered.
+        """
+        if metric.name in Metrics.registry:
+            raise ValueError(f'A metric named {metric.name} is already registered')
+        Metrics.registry[metric.name] = metric
+        return metric
+
+    @staticmethod
+    def render() -> str:
+        """
+        Every registered metric in the Prometheus text format.
+
+        Returns
+        -------
+        str
+            The exposition, ending with a newline.
+        """
+        return '\n'.join(metric.render() for metric in Metrics.registry.values()) + '\n'
+
+    @staticmethod
+    async def start_server(host: str = '127.0.0.1', port: int = 9100) -> None:
+        """
+        Serves the metrics at http://host:port/metrics.
+
+        Parameters
+        ----------
+        host : `str`, optional
+            The interface to listen on, only the local machine by default.
+        port : `int`, optional
+            The port to listen on.
+        """
+        # aiohttp comes with discord.py, it is only needed when the endpoint is served
+        from aiohttp import web
+
+        async def handle(request: web.Request) -> web.Response:
+            return web.Response(text=Metrics.render(), content_type='text/plain', charset='utf-8',
+                                headers={'X-Content-Type-Options': 'nosniff'})
+
+        app = web.Application()
+        app.router.add_get('/metrics', handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        Metrics.__runner = runner
+
+    @staticmethod
+    async def stop_server() -> None:
+        """
+        Stops serving the metrics.
+        """
+        if Metrics.__runner is not None:
+            await Metrics.__runner.cleanup()
+            Metrics.__runner = None
+
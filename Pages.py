@@ -77,6 +77,7 @@ class Pages:
                     {"name": "leave", "value": "Have MaBalls disconnect from its voice channel"},
                     {"name": "inspect", "value": "Get information about a song in the queue by its index"},
                     {"name": "replay", "value": "Restarts the current song"},
+                    {"name": "seek", "value": "Skips to a point in the current song"},
                     {"name": "pause", "value": "Pauses the current song"},
                     {"name": "resume", "value": "Resumes the current song"},
                     {"name": "now", "value": "Gets the song that is currently playing"},
@@ -84,7 +85,7 @@ class Pages:
                     {"name": "update", "value": "Updates all bot libraries to maintain functionality, this command is disabled by default. To enable this command, see \"Cogs\" in the readme on this bot's repository or check README.md"}
                 ]
             },
-            "buttons" : ["help", "settings", "ping", "join", "leave", "inspect",  "replay", "pause", "resume", "now"],
+            "buttons" : ["help", "settings", "ping", "join", "leave", "inspect",  "replay", "seek", "pause", "resume", "now"],
             "cat_style": ButtonStyle.secondary
         }
     }
@@ -137,7 +138,7 @@ class Pages:
         "play": {
             "title": "play", "description": "Plays a song or adds it to the queue\nIf given a playlist it will play only the first song in the playlist\n\n Options:",
             "fields": [
-                {"name": "link", "value": "The link to the song\n Supports playback of anything YT-DLP is able to handle, so almost anything at all."},
+                {"name": "link", "value": "The link to the song\n Supports playback of anything YT-DLP is able to handle, so almost anything at all.\nLinks with a timestamp (ie: `?t=90`) start playing from it."},
                 {"name": "top", "value": "Puts the song at the top of the queue\nRequires DJ role or the Manage Channels permission"},
             ]
         },
@@ -222,6 +223,12 @@ class Pages:
         "replay": {
             "title": "replay", "description": "Restarts the current song",
             "fields": []
+        },
+        "seek": {
+            "title": "seek", "description": "Skips to a point in the current song\n\n Options:",
+            "fields": [
+                {"name": "timestamp", "value": "Where to skip to, ie: `1:30`, `1m30s` or `90`\nRequires **Song Authority** (see help->general)"}
+            ]
         }
     }
 
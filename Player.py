@@ -2,9 +2,13 @@ from __future__ import annotations
 import asyncio
 import discord
 import math
+import os
 import random
+import threading
 import traceback
 import time
+from typing import Callable
+from urllib.parse import urlparse
 
 
 # Our imports
@@ -15,6 +19,13 @@ from PlaylistQueue import Queue
 from Song import Song
 from YTDLInterface import YTDLInterface
 from DB import DB
+from Crossfade import CrossfadeAudio
+from GuildTasks import GuildTasks
+from MemoryStats import LeakTracker
+from Metrics import Metrics
+from ProcStats import ProcStats
+from Timings import PlaybackStats
+from Tracing import Span, Tracer
 
 # Class to make what caused the error more apparent
 
@@ -24,6 +35,170 @@ class VoiceError(Exception):
     pass
 
 
+class FFmpegLog:
+    """
+    Keeps the end of what an ffmpeg process wrote to stderr, discord.py writes to it from a reader thread.
+    """
+    def __init__(self, size: int = 4096) -> None:
+        self.size = size
+        self.__data = bytearray()
+
+    def write(self, data: bytes) -> None:
+        self.__data += data
+        del self.__data[:-self.size]
+
+    def tail(self, lines: int = 5) -> str:
+        return '\n'.join(self.__data.decode('utf-8', 'replace').splitlines()[-lines:])
+
+
+class PlayerAudio(discord.AudioSource):
+    """
+    The AudioSource a Player plays a Song through, it wraps the ffmpeg process decoding the Song.
+
+    Every frame handed to discord.py is counted, which gives the position within the Song,
+    and the ffmpeg process can be replaced while playing (ie: when it stalls) without discord.py noticing.
+
+    ...
+
+    Attributes
+    ----------
+    source : `discord.FFmpegPCMAudio`
+        The ffmpeg process currently being read.
+    stderr : `FFmpegLog` | `None`
+        What that process wrote to stderr, if it was captured.
+    frames : `int`
+        How many 20ms frames have been read from every process combined.
+    last_read : `float`
+        The monotonic() value of when the last frame was read, or the process was started.
+    restarts : `int`
+        How many times the process was replaced because it stopped producing audio, seeking doesn't count.
+    cpu_percent : `float` | `None`
+        The CPU the process used between the last two calls to sample().
+    rss_bytes : `int` | `None`
+        The resident memory of the process at the last call to sample().
+
+    Methods
+    -------
+    position():
+        The seconds into the Song of the last frame read.
+    swap(source: `discord.FFmpegPCMAudio`, offset: `float`, stderr: `FFmpegLog` | `None`, first_frame: `bytes` | `None`):
+        Replaces the ffmpeg process, the new one should start at offset.
+    sample():
+        Reads the CPU and memory use of the process from /proc.
+    """
+    FRAME_SECONDS = 0.02
+
+    def __init__(self, source: discord.FFmpegPCMAudio, *, offset: float = 0.0, stderr: FFmpegLog | None = None,
+                 on_first_read: Callable[[], None] | None = None, first_frame: bytes | None = None) -> None:
+        self.source = source
+        self.stderr = stderr
+        self.on_first_read = on_first_read
+        self.frames = 0
+        self.last_read = time.monotonic()
+        self.restarts = 0
+        self.cpu_percent = None
+        self.rss_bytes = None
+        self.__offset = offset
+        self.__offset_frames = 0
+        # A frame already read from the process (ie: while it was spawned ahead of time), handed out before reading from it
+        self.__pending = first_frame
+        self.__cpu_sample = None
+        self.__closed = False
+        self.__lock = threading.Lock()
+
+    def read(self) -> bytes:
+        while True:
+            source = self.source
+            # swap() sets the pending frame before the source, so a new source always comes with its frame
+            data, self.__pending = self.__pending, None
+            if data:
+                break
+            try:
+                data = source.read()
+            except Exception:
+                # The process was swapped out and cleaned up under the voice thread
+                if source is self.source:
+                    raise
+                continue
+            # A process that was swapped out ends its last read early, carry on with the new one
+            if data or source is self.source:
+                break
+        if data:
+            self.frames += 1
+            self.last_read = time.monotonic()
+            if self.on_first_read is not None:
+                on_first_read, self.on_first_read = self.on_first_read, None
+                on_first_read()
+        return data
+
+    def is_opus(self) -> bool:
+        return False
+
+    def cleanup(self) -> None:
+        with self.__lock:
+            self.__closed = True
+        self.source.cleanup()
+
+    def position(self) -> float:
+        """
+        The seconds into the Song of the last frame read.
+
+        Returns
+        -------
+        float
+            The offset the process started at plus the frames read from it.
+        """
+        return self.__offset + (self.frames - self.__offset_frames) * PlayerAudio.FRAME_SECONDS
+
+    def swap(self, source: discord.FFmpegPCMAudio, offset: float, stderr: FFmpegLog | None = None, first_frame: bytes | None = None) -> bool:
+        """
+        Replaces the ffmpeg process, the old one is killed.
+
+        Parameters
+        ----------
+        source : `discord.FFmpegPCMAudio`
+            The new process.
+        offset : `float`
+            The seconds into the Song the new process starts at.
+        stderr : `FFmpegLog` | `None`, optional
+            What the new process writes to stderr.
+        first_frame : `bytes` | `None`, optional
+            The frame at offset if it was already read from the new process, it is played first.
+
+        Returns
+        -------
+        bool
+            False if discord.py was already done with this source, the new process is cleaned up instead.
+        """
+        with self.__lock:
+            if self.__closed:
+                source.cleanup()
+                return False
+            self.__pending = first_frame
+            old, self.source = self.source, source
+            self.stderr = stderr
+            self.__offset = offset
+            self.__offset_frames = self.frames
+            self.__cpu_sample = None
+            self.last_read = time.monotonic()
+        old.cleanup()
+        return True
+
+    def sample(self) -> None:
+        """
+        Reads the CPU and memory use of the process from /proc, the CPU use is averaged since the previous sample.
+        """
+        process = getattr(self.source, '_process', None)
+        pid = getattr(process, 'pid', None)
+        if pid is None:
+            return
+        cpu, now = ProcStats.cpu_seconds(pid), time.monotonic()
+        self.rss_bytes = ProcStats.rss_bytes(pid)
+        if cpu is not None and self.__cpu_sample is not None and self.__cpu_sample[0] == pid and now > self.__cpu_sample[2]:
+            self.cpu_percent = 100 * (cpu - self.__cpu_sample[1]) / (now - self.__cpu_sample[2])
+        self.__cpu_sample = (pid, cpu, now) if cpu is not None else None
+
+
 class Player:
     """
     A class that handles Song population and playback as well as Queue management for a guild.
@@ -41,6 +216,8 @@ class Player:
         To know when the Player is actually playing audio, is_playing() should be used.
     last_np_message: `discord.Message` | `None`
         The last automatic now-playing Message the Player has sent.  NoneType if it has not sent one.
+    np_view : `Buttons.NowPlayingView` | `None`
+        The buttons of last_np_message, stopped once the message is replaced so discord.py lets go of the Player.
     looping : `bool`
         Whether the Player is looping the currently playing Song.
     queue_looping : `bool`
@@ -51,6 +228,16 @@ class Player:
         The VoiceClient this Player is managing.
     send_location : `discord.abc.GuildChannel`
         The location the bot will send auto Now Playing messages.  Updated every song.
+    song_ended_at : `float` | `None`
+        The perf_counter() value of when the last Song ended, used to measure the gap before the next one.
+    tasks : `GuildTasks`
+        Every background task of the Player, including playback itself, all cancelled by clean().
+    audio : `PlayerAudio` | `None`
+        The source the current Song is playing through, None between Songs.
+    next_audio : `PlayerAudio` | `None`
+        The source of the next Song, spawned with its first frame read shortly before the current Song ends.
+    next_song : `Song` | `None`
+        The Song next_audio was spawned for, next_audio is thrown away if a different Song comes next.
 
     Methods
     -------
@@ -70,8 +257,18 @@ class Player:
         Sets whether the Player should be shuffling completed Songs back into the Queue.
     set_queue_loop(state: `bool`):
         Sets whether the Player should be adding completed Songs to the end of the Queue.
+    async seek(position: `float`):
+        Moves the playing Song to a position.
         
     """
+    # Seconds between checks of the ffmpeg process, and how many times a Song's process is restarted before giving up
+    WATCHDOG_INTERVAL = 1.0
+    MAX_RESTARTS = 3
+    # Seconds before a stream URL expires that it is resolved again, and between attempts if that fails
+    URL_REFRESH_MARGIN = 300
+    URL_REFRESH_RETRY = 30
+    # Seconds before the end of a Song that the next one's ffmpeg process is spawned
+    PREPARE_SECONDS = 15
     def __init__(self, vc: discord.VoiceClient, song: Song) -> None:
         """
         Creates a Player object.
@@ -87,6 +284,9 @@ class Player:
         self.player_song_end = asyncio.Event()
         # Immediately set the Event because audio is not currently playing
         self.player_song_end.set()
+        # The voice thread ends Songs, it needs the loop to set player_song_end on
+        self.loop = asyncio.get_running_loop()
+        self.song_ended_at = None
 
         self.queue = Queue()
         self.queue.add(song)
@@ -94,6 +294,7 @@ class Player:
         self.song = song
 
         self.last_np_message = None
+        self.np_view = None
 
         self.looping = False
         self.queue_looping = False
@@ -103,9 +304,17 @@ class Player:
 
         self.send_location = vc.channel if DB.GuildSettings.get(vc.guild.id, setting='np_sent_to_vc') else song.channel
 
+        self.audio = None
+        self.next_audio = None
+        self.next_song = None
+
         # Create task to run __player
-        self.player_task = asyncio.create_task(
-            self.__exception_handler_wrapper(self.__player()))
+        self.tasks = GuildTasks(vc.guild.id)
+        self.player_task = self.tasks.create(self.__exception_handler_wrapper(self.__player()), 'player')
+        self.tasks.create(self.__watchdog(), 'watchdog')
+        self.tasks.create(self.__url_refresher(), 'url_refresh')
+        self.tasks.create(self.__preparer(), 'prepare')
+        LeakTracker.track(self)
 
     @classmethod
     def from_player(cls, player: Player) -> Player:
@@ -126,6 +335,8 @@ class Player:
         self.player_kill = asyncio.Event()
         self.player_song_end = asyncio.Event()
         self.player_song_end.set()
+        self.loop = asyncio.get_running_loop()
+        self.song_ended_at = None
 
         self.queue = player.queue
         self.queue.add_at(player.song, 0)
@@ -133,6 +344,7 @@ class Player:
         self.song = player.song
 
         self.last_np_message = player.last_np_message
+        self.np_view = None
 
         self.looping = player.looping
         self.queue_looping = player.queue_looping
@@ -142,10 +354,18 @@ class Player:
 
         self.send_location = player.send_location
 
+        self.audio = None
+        self.next_audio = None
+        self.next_song = None
+
         # Create task to run __player
-        self.player_task = asyncio.create_task(
-            self.__exception_handler_wrapper(self.__player()))
-        
+        self.tasks = GuildTasks(self.vc.guild.id)
+        self.player_task = self.tasks.create(self.__exception_handler_wrapper(self.__player()), 'player')
+        self.tasks.create(self.__watchdog(), 'watchdog')
+        self.tasks.create(self.__url_refresher(), 'url_refresh')
+        self.tasks.create(self.__preparer(), 'prepare')
+        LeakTracker.track(self)
+
         return self
 
     
@@ -181,16 +401,343 @@ class Player:
         
         Not sure what scenario would cause it to raise a VoiceError but if it does, good luck.
         Other than that this is just to raise the player_song_end flag for __player.
+
+        Runs in the voice thread, asyncio Events aren't thread-safe so the flag is raised on the loop.
         """
         if error:
             raise VoiceError(error)
+        # Setting the Event from here wouldn't wake the loop up, leaving a gap until something else did
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.__end_song, time.perf_counter())
+
+    def __end_song(self, ended_at: float) -> None:
+        """
+        Raises the player_song_end flag once discord.py's player is done, on the loop.
+
+        Parameters
+        ----------
+        ended_at : `float`
+            The perf_counter() value of when discord.py's player stopped.
+        """
+        # A player that was stopped to make way for the next one can call back after that one started
+        if self.vc.is_playing() or self.vc.is_paused():
+            return
+        self.song_ended_at = ended_at
         self.player_song_end.set()
 
+    def __faded(self) -> None:
+        """
+        Ends the outgoing Song once a crossfade is over, discord.py's player carries on with the incoming one.
+
+        Runs in the voice thread, like __song_complete.
+        """
+        self.song_ended_at = time.perf_counter()
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.player_song_end.set)
+
     
+    def __first_read_callback(self, span: Span | None, dequeued_at: float, cache: str, populate_seconds: float | None) -> Callable[[], None]:
+        """
+        Makes the callback PlayerAudio runs once ffmpeg's first frame is read, which is when the Song becomes audible.
+
+        Parameters
+        ----------
+        span : `Span` | `None`
+            The player.start span of the Song, the time to the first frame is recorded under it.
+        dequeued_at : `float`
+            The perf_counter() value of when the Song was taken off the Queue.
+        cache : `str`
+            Whether the Song's stream URL could be reused, hit, miss or none.
+        populate_seconds : `float` | `None`
+            How long repopulating the Song took, None if it wasn't.
+
+        Returns
+        -------
+        Callable[[], None]
+            The callback, it runs in the voice thread.
+        """
+        song = self.song
+        guild_id = self.vc.guild.id
+        spawned = time.time()
+        # A Song that failed to load in between still counts towards the silence
+        previous_end, self.song_ended_at = self.song_ended_at, None
+
+        def first_read() -> None:
+            now = time.perf_counter()
+            PlaybackStats.record(guild_id, song.source, cache, now - dequeued_at,
+                                 now - previous_end if previous_end is not None else None, populate_seconds)
+            Tracer.record('ffmpeg.first_frame', spawned, time.time(), song.trace_id,
+                          span.span_id if span is not None else None, guild_id=guild_id, source=song.source)
+        return first_read
+
+    def __spawn(self, offset: float, song: Song | None = None) -> tuple[discord.FFmpegPCMAudio, FFmpegLog | None]:
+        """
+        Starts an ffmpeg process decoding the Song's audio.
+
+        The offset is given to ffmpeg as an input option, so it seeks the input (an HTTP range request for streams)
+        instead of decoding and throwing away everything before it.
+        Livestreams can't be seeked, they always start at the live edge with the low latency options.
+
+        Parameters
+        ----------
+        offset : `float`
+            The seconds into the Song to start at, ignored for livestreams.
+        song : `Song` | `None`, optional
+            The Song to decode, defaults to the playing one.
+
+        Returns
+        -------
+        tuple[discord.FFmpegPCMAudio, FFmpegLog | None]
+            The process and its captured stderr, None if ffmpeg_options sends stderr somewhere else.
+        """
+        song = song if song is not None else self.song
+        options = dict(YTDLInterface.ffmpeg_options)
+        if song.is_live:
+            live_options = YTDLInterface.ffmpeg_live_before_options
+            if '.m3u8' in urlparse(song.audio).path:
+                live_options += f' {YTDLInterface.ffmpeg_hls_before_options}'
+            options['before_options'] = f"{live_options} {options.get('before_options', '')}".rstrip()
+        elif offset > 0:
+            options['before_options'] = f"-ss {offset:.3f} {options.get('before_options', '')}".rstrip()
+        stderr = None
+        if 'stderr' not in options:
+            stderr = options['stderr'] = FFmpegLog()
+        source = discord.FFmpegPCMAudio(song.audio, **options)
+        Metrics.ffmpeg_spawns.inc()
+        return source, stderr
+
+    async def __watchdog(self) -> None:
+        """
+        Samples the resources of the playing Song's ffmpeg process and restarts it where it left off if it stops producing audio.
+        """
+        while True:
+            await asyncio.sleep(Player.WATCHDOG_INTERVAL)
+            audio = self.audio
+            if audio is None:
+                continue
+            audio.sample()
+            # Nothing is read while paused or reconnecting, that isn't a stall
+            if self.vc.is_paused() or not self.vc.is_connected():
+                audio.last_read = time.monotonic()
+                continue
+            stalled = time.monotonic() - audio.last_read
+            if stalled >= float(os.environ.get('ffmpeg_stall_seconds', 10)):
+                await self.__restart_audio(audio, f'no audio for {stalled:.0f}s', 'stall')
+
+    async def __restart_audio(self, audio: PlayerAudio, why: str, reason: str) -> None:
+        """
+        Replaces the ffmpeg process of the playing Song with one starting where the old one stopped.
+
+        Parameters
+        ----------
+        audio : `PlayerAudio`
+            The source of the Song, nothing happens if the Song changed since.
+        why : `str`
+            What went wrong, for the logs.
+        reason : `str`
+            The label the restart is counted under in the metrics.
+        """
+        guild_id = self.vc.guild.id
+        if audio.restarts >= Player.MAX_RESTARTS:
+            Utils.pront(f"ffmpeg for {self.song.title} failed again ({why}) after {audio.restarts} restarts, skipping it", 'ERROR', guild_id=guild_id, song_id=self.song.id)
+            self.vc.stop()
+            return
+        position = audio.position()
+        Utils.pront(f"ffmpeg for {self.song.title} {why}, restarting at {position:.1f}s"
+                    + (f", it said:\n{audio.stderr.tail()}" if audio.stderr is not None and audio.stderr.tail() else ''),
+                    'WARNING', guild_id=guild_id, song_id=self.song.id)
+        # Counted even if the new process fails too, so a Song that can't be played gets skipped
+        audio.restarts += 1
+        if await self.__respawn(audio, position):
+            Metrics.ffmpeg_restarts.inc(reason)
+
+    async def __preparer(self) -> None:
+        """
+        Spawns the next Song's ffmpeg process shortly before the current Song ends and reads its first frame,
+        so the next Song starts without waiting on yt-dlp, ffmpeg starting or it probing the input.
+        If the guild has crossfade on, the next Song is faded in from it.
+
+        The Song that comes next can change until the last moment (ie: skips, /move, /shuffle),
+        a process spawned for a Song that isn't next anymore is thrown away and the right one is spawned.
+        """
+        while True:
+            await asyncio.sleep(Player.WATCHDOG_INTERVAL)
+            song = self.song
+            if self.audio is None or not song.duration or song.get_elapsed_time() < song.duration - Player.PREPARE_SECONDS:
+                continue
+            upcoming = self.__upcoming()
+            if upcoming is not self.next_song:
+                self.__discard_next()
+                if upcoming is None:
+                    continue
+                await self.__prepare(upcoming)
+            await self.__crossfade()
+
+    def __upcoming(self) -> Song | None:
+        """
+        The Song that plays once the current one ends, None if the Queue is empty.
+        """
+        # The looping Song is put back on top of the Queue once it ends
+        return self.song if self.looping else next(iter(self.queue.get()), None)
+
+    async def __crossfade(self) -> None:
+        """
+        Fades the current Song into the prepared next one over the guild's crossfade setting, once it's that close to the end.
+        """
+        audio, song = self.audio, self.song
+        if audio is None or self.next_audio is None or isinstance(self.vc.source, CrossfadeAudio):
+            return
+        seconds = DB.GuildSettings.get(self.vc.guild.id, setting='crossfade')
+        remaining = song.duration - song.get_elapsed_time()
+        if not seconds or remaining > seconds + Player.WATCHDOG_INTERVAL:
+            return
+        await asyncio.sleep(max(remaining - seconds, 0))
+        # Swapping the source resumes discord.py's player, it can't happen while paused
+        if audio is not self.audio or self.next_audio is None or self.next_song is not self.__upcoming() or not self.vc.is_playing():
+            return
+        frames = int(min(seconds, song.duration - song.get_elapsed_time()) / PlayerAudio.FRAME_SECONDS)
+        if frames <= 0:
+            return
+        Utils.pront(f"crossfading {song.title} into {self.next_song.title} over {frames * PlayerAudio.FRAME_SECONDS:.1f}s",
+                    guild_id=self.vc.guild.id, song_id=song.id)
+        fade = CrossfadeAudio(audio, self.next_audio, frames)
+        fade.on_faded = self.__faded
+        self.vc.source = fade
+
+    async def __prepare(self, song: Song) -> None:
+        """
+        Spawns the ffmpeg process of a Song and reads its first frame, storing it as next_audio.
+
+        Parameters
+        ----------
+        song : `Song`
+            The Song that plays next.
+        """
+        # Claimed right away so the Song isn't prepared twice while this waits
+        self.next_song = song
+        if song.source in ('Youtube', 'Soundcloud') and (song.expiry_epoch is None or song.expiry_epoch - time.time() < Player.URL_REFRESH_MARGIN):
+            try:
+                await song.populate()
+            except Exception as e:
+                # The Player tries again when the Song comes up, and tells the channel if it still fails
+                Utils.pront(f"Could not populate {song.title} ahead of time: {e!r}", 'WARNING', guild_id=self.vc.guild.id, song_id=song.id)
+                return
+        if song is not self.next_song or not song.audio:
+            return
+        source, stderr = self.__spawn(song.start_offset, song)
+        try:
+            frame = await asyncio.wait_for(asyncio.to_thread(source.read), float(os.environ.get('ffmpeg_stall_seconds', 10)))
+        except asyncio.TimeoutError:
+            frame = None
+        # ie: the Player was cleaned meanwhile, the process isn't anyone's to clean up yet
+        except asyncio.CancelledError:
+            source.cleanup()
+            raise
+        if not frame or song is not self.next_song:
+            source.cleanup()
+            return
+        self.next_audio = PlayerAudio(source, offset=song.start_offset, stderr=stderr, first_frame=frame)
+        Utils.pront(f"{song.title} is ready to play next", guild_id=self.vc.guild.id, song_id=song.id)
+
+    def __discard_next(self) -> None:
+        """
+        Kills the ffmpeg process spawned for the next Song, if there is one.
+        """
+        if self.next_audio is not None:
+            self.next_audio.cleanup()
+        self.next_audio = None
+        self.next_song = None
+
+    async def __url_refresher(self) -> None:
+        """
+        Resolves the playing Song's stream URL again before it expires and moves playback over to the fresh one,
+        so media longer than a URL lasts (ie: hours long mixes on YouTube) plays to the end.
+        """
+        retry_at = 0
+        while True:
+            await asyncio.sleep(Player.WATCHDOG_INTERVAL)
+            audio, song = self.audio, self.song
+            if audio is None or song.expiry_epoch is None or time.time() < max(retry_at, song.expiry_epoch - Player.URL_REFRESH_MARGIN):
+                continue
+            retry_at = time.time() + Player.URL_REFRESH_RETRY
+            Utils.pront(f"stream URL of {song.title} expires in {song.expiry_epoch - time.time():.0f}s, resolving it again",
+                        guild_id=self.vc.guild.id, song_id=song.id)
+            try:
+                await song.populate()
+            except Exception as e:
+                Utils.pront(f"Could not refresh the stream URL of {song.title}: {e!r}", 'WARNING', guild_id=self.vc.guild.id, song_id=song.id)
+                continue
+            if await self.__respawn(audio, audio.position(), follow=True):
+                Metrics.ffmpeg_restarts.inc('url_refresh')
+
+    async def __respawn(self, audio: PlayerAudio, position: float, follow: bool = False) -> bool:
+        """
+        Swaps a new ffmpeg process starting at a position into the playing Song's source.
+
+        Every restart at a position goes through here: seeking, stall recovery and refreshing the stream URL.
+        The old process keeps playing until the new one has decoded its first frame, so there's no silence in between.
+
+        Parameters
+        ----------
+        audio : `PlayerAudio`
+            The source of the Song, nothing happens if the Song changed since.
+        position : `float`
+            The seconds into the Song the new process starts at.
+        follow : `bool`, optional
+            Whether to skip the new process ahead by however much the old one played while it started,
+            so playback carries on without repeating anything.  Livestreams start at the live edge regardless.
+
+        Returns
+        -------
+        bool
+            Whether the new process was swapped in.
+        """
+        song = self.song
+        # The stream URL may have expired, which is often why ffmpeg stalled
+        if song.expiry_epoch is not None and song.expiry_epoch - time.time() < 30:
+            try:
+                await song.populate()
+            except Exception as e:
+                Utils.pront(f"Could not refresh {song.title} to restart it: {e!r}", 'ERROR', guild_id=self.vc.guild.id, song_id=song.id)
+        if audio is not self.audio or song is not self.song:
+            return False
+        source, stderr = self.__spawn(position)
+        # A livestream can't be read ahead of real time, there would be no catching up
+        follow = follow and not song.is_live
+
+        def first_frame() -> tuple[bytes, float]:
+            frame, offset = source.read(), position
+            # Frames the new process decodes ahead of real time are read right away, catching up costs a few milliseconds
+            while follow and frame and audio.position() - offset >= PlayerAudio.FRAME_SECONDS:
+                frame, offset = source.read(), offset + PlayerAudio.FRAME_SECONDS
+            return frame, offset
+
+        try:
+            frame, offset = await asyncio.wait_for(asyncio.to_thread(first_frame), float(os.environ.get('ffmpeg_stall_seconds', 10)))
+        except asyncio.TimeoutError:
+            frame = None
+        # ie: the Player was cleaned meanwhile, the process isn't anyone's to clean up yet
+        except asyncio.CancelledError:
+            source.cleanup()
+            raise
+        # Killing the process also ends a read the thread is still stuck in
+        if not frame or audio is not self.audio or song is not self.song:
+            if not frame:
+                Utils.pront(f"the new ffmpeg for {song.title} produced no audio at {position:.1f}s"
+                            + (f", it said:\n{stderr.tail()}" if stderr is not None and stderr.tail() else ''),
+                            'WARNING', guild_id=self.vc.guild.id, song_id=song.id)
+            source.cleanup()
+            return False
+        return audio.swap(source, offset, stderr, frame)
+
     async def __last_np_message_handler(self):
         """
         Runs logic for the last_np_message variable, deciding whether to delete it, to change it to a breadcrumb, or to do nothing.
         """
+        # A view without a timeout is kept by discord.py, and keeps the Player alive, until it is stopped
+        if self.np_view is not None:
+            self.np_view.stop()
+            self.np_view = None
         if not self.last_np_message:
             return
         if DB.GuildSettings.get(self.vc.guild.id, setting='song_breadcrumbs'):
@@ -229,51 +776,98 @@ class Player:
                 
                 # Get the next song in queue
                 self.song = self.queue.remove(0)
+                dequeued_at = time.perf_counter()
 
-                # Run logic for the previous np (if it exists)
-                await self.__last_np_message_handler()
+                # Take the source spawned ahead of time, unless it's for a Song that isn't next anymore
+                prepared = self.next_audio if self.next_song is self.song else None
+                # A crossfade that is over keeps discord.py's player going on the prepared source
+                fade = self.vc.source if isinstance(self.vc.source, CrossfadeAudio) else None
+                handed_over = prepared is not None and fade is not None and fade.incoming is prepared
+                if self.next_audio is not None and prepared is None:
+                    Utils.pront(f"{self.next_song.title} was spawned to play next but {self.song.title} is, starting it instead", guild_id=self.vc.guild.id)
+                    if fade is not None:
+                        self.vc.stop()
+                    self.next_audio.cleanup()
+                self.next_audio = None
+                self.next_song = None
 
                 # Update send location preference
                 self.send_location = self.vc.channel if DB.GuildSettings.get(self.vc.guild.id, setting='np_sent_to_vc') else self.song.channel
 
-                # If the song will expire while playing
-                if self.song.expiry_epoch is not None and self.song.expiry_epoch - time.time() - self.song.duration < 30:
-                    self.song.expiry_epoch = None
-
-                # Only repopulate YouTube links
-                if self.song.expiry_epoch is None and self.song.source in ('Youtube', 'Soundcloud'):
-                    Utils.pront(f"populating {self.song.title} within player")
-                    # Populate the song again to refresh the timer
-                    try:
-                        await self.song.populate()
-                    # If anything goes wrong, just skip it. (bad form but I am *not* enumerating every single error that can be raised by yt_dlp here)
-                    except Exception as e:
-                        errored_song = self.song
-                        await errored_song.channel.send(f"Song {errored_song.title} -- {errored_song.uploader} ({errored_song.original_url}) failed to load because of ```ansi\n{e}``` and was skipped.")
-                        continue
-                    
-                    # If the song gained an expiry epoch (will not happen for soundcloud)
-                    if self.song.expiry_epoch:
-                        # If even after repopulating, the song was going to pass the expiry time
-                        if self.song.expiry_epoch - time.time() - self.song.duration < 30:
-                            await self.song.channel.send(f"Song {self.song.title} -- {self.song.uploader} ({self.song.original_url}) was unable to load because it would expire before playback completed (too long)")
+                # Everything up to the first audio is part of the trace of the command that queued the Song
+                with Tracer.use(self.song.trace_id), Tracer.span('player.start', guild_id=self.vc.guild.id, source=self.song.source,
+                                                                  prepared=prepared is not None) as span:
+                    # A stream URL that expires soon is resolved again now rather than right after the Song starts
+                    if prepared is None and self.song.expiry_epoch is not None and self.song.expiry_epoch - time.time() < Player.URL_REFRESH_MARGIN:
+                        self.song.expiry_epoch = None
+
+                    # Only repopulate YouTube links
+                    cache = 'prepared' if prepared is not None else 'none'
+                    populate_seconds = None
+                    if prepared is None and self.song.source in ('Youtube', 'Soundcloud'):
+                        cache = 'miss' if self.song.expiry_epoch is None else 'hit'
+                        Metrics.cache_lookups.inc('stream_url', cache)
+                    if prepared is None and self.song.expiry_epoch is None and self.song.source in ('Youtube', 'Soundcloud'):
+                        Utils.pront(f"populating {self.song.title} within player", guild_id=self.vc.guild.id, song_id=self.song.id)
+                        # Populate the song again to refresh the timer
+                        populate_start = time.perf_counter()
+                        try:
+                            await self.song.populate()
+                            populate_seconds = time.perf_counter() - populate_start
+                        # If anything goes wrong, just skip it. (bad form but I am *not* enumerating every single error that can be raised by yt_dlp here)
+                        except Exception as e:
+                            errored_song = self.song
+                            await errored_song.channel.send(f"Song {errored_song.title} -- {errored_song.uploader} ({errored_song.original_url}) failed to load because of ```ansi\n{e}``` and was skipped.")
                             continue
+                    # Songs that outlast their stream URL are moved over to a fresh one by __url_refresher
                 
 
-                # Clear player_song_end here because this is when we start playing audio again
-                self.player_song_end.clear()
+                    # Clear player_song_end here because this is when we start playing audio again
+                    self.player_song_end.clear()
+
+                    # Begin playing audio into Discord, from where a t= link or a reset asked for
+                    offset, self.song.start_offset = self.song.start_offset, 0.0
+                    on_first_read = self.__first_read_callback(span, dequeued_at, cache, populate_seconds)
+                    if handed_over:
+                        # The Song has been audible since the fade started
+                        on_first_read()
+                        self.audio = prepared
+                    elif prepared is not None:
+                        prepared.on_first_read = on_first_read
+                        self.audio = prepared
+                    else:
+                        with Tracer.span('ffmpeg.spawn', offset=offset):
+                            source, stderr = self.__spawn(offset)
+                            self.audio = PlayerAudio(source, offset=offset, stderr=stderr, on_first_read=on_first_read)
+                    self.song.start(self.audio)
+                    if handed_over:
+                        # Swapping the source resumes discord.py's player
+                        paused = self.vc.is_paused()
+                        self.vc.source = self.audio
+                        if paused:
+                            self.vc.pause()
+                    else:
+                        self.vc.play(self.audio, after=self.__song_complete)
+                    # () implicit parenthesis
 
-                self.song.start()
+                # Run logic for the previous np (if it exists), after starting the Song so it doesn't add to the gap
+                await self.__last_np_message_handler()
 
-                # Begin playing audio into Discord
-                self.vc.play(discord.FFmpegPCMAudio(self.song.audio, **YTDLInterface.ffmpeg_options), after=self.__song_complete)
-                # () implicit parenthesis
+                # Report the timings of the /play that created this Player, the total is its time-to-audio
+                if self.song.request_timer is not None:
+                    Utils.pront(self.song.request_timer.summary())
+                    self.song.request_timer = None
 
                 # Send the new NP
-                self.last_np_message = await self.send_location.send(silent=True, embed=Utils.get_now_playing_embed(self), view=Buttons.NowPlayingView(self))
+                self.np_view = Buttons.NowPlayingView(self)
+                self.last_np_message = await self.send_location.send(silent=True, embed=Utils.get_now_playing_embed(self), view=self.np_view)
 
                 # Sleep player until song ends
                 await self.player_song_end.wait()
+                # discord.py cleans up the source it stops on, one that ended in a crossfade is left to the Player
+                self.audio.cleanup()
+                self.audio = None
+                self.song.finish()
 
                 # If song is looping, re-add song to the top of queue
                 if self.looping:
@@ -309,15 +903,56 @@ class Player:
         # Immediately remove the Player from Servers to avoid a race condition
         # which leads to the defunct player being re-used
         Servers.remove(self)
+        # The voice client keeps the after callback, and with it the Player, until its audio is stopped
+        self.vc.stop()
+        self.__discard_next()
+        if self.song is not None:
+            self.song.finish()
         if self.vc.is_connected():
             await self.vc.disconnect()
         # Run logic on the to-be defunct np
         await self.__last_np_message_handler()
+        # A breadcrumb is left behind for good, the Player doesn't need it anymore
+        self.last_np_message = None
+        LeakTracker.release(self)
         # Needs to be after all awaited logic or the task closing will stop cleaning
         # (if it was initiated by the Player)
-        self.player_task.cancel()
+        self.tasks.cancel()
         #TODO try putting del self here
 
+    async def seek(self, position: float) -> bool:
+        """
+        Moves the playing Song to a position by swapping in an ffmpeg process that starts there.
+
+        The old process keeps playing until the swap, a paused Song stays paused at the new position.
+
+        Parameters
+        ----------
+        position : `float`
+            The seconds into the Song to move to.
+
+        Returns
+        -------
+        bool
+            False if there was no Song playing to seek in.
+        """
+        audio = self.audio
+        if audio is None:
+            return False
+        # The next Song was already fading in, it would start partway through
+        if isinstance(self.vc.source, CrossfadeAudio):
+            # Once the fade is over so is the Song, the next one is already playing
+            if self.vc.source.is_faded():
+                return False
+            paused = self.vc.is_paused()
+            self.vc.source = audio
+            # Setting the source resumes discord.py's player
+            if paused:
+                self.vc.pause()
+            self.__discard_next()
+        Utils.pront(f"seeking {self.song.title} to {position:.1f}s", guild_id=self.vc.guild.id, song_id=self.song.id)
+        return await self.__respawn(audio, max(position, 0.0))
+
     def is_playing(self) -> bool:
         """
         Whether the player is playing audio or in-between songs. Pausing the Song does not effect this.
@@ -342,9 +977,13 @@ class Player:
     def resume(self) -> None:
         """
         Resumes the player.
+
+        A livestream rejoins the live edge, rather than carrying on from where it was paused.
         """
         self.vc.resume()
         self.song.resume()
+        if self.song.is_live and self.audio is not None:
+            self.tasks.create(self.__respawn(self.audio, self.audio.position()), 'rejoin')
 
     def set_loop(self, state: bool) -> None:
         """
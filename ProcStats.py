@@ -0,0 +1,116 @@
+import os
+
+
+class ProcStats:
+    """
+    Static class that reads the CPU time and memory usage of processes from /proc.
+
+    Only works on Linux, every method returns None or an empty list elsewhere.
+
+    ...
+
+    Methods
+    -------
+    cpu_seconds(pid: `int` | `str`):
+        The user and system CPU time a process has used.
+    rss_bytes(pid: `int` | `str`):
+        The resident memory of a process.
+    children(pid: `int` | `str`):
+        The ids of a process's direct children.
+    name(pid: `int` | `str`):
+        The executable name of a process.
+    """
+    CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+    PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+    @staticmethod
+    def cpu_seconds(pid: int | str = 'self') -> float | None:
+        """
+        The user and system CPU time a process has used.
+
+        Parameters
+        ----------
+        pid : `int` | `str`, optional
+            The process id, defaults to this process.
+
+        Returns
+        -------
+        float or None
+            The CPU seconds used, None if the process doesn't exist.
+        """
+        try:
+            with open(f'/proc/{pid}/stat', 'r') as f:
+                stat = f.read()
+        except OSError:
+            return None
+        # The name can contain spaces, every field after it is space separated
+        fields = stat[stat.rfind(')') + 2:].split()
+        return (int(fields[11]) + int(fields[12])) / ProcStats.CLOCK_TICKS
+
+    @staticmethod
+    def rss_bytes(pid: int | str = 'self') -> int | None:
+        """
+        The resident memory of a process.
+
+        Parameters
+        ----------
+        pid : `int` | `str`, optional
+            The process id, defaults to this process.
+
+        Returns
+        -------
+        int or None
+            The resident set size in bytes, None if the process doesn't exist.
+        """
+        try:
+            with open(f'/proc/{pid}/statm', 'r') as f:
+                return int(f.read().split()[1]) * ProcStats.PAGE_SIZE
+        except OSError:
+            return None
+
+    @staticmethod
+    def children(pid: int | str = 'self') -> list[int]:
+        """
+        The ids of a process's direct children.
+
+        Parameters
+        ----------
+        pid : `int` | `str`, optional
+            The process id, defaults to this process.
+
+        Returns
+        -------
+        list[int]
+            The ids of every child process.
+        """
+        if pid == 'self':
+            pid = os.getpid()
+        children = []
+        try:
+            for task in os.listdir(f'/proc/{pid}/task'):
+                with open(f'/proc/{pid}/task/{task}/children', 'r') as f:
+                    children.extend(int(child) for child in f.read().split())
+        except OSError:
+            return []
+        return children
+
+    @staticmethod
+    def name(pid: int | str = 'self') -> str | None:
+        """
+        The executable name of a process.
+
+        Parameters
+        ----------
+        pid : `int` | `str`, optional
+            The process id, defaults to this process.
+
+        Returns
+        -------
+        str or None
+            The name of the process, None if the process doesn't exist.
+        """
+        try:
+            with open(f'/proc/{pid}/comm', 'r') as f:
+                return f.read().strip()
+        except OSError:
+            return None
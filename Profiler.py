@@ -0,0 +1,147 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class SamplingProfiler:
+    """
+    A class that profiles every thread of the process by periodically sampling their stacks.
+
+    Nothing runs outside of run(), so an idle profiler costs nothing.
+    The samples are kept as collapsed stacks, one `thread;outer;...;inner count` line per unique stack,
+    which is the format flamegraph.pl, speedscope and most flame graph tools read.
+
+    ...
+
+    Attributes
+    ----------
+    interval : `float`
+        The seconds between samples.
+    stacks : `Counter[tuple[str, ...]]`
+        How many times every stack was seen, outermost frame first, the thread's name is the first frame.
+    samples : `int`
+        How many times the threads were sampled.
+
+    Methods
+    -------
+    run(seconds: `float`):
+        Samples every thread for a number of seconds, blocking the calling thread.
+    collapsed():
+        The samples as collapsed stack lines.
+    top(count: `int`, inclusive: `bool`):
+        The functions seen the most.
+    """
+    # Where threads sit when they are waiting rather than working, left out of top()
+    IDLE_FUNCTIONS = {'select', 'poll', 'wait', 'get', 'sleep', 'accept', '_wait_for_tstate_lock', 'run_forever', '_worker'}
+    STDLIB_DIR = os.path.dirname(os.__file__)
+    # Seconds, only while profiling
+    SWITCH_INTERVAL = 0.0002
+
+    def __init__(self, interval: float = 0.01) -> None:
+        """
+        Creates a SamplingProfiler object.
+
+        Parameters
+        ----------
+        interval : `float`, optional
+            The seconds between samples.
+        """
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.__idle = set()
+        self.__stdlib = set()
+
+    def run(self, seconds: float) -> None:
+        """
+        Samples every thread for a number of seconds, blocking the calling thread.
+
+        The calling thread is left out of the samples, run it with asyncio.to_thread to profile the event loop.
+
+        Parameters
+        ----------
+        seconds : `float`
+            How long to profile for.
+        """
+        me = threading.get_ident()
+        deadline = time.perf_counter() + seconds
+        # The sampler can only look once the running thread lets go of the GIL, by default that's mostly when it
+        # goes idle, so busy code would hardly ever be seen.  Making threads take turns more often fixes that
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(switch_interval, SamplingProfiler.SWITCH_INTERVAL))
+        try:
+            while time.perf_counter() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    stack = self.__stack(frame, names.get(ident, f'thread-{ident}'))
+                    self.stacks[stack] += 1
+                self.samples += 1
+                time.sleep(self.interval)
+        finally:
+            sys.setswitchinterval(switch_interval)
+
+    def __stack(self, frame, thread_name: str) -> tuple[str, ...]:
+        """
+        Turns a frame into a tuple of function names, outermost first, headed by the thread's name.
+        """
+        frames = []
+        leaf = True
+        while frame is not None:
+            code = frame.f_code
+            name = f"{getattr(code, 'co_qualname', code.co_name)} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            # Installed packages live inside the standard library's directory too
+            if code.co_filename.startswith(SamplingProfiler.STDLIB_DIR) and 'site-packages' not in code.co_filename:
+                self.__stdlib.add(name)
+                if leaf and code.co_name in SamplingProfiler.IDLE_FUNCTIONS:
+                    self.__idle.add(name)
+            leaf = False
+            frames.append(name)
+            frame = frame.f_back
+        frames.append(thread_name)
+        return tuple(reversed(frames))
+
+    def collapsed(self) -> str:
+        """
+        The samples as collapsed stack lines.
+
+        Returns
+        -------
+        str
+            One `frame;frame;frame count` line per unique stack, most seen first.
+        """
+        # Semicolons separate frames in the format
+        return ''.join(f"{';'.join(frame.replace(';', ',') for frame in stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top(self, count: int = 10, inclusive: bool = False) -> list[tuple[str, float]]:
+        """
+        The functions seen the most, leaving out threads that were waiting in the standard library.
+
+        Parameters
+        ----------
+        count : `int`, optional
+            How many functions to return.
+        inclusive : `bool`, optional
+            Whether to count the time spent in the functions a function called, instead of only the function itself.
+            Standard library functions are left out, otherwise thread and event loop plumbing tops the list.
+
+        Returns
+        -------
+        list[tuple[str, float]]
+            The functions and the share of samples they were seen in, from 0 to 1.
+        """
+        totals = Counter()
+        for stack, seen in self.stacks.items():
+            # The thread name isn't a function
+            frames = stack[1:]
+            if not frames or frames[-1] in self.__idle:
+                continue
+            if inclusive:
+                for frame in set(frames) - self.__stdlib:
+                    totals[frame] += seen
+            else:
+                totals[frames[-1]] += seen
+        return [(frame, seen / self.samples) for frame, seen in totals.most_common(count)] if self.samples else []
@@ -1,8 +1,12 @@
+from __future__ import annotations
+import re
 import time
+from urllib.parse import parse_qs, urlparse
 
 from discord import Member, Interaction
 from Vote import Vote
 from YTDLInterface import YTDLInterface
+from Tracing import Tracer
 
 
 class Song:
@@ -36,11 +40,23 @@ class Song:
         The URL to the highest-resolution thumbnail available.
     duration : `int` | `None`
         The duration of the media in seconds, if it is available.
+    is_live : `bool`
+        Whether the media is a livestream that is currently live, livestreams have no duration.
     original_url : `str` | `None`
         The upstream URL of the media, if it exists.  This may or may not differ from link.   
     expiry_epoch : `int` | `None`
         The unix timestamp at which the Song will need to repopulate itself.
         Will be a NoneType unless the song has been populated
+    request_timer : `PhaseTimer` | `None`
+        The timings of the /play that created the Song, the Player finishes and reports them when playback starts.
+    trace_id : `str` | `None`
+        The trace of the command that created the Song, the Player continues it when the Song starts.
+    playback : `PlayerAudio` | `None`
+        The source the Song is playing through, the frames it read give the elapsed time.
+        Let go of once the Song finishes, so Songs kept around after playing don't hold their ffmpeg process.
+    start_offset : `float`
+        The seconds into the media the next playback of the Song starts at, ie: from a t= link.
+        The Player sets it back to 0 once it starts the Song.
     
     Class Methods
     -------------
@@ -53,12 +69,14 @@ class Song:
         Fills the Song with up-to-date information from original_url.
     create_vote(member: `discord.Member`)
         Creates a vote to track how many users wish to skip the Song.
-    start():
+    start(playback: `PlayerAudio` | `None`):
         Starts the Song's internal timer for it's elapsed time.
     pause():
         Alerts the Song that it has been paused to keep it's elapsed time accurate.
     resume():
         Alerts the Song that it has been resumed to keep it's elapsed time accurate.
+    finish():
+        Alerts the Song that it has finished playing, resetting it's elapsed time.
     get_elapsed_time():
         Gets the Song's elapsed time in seconds.
 
@@ -68,7 +86,15 @@ class Song:
         Parses a duration in seconds into a longer, human readable format.
     parse_duration_short_hand(duration : `int` | `None`):
         Parses a duration in seconds into a shorter human readable xx:xx:xx:xx format.
+    parse_timestamp(timestamp : `str`):
+        Parses a timestamp like 1:30, 90 or 1m30s into seconds.
+    parse_link_offset(link : `str`):
+        Parses the offset a link asks playback to start at, ie: the t= of a YouTube link.
     """
+    # expire=1700000000 on YouTube, /expire/1700000000/ in YouTube's HLS manifests and "expires":1700000000 in Twitch's tokens
+    EXPIRY_EPOCH = re.compile(r'expires?(?:=|/|%22%3A|":)(\d{10})')
+    TIMESTAMP_UNITS = re.compile(r'(?:(\d+)h)?(?:(\d+)m)?(?:(\d+(?:\.\d+)?)s?)?')
+
     def __init__(self, interaction: Interaction, link: str, dict: dict):
         """
         Creates a Song from a dictionary containing specific key:value pairs that match the output of yt-dlp.
@@ -86,6 +112,8 @@ class Song:
         self.requester = interaction.user
         self.channel = interaction.channel
         self.vote = None
+        self.request_timer = None
+        self.trace_id = Tracer.current_trace()
 
         # If there's an unexpected list of entries
         if dict.get('entries') is not None and len(dict.get('entries')) > 0:
@@ -120,8 +148,11 @@ class Song:
         # Cast the duration to an integer
         if self.duration:
             self.duration = int(self.duration)
+        self.is_live = Song.__parse_is_live(dict)
 
-        # Delta time handling variables
+        # Delta time handling variables, only used until the first frame is read
+        self.playback = None
+        self.start_offset = 0.0
         self.start_time = 0
         self.pause_start = 0
         self.pause_time = 0
@@ -156,7 +187,10 @@ class Song:
         Fills the Song with up-to-date information from original_url.
         Necessary with YouTube media after a certain amount of time, as the audio URL from yt-dlp expires.
         """
-        data = await YTDLInterface.scrape_link(self.original_url)
+        with Tracer.span('song.populate') as span:
+            data = await YTDLInterface.scrape_link(self.original_url)
+            if span is not None:
+                span.attributes['source'] = data.get('extractor_key')
         # If there's an unexpected list of entries
         if data.get('entries') is not None and len(data.get('entries')) > 0:
             # Get the first result and continue as normal
@@ -171,6 +205,7 @@ class Song:
         # Cast the duration to an integer
         if self.duration:
             self.duration = int(self.duration)
+        self.is_live = Song.__parse_is_live(data)
             
         self.original_url = data.get('webpage_url')
         if self.audio:
@@ -187,36 +222,76 @@ class Song:
         """
         self.vote = Vote(member)
 
-    def start(self) -> None:
+    def start(self, playback: PlayerAudio | None = None) -> None:
         """
         Starts the Song's internal timer for it's elapsed time.
+
+        Parameters
+        ----------
+        playback : `PlayerAudio` | `None`, optional
+            The source the Song is about to play through, once it reads a frame the elapsed time is counted in frames.
         """
-        self.start_time = time.time()
+        self.playback = playback
+        self.start_time = time.monotonic()
+        self.pause_start = 0
         self.pause_time = 0
 
     def pause(self) -> None:
         """
         Alerts the Song that it has been paused to keep it's elapsed time accurate.
         """
-        self.pause_start = time.time()
+        self.pause_start = time.monotonic()
 
     def resume(self) -> None:
         """
         Alerts the Song that it has been resumed to keep it's elapsed time accurate.
         """
-        self.pause_time += time.time() - self.pause_start
+        if self.pause_start:
+            self.pause_time += time.monotonic() - self.pause_start
+        self.pause_start = 0
+
+    def finish(self) -> None:
+        """
+        Alerts the Song that it has finished playing, resetting it's elapsed time.
+
+        Looped Songs, history and breadcrumbs keep the Song around, but not the source it played through.
+        """
+        self.playback = None
+        self.start_time = 0
         self.pause_start = 0
+        self.pause_time = 0
 
-    def get_elapsed_time(self) -> int:
+    def is_started(self) -> bool:
+        """
+        Whether the Song has been started.
+
+        Returns
+        -------
+        bool
+            True once start() has been called.
+        """
+        return self.start_time != 0
+
+    def get_elapsed_time(self) -> float:
         """
         Gets the Song's elapsed time in seconds.
 
+        Counted from the 20ms frames that were actually sent, so time spent paused, buffering or stalled
+        doesn't count, wall clock time is only used until the first frame is read.
+        Playback that started at an offset, or was seeked, counts from there.
+
         Returns
         -------
-        seconds : int
+        seconds : float
             The number of seconds that the song has played for.
         """
-        return time.time() - (self.start_time + self.pause_time + ((time.time() - self.pause_start)if self.pause_start else 0))
+        if self.playback is not None and self.playback.frames:
+            return self.playback.position()
+        if not self.start_time:
+            return 0
+        now = time.monotonic()
+        offset = self.playback.position() if self.playback is not None else 0
+        return offset + now - (self.start_time + self.pause_time + ((now - self.pause_start) if self.pause_start else 0))
 
     @staticmethod
     def __parse_expiry_epoch(url: str) -> int | None:
@@ -232,11 +307,28 @@ class Song:
         epoch : int or None
             The epoch at which the url will expire. Otherwise, None If the epoch was unable to be parsed from the URL
         """
-        url = url[url.find('expire=') + 7: url.find('&')]
-        if not url.isnumeric():
+        match = Song.EXPIRY_EPOCH.search(url)
+        if match is None:
             return None
         
-        return int(url)
+        return int(match.group(1))
+
+    @staticmethod
+    def __parse_is_live(data: dict) -> bool:
+        """
+        Parses whether yt-dlp's output is of a livestream that is currently live.
+
+        Parameters
+        ----------
+        data : `dict`
+            The dict containing yt-dlp's output, playlist entries only have live_status.
+
+        Returns
+        -------
+        bool
+            True if the media is live, a finished stream is played like any other video.
+        """
+        return bool(data.get('is_live')) or data.get('live_status') == 'is_live'
 
 
     @staticmethod
@@ -304,6 +396,65 @@ class Song:
         duration.append(f'{seconds:02d}')
 
         return ':'.join(duration)
+
+    @staticmethod
+    def parse_timestamp(timestamp: str) -> float | None:
+        """
+        Parses a timestamp into seconds.
+
+        Parameters
+        ----------
+        timestamp : `str`
+            The timestamp, either colon separated (1:30, 1:02:30), in units (1m30s, 1h2m) or plain seconds (90).
+
+        Returns
+        -------
+        float or None
+            The timestamp in seconds, None if it couldn't be parsed.
+        """
+        timestamp = timestamp.strip().lower()
+        if not timestamp:
+            return None
+        if ':' in timestamp:
+            parts = timestamp.split(':')
+            if len(parts) > 3 or not all(part.replace('.', '', 1).isdigit() for part in parts):
+                return None
+            seconds = 0.0
+            for part in parts:
+                seconds = seconds * 60 + float(part)
+            return seconds
+        match = Song.TIMESTAMP_UNITS.fullmatch(timestamp)
+        if match is None or not any(match.groups()):
+            return None
+        hours, minutes, seconds = (float(group) if group else 0 for group in match.groups())
+        return hours * 3600 + minutes * 60 + seconds
+
+    @staticmethod
+    def parse_link_offset(link: str) -> float:
+        """
+        Parses the offset a link asks playback to start at.
+
+        Understands the t= and start= query parameters (YouTube, SoundCloud uses t=1:30) and #t= fragments.
+
+        Parameters
+        ----------
+        link : `str`
+            The link given to /play, search queries have no offset.
+
+        Returns
+        -------
+        float
+            The offset in seconds, 0 if the link doesn't have one.
+        """
+        if '://' not in link:
+            return 0.0
+        url = urlparse(link)
+        params = parse_qs(url.query)
+        params.update(parse_qs(url.fragment))
+        for key in ('t', 'start'):
+            if params.get(key):
+                return Song.parse_timestamp(params[key][0]) or 0.0
+        return 0.0
     
     def __eq__(self, other: "Song") -> bool:
         """
@@ -0,0 +1,348 @@
+import json
+import math
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Awaitable
+
+from Metrics import Metrics
+from Tracing import Tracer
+
+
+class PhaseTimer:
+    """
+    A class for timing the named phases of a longer process, ie: startup or a command.
+
+    Nested phases are subtracted from the phase that contains them so every phase reports its own time.
+
+    ...
+
+    Attributes
+    ----------
+    name : `str`
+        What is being timed.
+    phases : `dict[str, float]`
+        The seconds spent in each phase, in the order the phases were first entered.
+    start : `float`
+        The perf_counter() value the PhaseTimer was created at.
+
+    Methods
+    -------
+    phase(name: `str`):
+        Context manager that times the code within it as the named phase.
+    record(name: `str`, seconds: `float`):
+        Adds a duration that was measured elsewhere to a phase.
+    async measure(name: `str`, awaitable: `Awaitable`):
+        Awaits the awaitable and records how long it took, safe to use for phases running concurrently.
+    elapsed():
+        The seconds since the PhaseTimer was created.
+    summary():
+        A single line, human readable summary of the phases.
+    to_dict():
+        The timings as a JSON serializable dict.
+    """
+    def __init__(self, name: str, start: float | None = None) -> None:
+        """
+        Creates a PhaseTimer object.
+
+        Parameters
+        ----------
+        name : `str`
+            What is being timed.
+        start : `float` | `None`, optional
+            A perf_counter() value to count from, defaults to now.
+        """
+        self.name = name
+        self.start = time.perf_counter() if start is None else start
+        self.phases = {}
+        # Time spent in nested phases for every phase currently running
+        self.__stack = []
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Context manager that times the code within it as the named phase.
+
+        Parameters
+        ----------
+        name : `str`
+            The name of the phase.  Re-entering a phase adds to its time.
+        """
+        self.__stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            # Phases are also spans when they run within a trace
+            with Tracer.span(name):
+                yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self.__stack.pop()
+            # Let the containing phase know not to count this time as its own
+            if self.__stack:
+                self.__stack[-1] += elapsed
+            self.record(name, elapsed - nested)
+
+    def record(self, name: str, seconds: float) -> None:
+        """
+        Adds a duration that was measured elsewhere to a phase.
+
+        Parameters
+        ----------
+        name : `str`
+            The name of the phase.
+        seconds : `float`
+            The duration to add.
+        """
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    async def measure(self, name: str, awaitable: Awaitable) -> Any:
+        """
+        Awaits the awaitable and records how long it took, safe to use for phases running concurrently.
+
+        Unlike phase() this does not take part in nesting.
+
+        Parameters
+        ----------
+        name : `str`
+            The name of the phase.
+        awaitable : `Awaitable`
+            The awaitable to time.
+
+        Returns
+        -------
+        Any
+            The result of the awaitable.
+        """
+        start = time.perf_counter()
+        try:
+            with Tracer.span(name):
+                return await awaitable
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def elapsed(self) -> float:
+        """
+        The seconds since the PhaseTimer was created.
+
+        Returns
+        -------
+        float
+            The seconds since start.
+        """
+        return time.perf_counter() - self.start
+
+    def summary(self) -> str:
+        """
+        A single line, human readable summary of the phases.
+
+        Returns
+        -------
+        str
+            Every phase with its duration in milliseconds followed by the total.
+        """
+        phases = ', '.join(f'{name}: {seconds * 1000:.0f}ms' for name, seconds in self.phases.items())
+        return f'{self.name} took {self.elapsed() * 1000:.0f}ms ({phases})'
+
+    def to_dict(self) -> dict:
+        """
+        The timings as a JSON serializable dict.
+
+        Returns
+        -------
+        dict
+            The name, the seconds spent in each phase and the total seconds.
+        """
+        return {'name': self.name, 'phases': dict(self.phases), 'total': self.elapsed()}
+
+
+class Startup:
+    """
+    Static class that records how long each phase of startup took, to track time-to-ready across releases.
+
+    ...
+
+    Attributes
+    ----------
+    timer : `PhaseTimer`
+        The PhaseTimer that startup phases are recorded in.
+    finished : `bool`
+        Whether the bot has become ready and the timings have been saved.
+
+    Methods
+    -------
+    phase(name: `str`):
+        Context manager that times the code within it as a startup phase.
+    finish(file: `str`):
+        Marks startup as finished and appends the timings to a JSON lines file.
+    """
+    timer = PhaseTimer('startup')
+    finished = False
+
+    @staticmethod
+    def phase(name: str):
+        """
+        Context manager that times the code within it as a startup phase.
+
+        Parameters
+        ----------
+        name : `str`
+            The name of the phase.
+        """
+        return Startup.timer.phase(name)
+
+    @staticmethod
+    def finish(file: str = 'startup_times.jsonl') -> PhaseTimer:
+        """
+        Marks startup as finished and appends the timings to a JSON lines file.
+
+        Parameters
+        ----------
+        file : `str`, optional
+            The file to append the timings to.
+
+        Returns
+        -------
+        PhaseTimer
+            The startup PhaseTimer.
+        """
+        Startup.finished = True
+        entry = Startup.timer.to_dict()
+        entry['time'] = datetime.now().isoformat(timespec='seconds')
+        entry['release'] = Startup.__get_release()
+        try:
+            with open(file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+        except OSError:
+            pass
+        return Startup.timer
+
+    @staticmethod
+    def __get_release() -> str | None:
+        """
+        Gets the commit the bot is running from without spawning git.
+
+        Returns
+        -------
+        str or None
+            The commit hash, or the `release` value from the .env file if it is set.
+            None if neither could be found.
+        """
+        if os.environ.get('release'):
+            return os.environ.get('release')
+        try:
+            with open(os.path.join('.git', 'HEAD'), 'r', encoding='utf-8') as f:
+                head = f.read().strip()
+            if not head.startswith('ref: '):
+                return head
+            with open(os.path.join('.git', head[5:]), 'r', encoding='utf-8') as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+
+def percentiles(values: list[float], points: tuple[float, ...] = (50, 90, 99)) -> dict[str, float]:
+    """
+    Gets percentiles of a list of values using the nearest-rank method.
+
+    Parameters
+    ----------
+    values : `list[float]`
+        The values, they do not need to be sorted.
+    points : `tuple[float, ...]`, optional
+        The percentiles to get, from 0 to 100.
+
+    Returns
+    -------
+    dict[str, float]
+        The value at every percentile keyed by `p<point>` along with `max`.  Empty if there were no values.
+    """
+    if not values:
+        return {}
+    values = sorted(values)
+    ret = {f'p{point:g}': values[min(len(values) - 1, max(0, math.ceil(point / 100 * len(values)) - 1))] for point in points}
+    ret['max'] = values[-1]
+    return ret
+
+
+class PlaybackStats:
+    """
+    Static class that keeps rolling windows of how long Songs take to become audible and how long the silence between them is.
+
+    Every Song a Player starts is recorded once its first audio frame is read, keyed by guild,
+    by whether its stream URL could be reused (cache hit) or had to be extracted again (miss)
+    and by its source.  Songs from sources that are never repopulated are recorded as `none`.
+
+    ...
+
+    Attributes
+    ----------
+    recent : `deque[dict]`
+        The most recent Songs across every guild.
+    guilds : `dict[int, deque[dict]]`
+        The most recent Songs of every guild.
+
+    Methods
+    -------
+    record(guild_id: `int`, source: `str` | `None`, cache: `str`, first_audio: `float`, gap: `float` | `None`, populate: `float` | `None`):
+        Records a Song that just became audible.
+    summary(guild_id: `int` | `None`):
+        Percentiles of the time to first audio and the gap, by cache result and source.
+    """
+    recent = deque(maxlen=2000)
+    guilds = {}
+
+    @staticmethod
+    def record(guild_id: int, source: str | None, cache: str, first_audio: float, gap: float | None, populate: float | None) -> None:
+        """
+        Records a Song that just became audible, safe to call from the voice threads.
+
+        Parameters
+        ----------
+        guild_id : `int`
+            The guild the Song played in.
+        source : `str` | `None`
+            The extractor of the Song, ie: Youtube.
+        cache : `str`
+            hit, miss or none.
+        first_audio : `float`
+            Seconds from the Player taking the Song off the Queue to its first frame being read.
+        gap : `float` | `None`
+            Seconds from the previous Song ending to this one's first frame, None if nothing played before it.
+        populate : `float` | `None`
+            Seconds the Player spent repopulating the Song, None if it didn't.
+        """
+        entry = {'source': source or 'unknown', 'cache': cache, 'first_audio': first_audio, 'gap': gap, 'populate': populate}
+        PlaybackStats.recent.append(entry)
+        guild = PlaybackStats.guilds.get(guild_id)
+        if guild is None:
+            guild = PlaybackStats.guilds.setdefault(guild_id, deque(maxlen=200))
+        guild.append(entry)
+        Metrics.first_audio_seconds.observe(entry['cache'], entry['source'], value=first_audio)
+        if gap is not None:
+            Metrics.song_gap_seconds.observe(entry['cache'], entry['source'], value=gap)
+
+    @staticmethod
+    def summary(guild_id: int | None = None) -> dict[tuple[str, str], dict]:
+        """
+        Percentiles of the time to first audio and the gap, by cache result and source.
+
+        Parameters
+        ----------
+        guild_id : `int` | `None`, optional
+            The guild to summarize, every guild if None.
+
+        Returns
+        -------
+        dict[tuple[str, str], dict]
+            (cache, source) to the Song count and the first_audio, gap and populate percentiles in seconds.
+        """
+        entries = list(PlaybackStats.recent if guild_id is None else PlaybackStats.guilds.get(guild_id, ()))
+        groups = {}
+        for entry in entries:
+            groups.setdefault((entry['cache'], entry['source']), []).append(entry)
+        return {key: {
+            'count': len(group),
+            **{name: percentiles([entry[name] for entry in group if entry[name] is not None]) for name in ('first_audio', 'gap', 'populate')},
+        } for key, group in sorted(groups.items())}
@@ -0,0 +1,278 @@
+import contextvars
+import json
+import os
+import time
+from contextlib import contextmanager
+
+from Log import Log, RotatingFile
+
+
+class Span:
+    """
+    A class representing one timed stage of a request, ie: a yt-dlp call or spawning ffmpeg.
+
+    ...
+
+    Attributes
+    ----------
+    name : `str`
+        What the span timed.
+    trace_id : `str`
+        The trace the span belongs to, 32 hex characters.
+    span_id : `str`
+        The id of the span, 16 hex characters.
+    parent_id : `str` | `None`
+        The id of the span this one ran within, if any.
+    attributes : `dict`
+        Extra information about the span, ie: the source of the song being played.
+    """
+    def __init__(self, name: str, trace_id: str, parent_id: str | None, attributes: dict) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes
+
+
+class Tracer:
+    """
+    Static class that follows requests through the bot as traces made of spans, written as JSON lines.
+
+    A trace is started for every interaction and carried by a context variable, so it follows the command
+    into every coroutine and task it starts.  Work done later on the command's behalf, ie: a Player
+    starting a Song, picks the trace back up with use().
+
+    Nothing is recorded unless `trace_file` is set in the .env file.
+
+    ...
+
+    Attributes
+    ----------
+    file : `str` | `None`
+        The JSON lines file spans are appended to, None when tracing is off.
+
+    Methods
+    -------
+    configure(file: `str` | `None`):
+        Turns tracing on by setting the file spans are written to, or off.
+    ids_for(interaction_id: `int`):
+        The trace id and root span id of an interaction.
+    start_trace(interaction_id: `int`):
+        Starts the trace of an interaction in the current context.
+    current_trace():
+        The id of the trace the current context belongs to.
+    use(trace_id: `str` | `None`):
+        Context manager that continues a trace within the code inside it.
+    span(name: `str`, **attributes):
+        Context manager that records the code within it as a span of the current trace.
+    record(name: `str`, start: `float`, end: `float`, trace_id: `str`, parent_id: `str` | `None`, **attributes):
+        Records a span that was timed elsewhere, ie: in another thread.
+    record_root(name: `str`, interaction_id: `int`, start: `float`, end: `float`, error: `Exception` | `None`, **attributes):
+        Records the span covering a whole interaction.
+    """
+    file = None
+    __sink = None
+    __trace_id = contextvars.ContextVar('trace_id', default=None)
+    __span_id = contextvars.ContextVar('span_id', default=None)
+
+    @staticmethod
+    def configure(file: str | None) -> None:
+        """
+        Turns tracing on by setting the file spans are written to, or off.
+
+        Parameters
+        ----------
+        file : `str` | `None`
+            The JSON lines file to append spans to, None turns tracing off.
+        """
+        old_sink = Tracer.__sink
+        Tracer.__sink = RotatingFile(file) if file else None
+        Tracer.file = file
+        if old_sink is not None:
+            Log.submit(old_sink.close)
+
+    @staticmethod
+    def ids_for(interaction_id: int) -> tuple[str, str]:
+        """
+        The trace id and root span id of an interaction, derived from its snowflake so they can be found again later.
+
+        Parameters
+        ----------
+        interaction_id : `int`
+            The id of the interaction.
+
+        Returns
+        -------
+        tuple[str, str]
+            The trace id and the id of the span covering the whole interaction.
+        """
+        # Snowflakes fit in 64 bits, so the root span id is also the second half of the trace id
+        return f'{interaction_id:032x}', f'{interaction_id:016x}'
+
+    @staticmethod
+    def start_trace(interaction_id: int) -> str:
+        """
+        Starts the trace of an interaction in the current context.
+
+        Parameters
+        ----------
+        interaction_id : `int`
+            The id of the interaction.
+
+        Returns
+        -------
+        str
+            The trace id.
+        """
+        trace_id, root_id = Tracer.ids_for(interaction_id)
+        Tracer.__trace_id.set(trace_id)
+        Tracer.__span_id.set(root_id)
+        return trace_id
+
+    @staticmethod
+    def current_trace() -> str | None:
+        """
+        The id of the trace the current context belongs to.
+
+        Returns
+        -------
+        str or None
+            The trace id, None outside of a trace.
+        """
+        return Tracer.__trace_id.get()
+
+    @staticmethod
+    @contextmanager
+    def use(trace_id: str | None):
+        """
+        Context manager that continues a trace within the code inside it, spans started within hang off its root.
+
+        Parameters
+        ----------
+        trace_id : `str` | `None`
+            The trace to continue, None runs the code outside of any trace.
+        """
+        trace_token = Tracer.__trace_id.set(trace_id)
+        span_token = Tracer.__span_id.set(trace_id[16:] if trace_id is not None else None)
+        try:
+            yield
+        finally:
+            Tracer.__span_id.reset(span_token)
+            Tracer.__trace_id.reset(trace_token)
+
+    @staticmethod
+    @contextmanager
+    def span(name: str, **attributes):
+        """
+        Context manager that records the code within it as a span of the current trace.
+
+        Spans started within it are recorded as its children.
+        Does nothing if tracing is off or the code isn't running within a trace.
+
+        Parameters
+        ----------
+        name : `str`
+            What the span times, ie: ytdl.query_link.
+        **attributes
+            Extra information to record with the span.
+
+        Yields
+        ------
+        Span or None
+            The span, its attributes can be added to before it ends.
+        """
+        trace_id = Tracer.__trace_id.get()
+        if Tracer.file is None or trace_id is None:
+            yield None
+            return
+        span = Span(name, trace_id, Tracer.__span_id.get(), attributes)
+        token = Tracer.__span_id.set(span.span_id)
+        start = time.time()
+        error = None
+        try:
+            yield span
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            Tracer.__span_id.reset(token)
+            Tracer.__write(span, start, time.time(), error)
+
+    @staticmethod
+    def record(name: str, start: float, end: float, trace_id: str | None, parent_id: str | None = None, **attributes) -> None:
+        """
+        Records a span that was timed elsewhere, ie: in another thread.
+
+        Parameters
+        ----------
+        name : `str`
+            What the span timed.
+        start : `float`
+            When the span started, as a time.time() value.
+        end : `float`
+            When the span ended, as a time.time() value.
+        trace_id : `str` | `None`
+            The trace the span belongs to, nothing is recorded if None.
+        parent_id : `str` | `None`, optional
+            The span this one ran within, defaults to the root of the trace.
+        **attributes
+            Extra information to record with the span.
+        """
+        if Tracer.file is None or trace_id is None:
+            return
+        span = Span(name, trace_id, parent_id if parent_id is not None else trace_id[16:], attributes)
+        Tracer.__write(span, start, end, None)
+
+    @staticmethod
+    def record_root(name: str, interaction_id: int, start: float, end: float, error: Exception | None = None, **attributes) -> None:
+        """
+        Records the span covering a whole interaction, every other span of its trace hangs off of it.
+
+        Parameters
+        ----------
+        name : `str`
+            What the interaction was, ie: /play.
+        interaction_id : `int`
+            The id of the interaction.
+        start : `float`
+            When the interaction was created, as a time.time() value.
+        end : `float`
+            When the command finished, as a time.time() value.
+        error : `Exception` | `None`, optional
+            What the command failed with, if it did.
+        **attributes
+            Extra information to record with the span.
+        """
+        if Tracer.file is None:
+            return
+        trace_id, root_id = Tracer.ids_for(interaction_id)
+        span = Span(name, trace_id, None, attributes)
+        span.span_id = root_id
+        Tracer.__write(span, start, end, error)
+
+    @staticmethod
+    def __write(span: Span, start: float, end: float, error: BaseException | None) -> None:
+        """
+        Queues a finished span to be appended to the trace file by the Log writer thread.
+        """
+        if Tracer.__sink is None:
+            return
+        Log.submit(Tracer.__write_line, Tracer.__sink, span, start, end, repr(error) if error is not None else None)
+
+    @staticmethod
+    def __write_line(sink: RotatingFile, span: Span, start: float, end: float, error: str | None) -> None:
+        """
+        Appends a span to the trace file in a flattened version of OpenTelemetry's JSON span format, runs on the writer thread.
+        """
+        sink.write(json.dumps({
+            'trace_id': span.trace_id,
+            'span_id': span.span_id,
+            'parent_span_id': span.parent_id,
+            'name': span.name,
+            'start_time_unix_nano': int(start * 1e9),
+            'end_time_unix_nano': int(end * 1e9),
+            'duration_ms': round((end - start) * 1000, 3),
+            'status': 'ok' if error is None else 'error',
+            'attributes': {**span.attributes, **({'error': error} if error is not None else {})},
+        }, default=str))
+        sink.flush()
@@ -5,24 +5,22 @@ import subprocess
 import discord
 import math
 import random
-import time
 
 import dotenv
-import requests
-import yt_dlp.utils
-
-from datetime import datetime
 
 # Import classes from our files
+from Log import Log
 from Player import Player
 from Servers import Servers
 from Song import Song
+from YTDLInterface import YTDLInterface
+from Tracing import Tracer
 
-asyncio_tasks = set()
-
-def pront(content, lvl="DEBUG", end="\n") -> None:
+def pront(content, lvl="DEBUG", end="\n", **fields) -> None:
     """
-    A custom logging method that acts as a wrapper for print().
+    A custom logging method, the record is queued and printed (and written to the log file) by the Log writer thread.
+
+    Records below the level set with `log_level` in the .env file, or /loglevel, are dropped right away.
 
     Parameters
     ----------
@@ -42,21 +40,11 @@ def pront(content, lvl="DEBUG", end="\n") -> None:
         NONE : Resets ANSI color sequences
     end : `str` = `\\n` (optional)
         The character(s) to end the statement with, passes to print().
+    **fields
+        Structured information written to the log file with the record, ie: guild_id or song_id.
+        The trace_id of the running command is added automatically.
     """
-    colors = {
-        "LOG": "",
-        "DEBUG": "\033[1;95m",
-        "OKBLUE": "\033[94m",
-        "OKCYAN": "\033[96m",
-        "OKGREEN": "\033[92m",
-        "WARNING": "\033[93m",
-        "ERROR": "\033[91m",
-        "NONE": "\033[0m"
-    }
-    # if type(content) != str and type(content) != int and type(content) != float:
-    #    content = sep.join(content)
-    print(colors[lvl] + "{" + datetime.now().strftime("%x %X") +
-          "} " + lvl + ": " + str(content) + colors["NONE"], end=end)  # sep.join(list())
+    Log.write(content, lvl, end, trace_id=Tracer.current_trace(), **fields)
 
 
 # makes a ascii song progress bar
@@ -64,7 +52,8 @@ def get_progress_bar(song: Song) -> str:
     """
     Creates an ASCII progress bar from a provided Song.
     
-    This is calculated from a time delta counted within the song.
+    This is calculated from the audio frames the Song has played.
+    Livestreams have no end to show progress towards, how long they have been listened to is shown instead.
 
     Parameters
     ----------
@@ -76,15 +65,18 @@ def get_progress_bar(song: Song) -> str:
     str
         A string containing a visual representation of how far the song has played.
     """
-    # if the song is None or the song has been has not been started ( - 100000 is an arbitrary number)
-    if song is None or song.get_elapsed_time() > time.time() - 100000 or song.duration is None:
+    # if the song is None or the song has been has not been started
+    if song is None or not song.is_started():
         return ''
-    percent_duration = (song.get_elapsed_time() / song.duration)*100
-
-    if percent_duration > 100:#percent duration cant be greater than 100
-        return 'The player has stalled, please run /force-reset-player.'
+    elapsed = song.get_elapsed_time()
+    if song.is_live:
+        return f'🔴 LIVE, listening for {song.parse_duration_short_hand(math.floor(elapsed))}'
+    if not song.duration:
+        return ''
+    # Durations are rounded down to the second, the last frames can run past them
+    percent_duration = min((elapsed / song.duration)*100, 100)
 
-    ret = f'{song.parse_duration_short_hand(math.floor(song.get_elapsed_time()))}/{song.parse_duration_short_hand(song.duration)}'
+    ret = f'{song.parse_duration_short_hand(math.floor(min(elapsed, song.duration)))}/{song.parse_duration_short_hand(song.duration)}'
     ret += f' [{(math.floor(percent_duration / 4) * "▬")}{">" if percent_duration < 100 else ""}{((math.floor((100 - percent_duration) / 4)) * " ")}]'
     return ret
 
@@ -223,7 +215,7 @@ def get_now_playing_embed(player: Player, progress: bool = False) -> discord.Emb
         description=f'{player.song.title} -- {player.song.uploader}',
         color=get_random_hex(player.song.id)
     )
-    embed.add_field(name='Duration:', value=player.song.parse_duration(
+    embed.add_field(name='Duration:', value='🔴 Live' if player.song.is_live else player.song.parse_duration(
         player.song.duration), inline=True)
     embed.add_field(name='Requested by:', value=player.song.requester.mention)
     if progress:
@@ -234,54 +226,54 @@ def get_now_playing_embed(player: Player, progress: bool = False) -> discord.Emb
     
     return embed
 
-def populate_song_list(songs: list[Song], guild_id: int) -> None:
+def populate_song_list(songs: list[Song], player: Player) -> None:
     """
     Creates a task to populate a list of songs in parallel.
-    Is cognizant of a player and will halt itself in the event of its expiry.
+    The task belongs to the Player and is cancelled along with it.
     
     Parameters
     ----------
     songs : `list[Song]`
         The list of songs to iterate over.
-    guild_id : `int`
-        The id of the guild that the player to watch belongs to.
+    player : `Player`
+        The Player the songs were queued on.
     """
 
     async def __primary_loop(songs: list[Song], guild_id: int) -> None:
         """
-        Iterates over a list of Songs and populates them while checking if the Player they belong to still exists.
+        Iterates over a list of Songs and populates them.
         
         Parameters
         ----------
         songs : `list[Song]`
             The list of songs to iterate over.
         guild_id : `int`
-            The id of the guild that the player to watch belongs to.
+            The id of the guild the songs were queued in.
         """
         for i in range(len(songs)):
-            if Servers.get_player(guild_id) is None:
-                return
-            pront(f"populating {songs[i].title}")
+            pront(f"populating {songs[i].title}", guild_id=guild_id, song_id=songs[i].id)
             try:
                 await songs[i].populate()
-            except yt_dlp.utils.ExtractorError:
-                pront('raised ExtractorError', 'ERROR')
-            except yt_dlp.utils.DownloadError:
-                pront('raised DownloadError', 'ERROR')
+            except Exception as e:
+                if not YTDLInterface.is_dlp_error(e):
+                    raise
+                pront(f'raised {type(e).__name__}', 'ERROR')
             songs[i] = None
 
-    task = asyncio.create_task(__primary_loop(songs, guild_id))
-    asyncio_tasks.add(task)
-    task.add_done_callback(asyncio_tasks.discard)
+    player.tasks.create(__primary_loop(songs, player.vc.guild.id), 'populate')
 
 async def force_reset_player(player: Player) -> None:
     """Forcibly restarts a player without losing any of the queue information contained within.
+
+    The Song that was playing picks up where it was.
     
     Parameters
     ----------
     player : `Player`
         The player to restart.
     """
+    if player.is_playing() and player.song.is_started():
+        player.song.start_offset = player.song.get_elapsed_time()
     await player.clean()
     player.vc = await player.vc.channel.connect(self_deaf=True)
     player = Player.from_player(player)
@@ -554,6 +546,8 @@ class Pretests:
         """
         Check if yt-dlp is out of date
 
+        The pip and GitHub calls are blocking, they are run within an executor.
+
         Parameters
         ----------
         interaction : `discord.Interaction`
@@ -565,6 +559,23 @@ class Pretests:
             True: yt-dlp is out of date
             False: yt-dlp is not out of date
         """
+        current, latest = await asyncio.get_running_loop().run_in_executor(None, Pretests.__get_ytdlp_versions)
+
+        pront("\nYT-DLP version checking\nCurrent : " + current + "\nLatest  : " + latest, lvl="DEBUG")
+
+        return not latest == current
+
+    def __get_ytdlp_versions() -> tuple[str, str]:
+        """
+        Gets the installed and the latest released versions of yt-dlp.
+
+        Returns
+        -------
+        tuple[str, str]
+            The installed version and the latest version.
+        """
+        # Only needed here, imported late to keep it out of startup
+        import requests
 
         pre1 = subprocess.Popen(["pip", "freeze"], stdout=subprocess.PIPE)
         pre2 = subprocess.run(
@@ -586,6 +597,4 @@ class Pretests:
             # try name field as fallback
             latest = (resp.json().get("name") or "").strip()
 
-        pront("\nYT-DLP version checking\nCurrent : " + current + "\nLatest  : " + latest, lvl="DEBUG")
-
-        return not latest == current
+        return current, latest
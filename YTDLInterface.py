@@ -1,6 +1,11 @@
-import asyncio
-import yt_dlp
-import functools
+import sys
+import time
+
+# yt-dlp is imported by the first extraction rather than here,
+# importing it pulls in hundreds of extractor modules and slows down startup
+from ExtractorBackends import ExtractorBackend, ReplayError, YTDLPBackend
+from Metrics import Metrics
+from Tracing import Tracer
 
 # Generic post-process error class
 class YTDLError(Exception):
@@ -28,7 +33,27 @@ class YTDLInterface:
 
     async scrape_search(query: `str`):
         Performs a quick scrape-based search for a provided query.
+
+    async warm_up(link='https://www.youtube.com/watch?v=dQw4w9WgXcQ'):
+        Primes yt-dlp and its on-disk cache so the first real request doesn't pay for it.
+
+    is_dlp_error(error: `Exception`, *names: `str`):
+        Checks if an Exception is one of yt-dlp's errors without importing yt-dlp.
+
+    set_backend(backend: `ExtractorBackend`):
+        Changes what every call gets its information from, ie: live yt-dlp or recorded fixtures.
     """
+    # Where info dicts come from, live yt-dlp unless a recorder or replay is set
+    backend = YTDLPBackend()
+
+    # Kept next to the bot so the player JS and signature cache survive restarts
+    cache_dir = 'ytdlp_cache'
+
+    # Whether the first extraction that wasn't a warm-up has been timed yet
+    first_request_timed = False
+    # Whether warm_up has finished priming yt-dlp
+    warmed_up = False
+
     retrieve_options = {
         'format': 'bestaudio/best',
         'audioformat': 'mp3',
@@ -42,7 +67,7 @@ class YTDLInterface:
         'lazy_playlist': True,
         'noplaylist': True,
         "cookiefile": "cookies.txt",
-
+        'cachedir': cache_dir,
     }
 
     scrape_options = {
@@ -58,6 +83,7 @@ class YTDLInterface:
         'extract_flat':True,
         'lazy_playlist': True,
         "cookiefile": "cookies.txt",
+        'cachedir': cache_dir,
     }
 
     skim_playlist_options = {
@@ -75,12 +101,17 @@ class YTDLInterface:
         'playlist_items' : '0',
         'lazy_playlist': True,
         "cookiefile": "cookies.txt",
+        'cachedir': cache_dir,
     }
 
     ffmpeg_options = {
         'before_options': '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5',
         'options': '-vn'
     }
+    # Added to the input options of livestreams, ffmpeg buffers as little as it can instead of probing and reading ahead
+    ffmpeg_live_before_options = '-fflags nobuffer -flags low_delay -probesize 32768 -analyzeduration 500000'
+    # Only HLS inputs understand this one, it starts at the newest segment rather than three behind
+    ffmpeg_hls_before_options = '-live_start_index -1'
 
     # Rapidy retrieves shell information surrounding a URL
     @staticmethod
@@ -98,7 +129,7 @@ class YTDLInterface:
         dict
             A dictionary containing the result of the yt-dlp call.  This may or may not be able to be converted to JSON, it depends on yt-dlp.
         """
-        return await YTDLInterface.__call_dlp(YTDLInterface.scrape_options, link)
+        return await YTDLInterface.__call_dlp('scrape_link', YTDLInterface.scrape_options, link)
 
     # Only called to automatically resolve searches input into scrape_link
     # Pulls information from a yt-dlp accepted URL and returns a Dict containing that information
@@ -117,7 +148,7 @@ class YTDLInterface:
         dict
             A dictionary containing the result of the yt-dlp call.  This may or may not be able to be converted to JSON, it depends on yt-dlp.
         """
-        return await YTDLInterface.__call_dlp(YTDLInterface.retrieve_options, link)
+        return await YTDLInterface.__call_dlp('query_link', YTDLInterface.retrieve_options, link)
 
     # Skims information about a playlist without retrieving any of its songs
     @staticmethod
@@ -136,7 +167,7 @@ class YTDLInterface:
         dict
             A dictionary containing the result of the yt-dlp call.  This may or may not be able to be converted to JSON, it depends on yt-dlp.
         """
-        return await YTDLInterface.__call_dlp(YTDLInterface.skim_playlist_options, link)
+        return await YTDLInterface.__call_dlp('skim_playlist', YTDLInterface.skim_playlist_options, link)
 
     # Searches for a provided string
     @staticmethod
@@ -154,20 +185,93 @@ class YTDLInterface:
         dict
             A dictionary containing the result of the yt-dlp call.  This may or may not be able to be converted to JSON, it depends on yt-dlp.
         """
-        return await YTDLInterface.__call_dlp(YTDLInterface.scrape_options, f'ytsearch5:{query}')
+        return await YTDLInterface.__call_dlp('scrape_search', YTDLInterface.scrape_options, f'ytsearch5:{query}')
+
+    @staticmethod
+    async def warm_up(link: str = 'https://www.youtube.com/watch?v=dQw4w9WgXcQ') -> None:
+        """
+        Primes yt-dlp and its on-disk cache so the first real request doesn't pay for it.
+
+        The link is resolved twice, the first (cold) run imports yt-dlp and fills cache_dir
+        with the player JS and signature cache, the second (warm) run shows what later requests will cost.
+
+        Parameters
+        ----------
+        link : `str`
+            A link to a known, stable piece of media.
+        """
+        # Imported here, Utils depends on this module
+        import Utils
+
+        start = time.perf_counter()
+        try:
+            await YTDLInterface.__call_dlp('query_link', YTDLInterface.retrieve_options, link, warm_up=True)
+            cold = time.perf_counter() - start
+            await YTDLInterface.__call_dlp('query_link', YTDLInterface.retrieve_options, link, warm_up=True)
+        except Exception as e:
+            Utils.pront(f"yt-dlp warm-up failed after {time.perf_counter() - start:.2f}s ({e})", "WARNING")
+            return
+        warm = time.perf_counter() - start - cold
+        YTDLInterface.warmed_up = True
+        Utils.pront(f"yt-dlp warm-up finished in {cold + warm:.2f}s (cold resolve {cold:.2f}s, warm resolve {warm:.2f}s)", "OKCYAN")
+
+    @staticmethod
+    def is_dlp_error(error: Exception, *names: str) -> bool:
+        """
+        Checks if an Exception is one of yt-dlp's errors without importing yt-dlp.
+
+        A ReplayBackend's ReplayError stands in for any of them.
+
+        Parameters
+        ----------
+        error : `Exception`
+            The Exception to check.
+        *names : `str`
+            The names of the classes in yt_dlp.utils to check against.
+            Defaults to ExtractorError and DownloadError.
+
+        Returns
+        -------
+        bool
+            Whether the Exception is an instance of one of the named yt-dlp errors.
+        """
+        if isinstance(error, ReplayError):
+            return True
+        # If yt-dlp was never imported it couldn't have raised anything
+        yt_dlp = sys.modules.get('yt_dlp')
+        if yt_dlp is None:
+            return False
+        names = names or ('ExtractorError', 'DownloadError')
+        return isinstance(error, tuple(getattr(yt_dlp.utils, name) for name in names))
+
+    @staticmethod
+    def set_backend(backend: ExtractorBackend) -> None:
+        """
+        Changes what every call gets its information from, ie: live yt-dlp or recorded fixtures.
+
+        Parameters
+        ----------
+        backend : `ExtractorBackend`
+            The backend to use from now on.
+        """
+        YTDLInterface.backend = backend
 
     # Private method to condense all the others
     @staticmethod
-    async def __call_dlp(options: dict, link: str) -> dict:
+    async def __call_dlp(kind: str, options: dict, link: str, warm_up: bool = False) -> dict:
         """
-        Summons yt-dlp with a provided set of options and a query.
+        Summons yt-dlp (or whichever backend is set) with a provided set of options and a query.
 
         Parameters
         ----------
+            kind : `str`
+                The name of the method making the call, backends use it to tell calls apart.
             options : `dict`
                 A dictionary of yt-dlp arguments. Listed at https://github.com/yt-dlp/yt-dlp/blob/master/yt_dlp/YoutubeDL.py
             link : `str`
                 A string containing a URL or query that yt-dlp will interpret.
+            warm_up : `bool`, optional
+                Whether the call was made by warm_up, these are left out of the first request timing.
 
         Returns
         -------
@@ -179,14 +283,25 @@ class YTDLInterface:
         `YTDLError`:
             If yt-dlp returned an empty or incomplete dictionary
         """
-        # Define asyncio loop
-        loop = asyncio.get_event_loop()
+        start = time.perf_counter()
+        outcome = 'error'
+        try:
+            with Tracer.span(f'ytdl.{kind}', link=link) as span:
+                query_result = await YTDLInterface.backend.extract(kind, options, link)
+                if span is not None:
+                    span.attributes['source'] = query_result.get('extractor_key') or query_result.get('ie_key')
+            outcome = 'ok'
+        finally:
+            # Warm-ups would skew the numbers toward the cold start
+            if not warm_up:
+                Metrics.ytdl_calls.inc(kind, outcome)
+                Metrics.ytdl_seconds.observe(kind, value=time.perf_counter() - start)
 
-        with yt_dlp.YoutubeDL(options) as ytdlp:
-            # Define ytdlp command within a partial to be able to run it within run_in_executor
-            partial = functools.partial(
-                ytdlp.extract_info, link, download=False)
-            query_result = await loop.run_in_executor(None, partial)
+        # Report how long the first user-facing request took to compare runs with and without warm-up
+        if not warm_up and not YTDLInterface.first_request_timed:
+            YTDLInterface.first_request_timed = True
+            import Utils
+            Utils.pront(f"First yt-dlp request took {time.perf_counter() - start:.2f}s (warmed up: {YTDLInterface.warmed_up})", "OKCYAN")
 
         # TODO testing to see if removing this will cause
         # errors further down the line
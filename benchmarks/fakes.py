@@ -0,0 +1,257 @@
+"""
+Stand-ins for the discord.py objects the cogs and Player touch, so they can run without a Discord connection.
+
+Only the attributes and methods the bot actually uses are implemented.
+The FakeVoiceClient drives a real discord.player.AudioPlayer so ffmpeg is read at the real 20ms frame rate.
+"""
+import asyncio
+import itertools
+import threading
+import time
+from types import SimpleNamespace
+
+import discord
+from discord.player import AudioPlayer
+
+# Snowflakes only need to be unique
+ids = itertools.count(1000)
+
+
+class FakeMember:
+    """
+    A guild member.
+    """
+    def __init__(self, name: str, voice_channel=None) -> None:
+        self.id = next(ids)
+        self.name = name
+        self.display_name = name
+        self.mention = f'<@{self.id}>'
+        self.display_avatar = SimpleNamespace(url=f'https://loadtest.invalid/avatar/{self.id}.png')
+        self.roles = []
+        self.voice = SimpleNamespace(channel=voice_channel) if voice_channel is not None else None
+
+
+class FakeMessage:
+    """
+    A sent message.
+    """
+    def __init__(self, channel, content: str | None = None, embed: discord.Embed | None = None, embeds: list[discord.Embed] | None = None) -> None:
+        self.id = next(ids)
+        self.channel = channel
+        self.content = content
+        self.embeds = embeds or ([embed] if embed is not None else [])
+        self.deleted = False
+
+    async def edit(self, *, content=None, embed=None, view=None, **kwargs) -> 'FakeMessage':
+        if content is not None:
+            self.content = content
+        if embed is not None:
+            self.embeds = [embed]
+        return self
+
+    async def delete(self) -> None:
+        self.deleted = True
+
+
+class FakeChannel:
+    """
+    A text channel, also the base of FakeVoiceChannel since voice channels have a text chat too.
+    """
+    def __init__(self, guild, name: str) -> None:
+        self.id = next(ids)
+        self.guild = guild
+        self.name = name
+        self.messages = 0
+
+    async def send(self, content: str | None = None, *, embed=None, embeds=None, view=None, silent=False, **kwargs) -> FakeMessage:
+        self.messages += 1
+        return FakeMessage(self, content, embed, embeds)
+
+
+class FakeVoiceChannel(FakeChannel):
+    """
+    A voice channel the bot is always allowed to join and speak in.
+    """
+    def __init__(self, guild, name: str) -> None:
+        super().__init__(guild, name)
+        self.members = []
+
+    def permissions_for(self, member) -> SimpleNamespace:
+        return SimpleNamespace(connect=True, speak=True)
+
+    async def connect(self, *, self_deaf: bool = False, **kwargs) -> 'FakeVoiceClient':
+        if self.guild.voice_client is not None:
+            raise discord.ClientException('Already connected to a voice channel.')
+        # Give the handshake a moment like the real thing, other coroutines get to run meanwhile
+        await asyncio.sleep(self.guild.connect_latency)
+        if self.guild.voice_client is not None:
+            raise discord.ClientException('Already connected to a voice channel.')
+        self.guild.voice_client = FakeVoiceClient(self)
+        self.members.append(self.guild.me)
+        return self.guild.voice_client
+
+
+class FakeGuild:
+    """
+    A guild with one text channel, one voice channel and one listener.
+    """
+    def __init__(self, name: str, connect_latency: float = 0.0) -> None:
+        self.id = next(ids)
+        self.name = name
+        self.connect_latency = connect_latency
+        self.voice_client = None
+        self.me = FakeMember('MaBalls')
+        self.text_channel = FakeChannel(self, 'general')
+        self.voice_channel = FakeVoiceChannel(self, 'voice')
+        self.listener = FakeMember(f'{name}-listener', self.voice_channel)
+        self.voice_channel.members.append(self.listener)
+
+
+class FakeResponse:
+    """
+    An InteractionResponse that records when the interaction was first answered.
+    """
+    def __init__(self, interaction) -> None:
+        self.interaction = interaction
+        self.responded_at = None
+
+    def is_done(self) -> bool:
+        return self.responded_at is not None
+
+    def __respond(self) -> None:
+        if self.responded_at is not None:
+            raise discord.InteractionResponded(self.interaction)
+        self.responded_at = time.perf_counter()
+
+    async def defer(self, *, thinking: bool = False, ephemeral: bool = False, **kwargs) -> None:
+        self.__respond()
+
+    async def send_message(self, content: str | None = None, *, embed=None, embeds=None, view=None, ephemeral: bool = False, **kwargs) -> None:
+        self.__respond()
+        self.interaction.messages.append(FakeMessage(self.interaction.channel, content, embed, embeds))
+
+
+class FakeFollowup:
+    """
+    An interaction webhook.
+    """
+    def __init__(self, interaction) -> None:
+        self.interaction = interaction
+
+    async def send(self, content: str | None = None, *, embed=None, embeds=None, view=None, ephemeral: bool = False, **kwargs) -> FakeMessage:
+        message = FakeMessage(self.interaction.channel, content, embed, embeds)
+        self.interaction.messages.append(message)
+        return message
+
+
+class FakeInteraction:
+    """
+    A slash command invocation from the guild's listener.
+    """
+    def __init__(self, guild: FakeGuild, user: FakeMember | None = None) -> None:
+        self.id = next(ids)
+        self.guild = guild
+        self.guild_id = guild.id
+        self.user = user or guild.listener
+        self.channel = guild.text_channel
+        self.created_at = time.perf_counter()
+        self.messages = []
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+
+class FakeVoiceClient:
+    """
+    A VoiceClient that throws away the audio it is sent but keeps track of when it arrived.
+
+    ...
+
+    Attributes
+    ----------
+    packets : `int`
+        How many 20ms frames have been sent.
+    first_packets : `list[float]`
+        The perf_counter() value of the first frame of every play() call.
+    gaps : `list[float]`
+        The seconds between the last frame of a source and the first frame of the next one.
+    """
+    def __init__(self, channel: FakeVoiceChannel) -> None:
+        self.channel = channel
+        self.guild = channel.guild
+        # AudioPlayer announces speaking through client.ws on client.client.loop
+        self.client = SimpleNamespace(loop=asyncio.get_running_loop())
+        self.ws = SimpleNamespace(speak=self.__speak)
+        self.timeout = 1.0
+        self.packets = 0
+        self.first_packets = []
+        self.gaps = []
+        self._player = None
+        self.__connected = threading.Event()
+        self.__connected.set()
+        self.__last_packet = None
+        self.__waiting_for_first = False
+
+    async def __speak(self, state) -> None:
+        pass
+
+    def is_connected(self) -> bool:
+        return self.__connected.is_set()
+
+    def wait_until_connected(self, timeout: float | None = None) -> bool:
+        return self.__connected.wait(timeout)
+
+    def send_audio_packet(self, data: bytes, *, encode: bool = True) -> None:
+        # Called from the AudioPlayer thread
+        now = time.perf_counter()
+        if self.__waiting_for_first:
+            self.__waiting_for_first = False
+            self.first_packets.append(now)
+            if self.__last_packet is not None:
+                self.gaps.append(now - self.__last_packet)
+        self.__last_packet = now
+        self.packets += 1
+
+    def play(self, source: discord.AudioSource, *, after=None, **kwargs) -> None:
+        if not self.is_connected():
+            raise discord.ClientException('Not connected to voice.')
+        if self.is_playing():
+            raise discord.ClientException('Already playing audio.')
+        self.__waiting_for_first = True
+        self._player = AudioPlayer(source, self, after=after)
+        self._player.start()
+
+    def is_playing(self) -> bool:
+        return self._player is not None and self._player.is_playing()
+
+    def is_paused(self) -> bool:
+        return self._player is not None and self._player.is_paused()
+
+    def stop(self) -> None:
+        if self._player is not None:
+            self._player.stop()
+            self._player = None
+
+    def pause(self) -> None:
+        if self._player is not None:
+            self._player.pause()
+
+    def resume(self) -> None:
+        if self._player is not None:
+            self._player.resume()
+
+    @property
+    def source(self) -> discord.AudioSource | None:
+        return self._player.source if self._player is not None else None
+
+    @source.setter
+    def source(self, value: discord.AudioSource) -> None:
+        if self._player is None:
+            raise ValueError('Not playing anything.')
+        self._player.set_source(value)
+
+    async def disconnect(self, *, force: bool = False) -> None:
+        self.stop()
+        self.__connected.clear()
+        self.guild.voice_client = None
+        if self.guild.me in self.channel.members:
+            self.channel.members.remove(self.guild.me)
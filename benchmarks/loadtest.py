@@ -0,0 +1,338 @@
+"""
+Offline multi-guild load test.
+
+Runs the real QueueManagement, PlaybackManagement, PlayerManagement and Player code against fake
+Interactions and VoiceClients (see fakes.py), a ReplayBackend serving stub songs and a local WAV file
+decoded by ffmpeg, so nothing touches Discord or the network.
+
+Every step simulates a number of guilds issuing /play, /queue, /now and /skip at the same time and reports
+event loop lag, command latency, the gap between songs, time to first audio, CPU and memory.
+
+Usage:
+    python -m benchmarks.loadtest --guilds 1,5,10,25 --duration 30 --json results.json
+"""
+import argparse
+import array
+import asyncio
+import contextlib
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import wave
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CWD = os.getcwd()
+sys.path.insert(0, ROOT)
+# DB opens settings.db in the working directory as soon as it is imported, keep the real one untouched
+WORKDIR = tempfile.mkdtemp(prefix='loadtest-')
+os.chdir(WORKDIR)
+
+# Utils has to come first to import the rest of the bot in the right order
+import Utils
+from DB import DB
+from ExtractorBackends import ReplayBackend
+from Log import Log
+from LoopMonitor import LagSampler
+from MemoryStats import LeakTracker, MemoryStats
+from ProcStats import ProcStats
+from Servers import Servers
+from Timings import PlaybackStats, percentiles
+from Tracing import Tracer
+from YTDLInterface import YTDLInterface
+from cogs.PlaybackManagement import PlaybackManagement
+from cogs.PlayerManagement import PlayerManagement
+from cogs.QueueManagement import QueueManagement
+
+from benchmarks.fakes import FakeGuild, FakeInteraction
+
+SAMPLE_RATE = 48000
+
+
+def write_tone(path: str, seconds: int) -> None:
+    """
+    Writes a 440Hz stereo tone in the format ffmpeg is asked to output, so decoding it is cheap.
+    """
+    period = [int(8000 * math.sin(2 * math.pi * 440 * i / SAMPLE_RATE)) for i in range(SAMPLE_RATE // 40)]
+    frames = array.array('h', (sample for sample in period for _ in range(2)))
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        # The tone repeats every 1/40th of a second
+        for _ in range(seconds * 40):
+            f.writeframes(frames.tobytes())
+
+
+def create_backend(audio: str, song_length: int, songs: int, latency: float, jitter: float, error_rate: float) -> ReplayBackend:
+    """
+    Creates a ReplayBackend that answers both /play and repopulation for every stub song.
+    """
+    backend = ReplayBackend(latency=latency, jitter=jitter, error_rate=error_rate, seed=0)
+    for i in range(songs):
+        link = f'https://loadtest.invalid/song/{i}'
+        data = {
+            # A YouTube extractor with no expiry makes the Player repopulate, like it does for real songs
+            'extractor_key': 'Youtube',
+            'webpage_url': link,
+            'original_url': link,
+            'url': audio,
+            'id': f'loadtest{i}',
+            'title': f'Load test song {i}',
+            'channel': 'loadtest',
+            'duration': song_length,
+            'thumbnail': f'https://loadtest.invalid/thumb/{i}.jpg',
+            'thumbnails': [{'url': f'https://loadtest.invalid/thumb/{i}.jpg'}],
+        }
+        backend.add('query_link', link, data)
+        backend.add('scrape_link', link, data)
+    return backend
+
+
+async def update_check(self=None) -> bool:
+    return False
+
+
+class Step:
+    """
+    Everything recorded while simulating one guild count.
+    """
+    def __init__(self, guilds: int) -> None:
+        self.guilds = guilds
+        self.commands = {}
+        self.errors = {}
+        self.first_audio = []
+        self.voice_clients = []
+        self.rss = []
+        self.ffmpeg_rss = []
+        self.ffmpeg_processes = []
+        self.player_bytes = []
+
+    def record(self, name: str, ack: float | None, total: float) -> None:
+        command = self.commands.setdefault(name, {'ack': [], 'total': []})
+        if ack is not None:
+            command['ack'].append(ack)
+        command['total'].append(total)
+
+
+async def run_command(step: Step, name: str, command, cog, interaction: FakeInteraction, *args) -> None:
+    """
+    Runs a command callback the way the CommandTree would and records how long it took to be answered and to finish.
+    """
+    start = time.perf_counter()
+    started_at = time.time()
+    error = None
+    try:
+        # The tree would start the trace, every command of a guild runs in the same task here so it is scoped instead
+        with Tracer.use(Tracer.ids_for(interaction.id)[0]):
+            await command.callback(cog, interaction, *args)
+    except Exception as e:
+        error = e
+        step.errors[name] = step.errors.get(name, 0) + 1
+        Utils.pront(f'{name} raised {e!r}', 'ERROR')
+    Tracer.record_root(name, interaction.id, started_at, time.time(), error, guild_id=interaction.guild_id)
+    responded_at = interaction.response.responded_at
+    step.record(name, responded_at - start if responded_at is not None else None, time.perf_counter() - start)
+
+
+async def simulate_guild(guild: FakeGuild, step: Step, cogs: dict, args: argparse.Namespace, deadline: float) -> None:
+    """
+    Fills a guild's queue and then keeps using it until the deadline.
+    """
+    queue, playback, player = cogs['queue'], cogs['playback'], cogs['player']
+
+    def link() -> str:
+        return f'https://loadtest.invalid/song/{random.randrange(args.songs)}'
+
+    start = time.perf_counter()
+    await run_command(step, '/play', queue._play, queue, FakeInteraction(guild), link())
+    vc = guild.voice_client
+    if vc is not None:
+        step.voice_clients.append(vc)
+    for _ in range(args.queue - 1):
+        await run_command(step, '/play', queue._play, queue, FakeInteraction(guild), link())
+
+    # Wait for the first song to start so time to first audio covers the whole /play path
+    while vc is not None and not vc.first_packets and time.perf_counter() < deadline:
+        await asyncio.sleep(0.01)
+    if vc is not None and vc.first_packets:
+        step.first_audio.append(vc.first_packets[0] - start)
+
+    while time.perf_counter() < deadline:
+        await asyncio.sleep(random.uniform(0.5, 1.5) * args.interval)
+        current = Servers.get_player(guild.id)
+        if current is None or len(current.queue) < 2:
+            await run_command(step, '/play', queue._play, queue, FakeInteraction(guild), link())
+            continue
+        match random.choices(('/queue', '/now', '/skip'), weights=(4, 4, args.skip_weight))[0]:
+            case '/queue':
+                await run_command(step, '/queue', queue._queue, queue, FakeInteraction(guild))
+            case '/now':
+                await run_command(step, '/now', player._now, player, FakeInteraction(guild))
+            case '/skip':
+                await run_command(step, '/skip', playback._skip, playback, FakeInteraction(guild))
+
+
+async def sample_memory(step: Step, interval: float = 1.0) -> None:
+    """
+    Records the memory of the bot and its ffmpeg processes until cancelled.
+    """
+    while True:
+        step.rss.append(ProcStats.rss_bytes() or 0)
+        ffmpeg = [pid for pid in ProcStats.children() if ProcStats.name(pid) == 'ffmpeg']
+        step.ffmpeg_processes.append(len(ffmpeg))
+        step.ffmpeg_rss.append(sum(ProcStats.rss_bytes(pid) or 0 for pid in ffmpeg))
+        step.player_bytes.extend(MemoryStats.player(player)['total'] for player in list(Servers.dict.values()))
+        await asyncio.sleep(interval)
+
+
+async def teardown() -> None:
+    """
+    Cleans every Player and waits for their ffmpeg processes to exit.
+    """
+    for player in list(Servers.dict.values()):
+        await player.clean()
+    for _ in range(100):
+        if not ProcStats.children():
+            break
+        await asyncio.sleep(0.05)
+
+
+async def run_step(guild_count: int, cogs: dict, args: argparse.Namespace) -> dict:
+    """
+    Simulates guild_count guilds for args.duration seconds.
+
+    Returns
+    -------
+    dict
+        The results of the step.
+    """
+    step = Step(guild_count)
+    guilds = [FakeGuild(f'guild{i}', args.connect_latency) for i in range(guild_count)]
+    for guild in guilds:
+        DB.GuildSettings.create_new_guild(guild.id)
+
+    PlaybackStats.recent.clear()
+    PlaybackStats.guilds.clear()
+    sampler = LagSampler()
+    sampler.start()
+    memory_task = asyncio.create_task(sample_memory(step))
+    cpu_start, wall_start = os.times(), time.perf_counter()
+
+    deadline = time.perf_counter() + args.duration
+    await asyncio.gather(*(simulate_guild(guild, step, cogs, args, deadline) for guild in guilds))
+
+    sampler.stop()
+    memory_task.cancel()
+    # ffmpeg's CPU time is only counted once it has exited and been reaped
+    await teardown()
+    cpu_end, wall = os.times(), time.perf_counter() - wall_start
+    # Every Player has been cleaned, any that are still alive are leaking
+    leaks = [f'{type(obj).__name__}: {LeakTracker.referrer_chain(obj)}' for obj, _ in LeakTracker.leaks()]
+
+    cpu = (cpu_end.user + cpu_end.system) - (cpu_start.user + cpu_start.system)
+    ffmpeg_cpu = (cpu_end.children_user + cpu_end.children_system) - (cpu_start.children_user + cpu_start.children_system)
+    return {
+        'guilds': guild_count,
+        'seconds': wall,
+        'loop_lag': sampler.get_percentiles(),
+        'commands': {name: {'count': len(times['total']),
+                            'ack': percentiles(times['ack']),
+                            'total': percentiles(times['total'])}
+                     for name, times in step.commands.items()},
+        'errors': step.errors,
+        'first_audio': percentiles(step.first_audio),
+        'gaps': percentiles([gap for vc in step.voice_clients for gap in vc.gaps]),
+        # What the Players measured themselves, by stream URL cache result and source
+        'playback': {f'{cache}/{source}': stats for (cache, source), stats in PlaybackStats.summary().items()},
+        'frames': sum(vc.packets for vc in step.voice_clients),
+        'cpu_percent': 100 * cpu / wall,
+        'ffmpeg_cpu_percent': 100 * ffmpeg_cpu / wall,
+        'rss_mb': max(step.rss, default=0) / 2**20,
+        'ffmpeg_rss_mb': max(step.ffmpeg_rss, default=0) / 2**20,
+        'ffmpeg_processes': max(step.ffmpeg_processes, default=0),
+        'player_kb': max(step.player_bytes, default=0) / 2**10,
+        'leaks': leaks,
+    }
+
+
+def format_ms(stats: dict) -> str:
+    if not stats:
+        return '-'
+    return '/'.join(f'{stats[key] * 1000:.1f}' for key in ('p50', 'p99', 'max'))
+
+
+def print_step(result: dict, file=sys.stdout) -> None:
+    print(f"\n{result['guilds']} guild(s), {result['seconds']:.0f}s, {result['frames']} frames sent", file=file)
+    print(f"  loop lag        p50/p99/max ms  {format_ms(result['loop_lag'])}", file=file)
+    for name, command in sorted(result['commands'].items()):
+        print(f"  {name:<8} x{command['count']:<5} ack {format_ms(command['ack']):<22} total {format_ms(command['total'])}", file=file)
+    print(f"  first audio     p50/p99/max ms  {format_ms(result['first_audio'])}", file=file)
+    print(f"  song gap        p50/p99/max ms  {format_ms(result['gaps'])}", file=file)
+    for name, stats in result['playback'].items():
+        print(f"  player {name:<20} x{stats['count']:<4} first audio {format_ms(stats['first_audio']):<20} gap {format_ms(stats['gap'])}", file=file)
+    print(f"  cpu             bot {result['cpu_percent']:.1f}%  ffmpeg {result['ffmpeg_cpu_percent']:.1f}%", file=file)
+    print(f"  memory          bot {result['rss_mb']:.1f}MB  ffmpeg {result['ffmpeg_rss_mb']:.1f}MB over {result['ffmpeg_processes']} processes, largest Player {result['player_kb']:.1f}KB", file=file)
+    for leak in result['leaks']:
+        print(f"  leaked          {leak}", file=file)
+    if result['errors']:
+        print(f"  errors          {result['errors']}", file=file)
+
+
+async def main(args: argparse.Namespace) -> list[dict]:
+    audio = os.path.join(WORKDIR, 'tone.wav')
+    write_tone(audio, args.song_length)
+
+    DB.create_tables()
+    DB.fix_column_values()
+    YTDLInterface.set_backend(create_backend(audio, args.song_length, args.songs, args.latency, args.jitter, args.error_rate))
+    # -reconnect only applies to HTTP inputs
+    YTDLInterface.ffmpeg_options = {'options': '-vn', 'executable': args.ffmpeg, 'stderr': sys.stdout}
+    Utils.Pretests.update_check = update_check
+    if args.trace:
+        Tracer.configure(os.path.join(CWD, args.trace))
+    LeakTracker.grace = 0
+
+    cogs = {'queue': QueueManagement(None), 'playback': PlaybackManagement(None), 'player': PlayerManagement(None)}
+    results = []
+    for guild_count in args.guilds:
+        result = await run_step(guild_count, cogs, args)
+        print_step(result, file=sys.__stdout__)
+        results.append(result)
+    return results
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--guilds', type=lambda s: [int(i) for i in s.split(',')], default=[1, 5, 10, 25],
+                        help='comma separated guild counts to step through')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to simulate every step for')
+    parser.add_argument('--song-length', type=int, default=8, help='seconds of audio in every song')
+    parser.add_argument('--songs', type=int, default=50, help='how many different stub songs there are')
+    parser.add_argument('--queue', type=int, default=5, help='songs every guild queues up at the start')
+    parser.add_argument('--interval', type=float, default=2.0, help='average seconds between commands in a guild')
+    parser.add_argument('--skip-weight', type=float, default=1.0, help='how often /skip is picked compared to /queue and /now (4)')
+    parser.add_argument('--latency', type=float, default=0.2, help='seconds every extraction takes')
+    parser.add_argument('--jitter', type=float, default=0.1, help='random seconds added to every extraction')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='chance of an extraction failing')
+    parser.add_argument('--connect-latency', type=float, default=0.1, help='seconds joining a voice channel takes')
+    parser.add_argument('--ffmpeg', default='ffmpeg', help='the ffmpeg executable')
+    parser.add_argument('--json', help='file to write the results to')
+    parser.add_argument('--log', default=os.path.join(WORKDIR, 'bot.log'), help='file the bot logs to')
+    parser.add_argument('--trace', help='file to write the spans of every command to, see benchmarks/traces.py')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    print(f'Bot output is logged to {args.log}')
+    with open(args.log, 'w') as log, contextlib.redirect_stdout(log):
+        results = asyncio.run(main(args))
+        # The log writer thread could still be printing into the log
+        Log.flush()
+    if args.json:
+        with open(os.path.join(CWD, args.json), 'w') as f:
+            json.dump(results, f, indent=2)
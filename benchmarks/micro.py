@@ -0,0 +1,379 @@
+"""
+Micro-benchmarks for the bot's hot paths.
+
+Every benchmark is timed over enough loops to take at least --min-time seconds, repeated --repeat times.
+Results can be written as JSON and compared against a previous run to catch regressions.
+
+Usage:
+    python -m benchmarks.micro --json baseline.json
+    python -m benchmarks.micro --compare baseline.json --threshold 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import discord
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CWD = os.getcwd()
+sys.path.insert(0, ROOT)
+# DB opens settings.db in the working directory as soon as it is imported, keep the real one untouched
+os.chdir(tempfile.mkdtemp(prefix='micro-'))
+
+# Utils has to come first to import the rest of the bot in the right order
+import Utils
+import Buttons
+from Crossfade import CrossfadeAudio
+from DB import DB
+from Player import Player
+from PlaylistQueue import Queue
+from Servers import Servers
+from Song import Song
+from cogs.QueueManagement import QueueManagement
+
+from benchmarks.fakes import FakeGuild, FakeInteraction, FakeMember, FakeVoiceClient
+
+BENCHMARKS = {}
+
+
+def benchmark(name: str, calls: int = 1):
+    """
+    Registers a benchmark.
+
+    The decorated function is given a loop count and returns how many seconds those loops took,
+    so anything it has to set up for every loop can be left out of the timing.
+
+    Parameters
+    ----------
+    name : `str`
+        The name the results are reported under.
+    calls : `int`, optional
+        How many calls a single loop makes, results are reported per call.
+    """
+    def decorator(func):
+        BENCHMARKS[name] = (func, calls)
+        return func
+    return decorator
+
+
+def entry(i: int) -> dict:
+    """
+    A flat playlist entry, like the ones /playlist creates its Songs from.
+    """
+    return {
+        'ie_key': 'Youtube',
+        'url': f'https://www.youtube.com/watch?v=bench{i:06d}',
+        'id': f'bench{i:06d}',
+        'title': f'Benchmark song {i}',
+        'channel': f'Uploader {i % 50}',
+        'duration': 120 + i % 600,
+        'thumbnails': [{'url': f'https://i.ytimg.com/vi/bench{i:06d}/{size}.jpg'} for size in ('default', 'mqdefault', 'hqdefault')],
+    }
+
+
+def full(i: int) -> dict:
+    """
+    A fully extracted video, like the ones /play creates its Song from.
+    """
+    return {
+        'extractor_key': 'Youtube',
+        'webpage_url': f'https://www.youtube.com/watch?v=bench{i:06d}',
+        'original_url': f'https://www.youtube.com/watch?v=bench{i:06d}',
+        'url': f'https://rr1---sn-bench.googlevideo.com/videoplayback?expire={int(time.time()) + 21600}&ei=bench&id=bench{i:06d}',
+        'id': f'bench{i:06d}',
+        'title': f'Benchmark song {i}',
+        'channel': f'Uploader {i % 50}',
+        'duration': 212.0,
+        'thumbnails': [{'url': f'https://i.ytimg.com/vi/bench{i:06d}/{n}.jpg'} for n in range(40)],
+        'formats': [{'format_id': str(n), 'url': 'https://rr1---sn-bench.googlevideo.com/'} for n in range(30)],
+    }
+
+
+GUILD = FakeGuild('bench')
+DB.create_tables()
+DB.fix_column_values()
+DB.GuildSettings.create_new_guild(GUILD.id)
+
+
+def songs(count: int, requesters: int = 1) -> list[Song]:
+    members = [GUILD.listener] + [FakeMember(f'member{i}', GUILD.voice_channel) for i in range(requesters - 1)]
+    return [Song(FakeInteraction(GUILD, members[i % len(members)]), entry(i)['url'], entry(i)) for i in range(count)]
+
+
+def player(queue_songs: list[Song]) -> Player:
+    """
+    A Player that is playing the first Song, without a running player task.
+    """
+    self = Player.__new__(Player)
+    self.player_kill = asyncio.Event()
+    self.player_song_end = asyncio.Event()
+    self.queue = Queue()
+    self.queue.add(list(queue_songs[1:]))
+    self.song = queue_songs[0]
+    self.song.start()
+    self.looping = self.queue_looping = self.true_looping = False
+    self.last_np_message = None
+    self.vc = GUILD.voice_client
+    return self
+
+
+def time_loops(loops: int, setup, run) -> float:
+    """
+    Times run(setup()) for every loop without timing setup.
+    """
+    total = 0.0
+    for _ in range(loops):
+        value = setup()
+        start = time.perf_counter()
+        run(value)
+        total += time.perf_counter() - start
+    return total
+
+
+async def time_loops_async(loops: int, setup, run) -> float:
+    """
+    Times await run(setup()) for every loop without timing setup.
+    """
+    total = 0.0
+    for _ in range(loops):
+        value = setup()
+        start = time.perf_counter()
+        await run(value)
+        total += time.perf_counter() - start
+    return total
+
+
+# Queue
+
+@benchmark('queue.add')
+def bench_queue_add(loops: int) -> float:
+    song = songs(1)[0]
+    return time_loops(loops, Queue, lambda queue: queue.add(song))
+
+
+@benchmark('queue.add[5000]')
+def bench_queue_add_list(loops: int) -> float:
+    playlist = songs(5000)
+    return time_loops(loops, Queue, lambda queue: queue.add(playlist))
+
+
+@benchmark('queue.add_at[0]/1000')
+def bench_queue_add_at(loops: int) -> float:
+    queue, song = Queue(), songs(1)[0]
+    queue.add(songs(1000))
+
+    # Keep the Queue at 1000 Songs between loops
+    def setup():
+        if len(queue.queue) > 1000:
+            del queue.queue[0]
+        return queue
+    return time_loops(loops, setup, lambda queue: queue.add_at(song, 0))
+
+
+@benchmark('queue.remove[0]/1000')
+def bench_queue_remove(loops: int) -> float:
+    queue, song = Queue(), songs(1)[0]
+    queue.add(songs(1000))
+
+    # Keep the Queue at 1000 Songs between loops
+    def setup():
+        if len(queue.queue) < 1000:
+            queue.queue.insert(0, song)
+        return queue
+    return time_loops(loops, setup, lambda queue: queue.remove(0))
+
+
+@benchmark('queue.shuffle/1000')
+def bench_queue_shuffle(loops: int) -> float:
+    queue = Queue()
+    queue.add(songs(1000))
+    return time_loops(loops, lambda: None, lambda _: queue.shuffle())
+
+
+# Queue commands, run through the real callbacks
+
+def queue_command(loops: int, callback, queue_songs: list[Song], *args) -> float:
+    cog = QueueManagement(None)
+
+    def setup():
+        Servers.add(GUILD.id, player(queue_songs))
+        return FakeInteraction(GUILD)
+    return time_loops_async(loops, setup, lambda interaction: callback(cog, interaction, *args))
+
+
+@benchmark('/move/1000')
+async def bench_move(loops: int) -> float:
+    return await queue_command(loops, QueueManagement._move.callback, songs(1001), 900, 2)
+
+
+@benchmark('/remove user/1000')
+async def bench_remove_user(loops: int) -> float:
+    playlist = songs(1001, requesters=4)
+    return await queue_command(loops, QueueManagement._remove_user.callback, playlist, playlist[2].requester)
+
+
+@benchmark('/remove duplicates/1000')
+async def bench_remove_duplicates(loops: int) -> float:
+    # Every song is queued twice
+    playlist = songs(501)
+    return await queue_command(loops, QueueManagement._remove_dupes.callback, playlist + playlist[1:])
+
+
+# Song
+
+@benchmark('Song()')
+def bench_song(loops: int) -> float:
+    interaction, data = FakeInteraction(GUILD), full(0)
+    return time_loops(loops, lambda: None, lambda _: Song(interaction, data['original_url'], data))
+
+
+@benchmark('Song()[5000 entries]')
+def bench_song_playlist(loops: int) -> float:
+    interaction, entries = FakeInteraction(GUILD), [entry(i) for i in range(5000)]
+    return time_loops(loops, lambda: None, lambda _: [Song(interaction, entry['url'], entry) for entry in entries])
+
+
+@benchmark('Song.parse_duration', calls=100)
+def bench_parse_duration(loops: int) -> float:
+    durations = [random.Random(i).randrange(0, 200000) for i in range(100)]
+    return time_loops(loops, lambda: None, lambda _: [Song.parse_duration(duration) for duration in durations])
+
+
+@benchmark('Song.parse_duration_short_hand', calls=100)
+def bench_parse_duration_short_hand(loops: int) -> float:
+    durations = [random.Random(i).randrange(0, 200000) for i in range(100)]
+    return time_loops(loops, lambda: None, lambda _: [Song.parse_duration_short_hand(duration) for duration in durations])
+
+
+# Embeds
+
+@benchmark('get_now_playing_embed')
+def bench_now_playing_embed(loops: int) -> float:
+    current = player(songs(10))
+    return time_loops(loops, lambda: None, lambda _: Utils.get_now_playing_embed(current, progress=True))
+
+
+@benchmark('QueueButtons.get_queue_embed/5000')
+def bench_queue_embed(loops: int) -> float:
+    Servers.add(GUILD.id, player(songs(5001)))
+    interaction, view = FakeInteraction(GUILD), Buttons.QueueButtons(page=10)
+    return time_loops(loops, lambda: None, lambda _: view.get_queue_embed(interaction))
+
+
+# DB
+
+@benchmark('DB.GuildSettings.get')
+def bench_db_get(loops: int) -> float:
+    return time_loops(loops, lambda: None, lambda _: DB.GuildSettings.get(GUILD.id, 'np_sent_to_vc'))
+
+
+@benchmark('DB.GuildSettings.set')
+def bench_db_set(loops: int) -> float:
+    return time_loops(loops, lambda: None, lambda _: DB.GuildSettings.set(GUILD.id, 'verbose_np', True))
+
+
+# Audio
+
+class Frames(discord.AudioSource):
+    """
+    Hands out the same 20ms PCM frame forever.
+    """
+    def __init__(self, seed: int) -> None:
+        self.frame = random.Random(seed).randbytes(discord.opus.Encoder.FRAME_SIZE)
+
+    def read(self) -> bytes:
+        return self.frame
+
+
+@benchmark('CrossfadeAudio.read')
+def bench_crossfade(loops: int) -> float:
+    mixer = CrossfadeAudio(Frames(0), Frames(1), loops + 1)
+    return time_loops(loops, lambda: None, lambda _: mixer.read())
+
+
+async def measure(func, loops: int) -> float:
+    if asyncio.iscoroutinefunction(func):
+        return await func(loops)
+    return func(loops)
+
+
+async def run(func, calls: int, repeat: int, min_time: float) -> dict:
+    """
+    Runs a benchmark and gets the seconds a single call takes.
+
+    Returns
+    -------
+    dict
+        The median, min and standard deviation of a call over every repeat, and the loops per repeat.
+    """
+    # Find a loop count that takes long enough to time reliably
+    loops = 1
+    while (elapsed := await measure(func, loops)) < min_time and loops < 10 ** 7:
+        loops *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+    times = [await measure(func, loops) / (loops * calls) for _ in range(repeat)]
+    return {'median': statistics.median(times), 'min': min(times), 'stdev': statistics.stdev(times) if len(times) > 1 else 0.0, 'loops': loops}
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:.2f}{unit}'
+    return f'{seconds / 1e-9:.0f}ns'
+
+
+async def main(args: argparse.Namespace) -> int:
+    GUILD.voice_client = FakeVoiceClient(GUILD.voice_channel)
+    GUILD.voice_channel.members.append(GUILD.me)
+
+    baseline = None
+    if args.compare:
+        with open(os.path.join(CWD, args.compare), 'r') as f:
+            baseline = json.load(f)['results']
+
+    results, regressions = {}, []
+    for name, (func, calls) in BENCHMARKS.items():
+        if args.filter and args.filter not in name:
+            continue
+        result = results[name] = await run(func, calls, args.repeat, args.min_time)
+        line = f'{name:<36} {format_time(result["median"]):>10} +- {format_time(result["stdev"]):<10}'
+        if baseline and name in baseline:
+            change = result['median'] / baseline[name]['median'] - 1
+            line += f' {change:+.1%}'
+            if change > args.threshold:
+                regressions.append(name)
+                line += ' REGRESSION'
+        print(line)
+
+    if args.json:
+        with open(os.path.join(CWD, args.json), 'w') as f:
+            json.dump({'python': platform.python_version(),
+                       'platform': platform.platform(),
+                       'time': datetime.now().isoformat(timespec='seconds'),
+                       'results': results}, f, indent=2)
+    if regressions:
+        print(f'{len(regressions)} regression(s) over {args.threshold:.0%}: {", ".join(regressions)}')
+        return 1
+    return 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--filter', help='only run benchmarks with this in their name')
+    parser.add_argument('--repeat', type=int, default=5, help='times every benchmark is repeated')
+    parser.add_argument('--min-time', type=float, default=0.1, help='seconds every repeat should take at least')
+    parser.add_argument('--json', help='file to write the results to')
+    parser.add_argument('--compare', help='results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='slowdown that counts as a regression, 0.2 is 20%%')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,747 @@
+"""
+A local stand-in for Discord's gateway and REST API.
+
+Unlike the fakes in fakes.py, the bot talks to this over real HTTP and websockets, so discord.py's own
+HTTP client, rate limit handling, gateway and reconnect code are all part of what is measured.
+Point the bot at it with `discord_api_url` and `discord_gateway_url` in the .env file.
+
+Implemented:
+    Gateway: identify, resume, heartbeats, guild creation, member chunking, voice state updates,
+             reconnect requests, dropped connections and invalidated sessions.
+    REST: the bot user and application, command syncing, interaction callbacks, followups,
+          and sending, editing and deleting messages.  Optional per-route and global rate limits.
+
+Not implemented:
+    The voice server itself.  discord.py always connects to it over wss:// and needs PyNaCl and opus, so only
+    the gateway side of voice state is answered and joining a voice channel does not complete.
+
+Running this file starts the mock, launches the bot against it and reports command round-trips,
+rate limiting and reconnects.
+
+Usage:
+    python -m benchmarks.mock_discord --guilds 5 --count 50 --rate-limit 5/1 --reconnects 3
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import re
+import signal
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from aiohttp import WSMsgType, web
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from Timings import percentiles
+
+DISCORD_EPOCH = 1420070400000
+
+
+class Snowflakes:
+    """
+    Generates snowflakes with a real timestamp so discord.py's created_at values make sense.
+    """
+    def __init__(self) -> None:
+        self.__increment = itertools.count()
+
+    def __call__(self) -> str:
+        return str(((int(time.time() * 1000) - DISCORD_EPOCH) << 22) + (next(self.__increment) & 0xFFF))
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class InteractionRecord:
+    """
+    The timings of one interaction sent to the bot.
+
+    ...
+
+    Attributes
+    ----------
+    name : `str`
+        The command name.
+    sent : `float`
+        The perf_counter() value INTERACTION_CREATE was dispatched at.
+    acked : `float` | `None`
+        When the interaction callback arrived.
+    completed : `float` | `None`
+        When the first response with actual content arrived, ie: a message callback or the followup to a defer.
+    responses : `int`
+        How many callbacks, followups and edits were made with the interaction's token.
+    """
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.sent = time.perf_counter()
+        self.acked = None
+        self.completed = None
+        self.responses = 0
+        self.message_id = None
+        self.done = asyncio.Event()
+
+    def respond(self, content: bool) -> None:
+        now = time.perf_counter()
+        self.responses += 1
+        if self.acked is None:
+            self.acked = now
+        if content and self.completed is None:
+            self.completed = now
+            self.done.set()
+
+
+class RateLimiter:
+    """
+    Fixed window rate limits per bucket, plus an optional global limit, with Discord's headers.
+
+    ...
+
+    Attributes
+    ----------
+    limit : `int` | `None`
+        Requests allowed per bucket every window, None for no per-route limits.
+    window : `float`
+        The seconds a bucket's window lasts.
+    global_limit : `int` | `None`
+        Requests allowed every second across every bucket, None for no global limit.
+    limited : `dict[str, int]`
+        How many 429s every bucket returned.
+    """
+    def __init__(self, limit: int | None = None, window: float = 1.0, global_limit: int | None = None) -> None:
+        self.limit = limit
+        self.window = window
+        self.global_limit = global_limit
+        self.limited = {}
+        self.__buckets = {}
+        self.__global = (0.0, 0)
+
+    def check(self, bucket: str) -> tuple[dict, dict | None]:
+        """
+        Counts a request against its bucket.
+
+        Returns
+        -------
+        tuple[dict, dict | None]
+            The rate limit headers to send, and the body of a 429 if the request is limited.
+        """
+        now = time.monotonic()
+        if self.global_limit is not None:
+            start, count = self.__global
+            if now - start >= 1.0:
+                start, count = now, 0
+            count += 1
+            self.__global = (start, count)
+            if count > self.global_limit:
+                self.limited['global'] = self.limited.get('global', 0) + 1
+                retry_after = 1.0 - (now - start)
+                return ({'X-RateLimit-Global': 'true', 'X-RateLimit-Scope': 'global', 'Retry-After': f'{retry_after:.3f}'},
+                        {'message': 'You are being rate limited.', 'retry_after': retry_after, 'global': True})
+
+        if self.limit is None:
+            return {}, None
+        start, count = self.__buckets.get(bucket, (now, 0))
+        if now - start >= self.window:
+            start, count = now, 0
+        count += 1
+        self.__buckets[bucket] = (start, count)
+        reset_after = self.window - (now - start)
+        headers = {
+            'X-RateLimit-Limit': str(self.limit),
+            'X-RateLimit-Remaining': str(max(0, self.limit - count)),
+            'X-RateLimit-Reset': f'{time.time() + reset_after:.3f}',
+            'X-RateLimit-Reset-After': f'{reset_after:.3f}',
+            'X-RateLimit-Bucket': bucket.split(':')[0],
+        }
+        if count > self.limit:
+            self.limited[bucket] = self.limited.get(bucket, 0) + 1
+            headers['X-RateLimit-Scope'] = 'user'
+            headers['Retry-After'] = f'{reset_after:.3f}'
+            return headers, {'message': 'You are being rate limited.', 'retry_after': reset_after, 'global': False}
+        return headers, None
+
+
+class MockDiscord:
+    """
+    A local Discord gateway and REST API with a configurable number of guilds.
+
+    Every guild has a text channel, a voice channel and a listener sitting in the voice channel.
+
+    ...
+
+    Attributes
+    ----------
+    guilds : `list[dict]`
+        The guild payloads, with their `listener`, `text_channel` and `voice_channel` kept alongside.
+    commands : `dict[str, dict]`
+        The application commands the bot has synced, by name.
+    interactions : `dict[str, InteractionRecord]`
+        Every interaction sent to the bot, by id.
+    requests : `list[tuple[str, str, int, float]]`
+        The method, route, status and perf_counter() value of every REST request.
+    reconnects : `list[dict]`
+        The timings of every reconnect that was triggered.
+    identified : `asyncio.Event`
+        Set once the bot has identified and been sent its guilds.
+    synced : `asyncio.Event`
+        Set once the bot has synced its command tree.
+
+    Methods
+    -------
+    async start():
+        Starts the server.
+    async stop():
+        Stops the server.
+    async interact(guild: `int`, name: `str`, options: `list[dict]` | `None`):
+        Sends an application command interaction to the bot.
+    async reconnect(kind: `str`):
+        Makes the bot reconnect to the gateway.
+    """
+    HEARTBEAT_INTERVAL = 41250
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, guilds: int = 1, rate_limiter: RateLimiter | None = None, latency: float = 0.0) -> None:
+        """
+        Creates a MockDiscord object.
+
+        Parameters
+        ----------
+        host : `str`, optional
+            The interface to listen on.
+        port : `int`, optional
+            The port to listen on, 0 picks a free one.
+        guilds : `int`, optional
+            How many guilds the bot is in.
+        rate_limiter : `RateLimiter` | `None`, optional
+            The rate limits to enforce, none by default.
+        latency : `float`, optional
+            Seconds added to every REST response.
+        """
+        self.host = host
+        self.port = port
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.latency = latency
+        self.snowflake = Snowflakes()
+
+        self.application_id = self.snowflake()
+        self.bot_user = self.__user('MaBalls', bot=True, id=self.application_id)
+        self.guilds = [self.__guild(i) for i in range(guilds)]
+        self.commands = {}
+        self.messages = {}
+        self.interactions = {}
+        self.requests = []
+        self.reconnects = []
+
+        self.identified = asyncio.Event()
+        self.synced = asyncio.Event()
+
+        self.__ws = None
+        self.__session = None
+        self.__seq = 0
+        # Dispatches kept for replaying to a RESUME
+        self.__sent = []
+        self.__interaction_tokens = {}
+        self.__runner = None
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.host}:{self.port}'
+
+    @property
+    def gateway_url(self) -> str:
+        return f'ws://{self.host}:{self.port}/gateway'
+
+    async def start(self) -> None:
+        """
+        Starts the server.
+        """
+        app = web.Application()
+        app.router.add_get('/gateway', self.__gateway)
+        app.router.add_route('*', '/api/v{version}/{path:.*}', self.__rest)
+        self.__runner = web.AppRunner(app, access_log=None)
+        await self.__runner.setup()
+        site = web.TCPSite(self.__runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """
+        Stops the server.
+        """
+        if self.__ws is not None and not self.__ws.closed:
+            await self.__ws.close(code=1000)
+        await self.__runner.cleanup()
+
+    # Payloads
+
+    def __user(self, name: str, bot: bool = False, id: str | None = None) -> dict:
+        return {'id': id or self.snowflake(), 'username': name, 'discriminator': '0', 'global_name': name,
+                'avatar': None, 'bot': bot, 'public_flags': 0}
+
+    def __member(self, user: dict) -> dict:
+        return {'user': user, 'nick': None, 'roles': [], 'joined_at': now_iso(), 'deaf': False, 'mute': False, 'flags': 0}
+
+    def __guild(self, index: int) -> dict:
+        guild_id = self.snowflake()
+        text_channel = {'id': self.snowflake(), 'type': 0, 'name': 'general', 'position': 0, 'permission_overwrites': [],
+                        'parent_id': None, 'nsfw': False, 'topic': None, 'rate_limit_per_user': 0, 'last_message_id': None}
+        voice_channel = {'id': self.snowflake(), 'type': 2, 'name': 'voice', 'position': 1, 'permission_overwrites': [],
+                         'parent_id': None, 'bitrate': 64000, 'user_limit': 0, 'rtc_region': None}
+        listener = self.__user(f'listener{index}')
+        members = [self.__member(self.bot_user), self.__member(listener)]
+        return {
+            'id': guild_id, 'name': f'Mock guild {index}', 'icon': None, 'splash': None, 'discovery_splash': None,
+            'owner_id': listener['id'], 'afk_channel_id': None, 'afk_timeout': 300, 'verification_level': 0,
+            'default_message_notifications': 0, 'explicit_content_filter': 0, 'features': [], 'mfa_level': 0,
+            'system_channel_id': None, 'system_channel_flags': 0, 'rules_channel_id': None, 'vanity_url_code': None,
+            'description': None, 'banner': None, 'premium_tier': 0, 'preferred_locale': 'en-US',
+            'public_updates_channel_id': None, 'nsfw_level': 0, 'premium_progress_bar_enabled': False,
+            # Administrator, so every permission check passes
+            'roles': [{'id': guild_id, 'name': '@everyone', 'permissions': '8', 'position': 0, 'color': 0,
+                       'hoist': False, 'managed': False, 'mentionable': False, 'flags': 0}],
+            'emojis': [], 'stickers': [], 'joined_at': now_iso(), 'large': False, 'unavailable': False,
+            'member_count': len(members), 'members': members, 'channels': [text_channel, voice_channel],
+            'voice_states': [{'user_id': listener['id'], 'channel_id': voice_channel['id'], 'session_id': self.snowflake(),
+                              'deaf': False, 'mute': False, 'self_deaf': False, 'self_mute': False, 'self_video': False,
+                              'suppress': False, 'request_to_speak_timestamp': None}],
+            'threads': [], 'presences': [], 'stage_instances': [], 'guild_scheduled_events': [], 'soundboard_sounds': [],
+            'listener': listener, 'text_channel': text_channel, 'voice_channel': voice_channel,
+        }
+
+    def __guild_payload(self, guild: dict) -> dict:
+        return {key: value for key, value in guild.items() if key not in ('listener', 'text_channel', 'voice_channel')}
+
+    def __message(self, channel_id: str, body: dict, flags: int = 0) -> dict:
+        message = {
+            'id': self.snowflake(), 'channel_id': channel_id, 'author': self.bot_user, 'content': body.get('content') or '',
+            'timestamp': now_iso(), 'edited_timestamp': None, 'tts': False, 'mention_everyone': False, 'mentions': [],
+            'mention_roles': [], 'attachments': [], 'embeds': body.get('embeds') or [], 'pinned': False, 'type': 0,
+            'flags': body.get('flags', flags) or 0, 'components': body.get('components') or [],
+        }
+        self.messages[message['id']] = message
+        return message
+
+    # Gateway
+
+    async def __send(self, ws: web.WebSocketResponse, payload: dict) -> None:
+        if not ws.closed:
+            await ws.send_str(json.dumps(payload))
+
+    async def dispatch(self, event: str, data: dict) -> None:
+        """
+        Dispatches an event to the bot, or keeps it for a RESUME if the bot is disconnected.
+
+        Parameters
+        ----------
+        event : `str`
+            The event name, ie: `INTERACTION_CREATE`.
+        data : `dict`
+            The event data.
+        """
+        self.__seq += 1
+        payload = {'op': 0, 't': event, 's': self.__seq, 'd': data}
+        self.__sent.append(payload)
+        if self.__ws is not None:
+            await self.__send(self.__ws, payload)
+
+    async def __gateway(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        self.__ws = ws
+        if self.reconnects and self.reconnects[-1].get('connected') is None:
+            self.reconnects[-1]['connected'] = time.perf_counter()
+        await self.__send(ws, {'op': 10, 'd': {'heartbeat_interval': self.HEARTBEAT_INTERVAL}})
+
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+            payload = json.loads(msg.data)
+            match payload['op']:
+                case 1:
+                    await self.__send(ws, {'op': 11})
+                case 2:
+                    await self.__identify(ws)
+                case 6:
+                    await self.__resume(ws, payload['d'])
+                case 4:
+                    await self.__voice_state(payload['d'])
+                case 8:
+                    await self.__request_members(payload['d'])
+        if self.__ws is ws:
+            self.__ws = None
+        return ws
+
+    async def __identify(self, ws: web.WebSocketResponse) -> None:
+        self.__session = self.snowflake()
+        self.__sent.clear()
+        self.__seq = 0
+        if self.reconnects and self.reconnects[-1].get('ready') is None:
+            self.reconnects[-1]['ready'] = time.perf_counter()
+            self.reconnects[-1]['resumed'] = False
+        await self.dispatch('READY', {
+            'v': 10, 'user': self.bot_user, 'guilds': [{'id': guild['id'], 'unavailable': True} for guild in self.guilds],
+            'session_id': self.__session, 'resume_gateway_url': self.gateway_url, 'shard': [0, 1],
+            'application': {'id': self.application_id, 'flags': 0},
+        })
+        for guild in self.guilds:
+            await self.dispatch('GUILD_CREATE', self.__guild_payload(guild))
+        self.identified.set()
+
+    async def __resume(self, ws: web.WebSocketResponse, data: dict) -> None:
+        if data.get('session_id') != self.__session:
+            await self.__send(ws, {'op': 9, 'd': False})
+            return
+        # Replay everything the bot missed while it was away
+        for payload in self.__sent:
+            if payload['s'] > (data.get('seq') or 0):
+                await self.__send(ws, payload)
+        await self.dispatch('RESUMED', {})
+        if self.reconnects and self.reconnects[-1].get('ready') is None:
+            self.reconnects[-1]['ready'] = time.perf_counter()
+            self.reconnects[-1]['resumed'] = True
+
+    async def __voice_state(self, data: dict) -> None:
+        guild = next((guild for guild in self.guilds if guild['id'] == data.get('guild_id')), None)
+        if guild is None:
+            return
+        guild['voice_states'] = [state for state in guild['voice_states'] if state['user_id'] != self.bot_user['id']]
+        state = {'guild_id': guild['id'], 'user_id': self.bot_user['id'], 'channel_id': data.get('channel_id'),
+                 'session_id': self.__session, 'deaf': False, 'mute': False, 'self_deaf': data.get('self_deaf', False),
+                 'self_mute': data.get('self_mute', False), 'self_video': False, 'suppress': False,
+                 'request_to_speak_timestamp': None, 'member': self.__member(self.bot_user)}
+        if data.get('channel_id') is not None:
+            guild['voice_states'].append(state)
+        await self.dispatch('VOICE_STATE_UPDATE', state)
+
+    async def __request_members(self, data: dict) -> None:
+        guild_ids = data.get('guild_id')
+        for guild in self.guilds:
+            if guild['id'] == guild_ids or (isinstance(guild_ids, list) and guild['id'] in guild_ids):
+                await self.dispatch('GUILD_MEMBERS_CHUNK', {'guild_id': guild['id'], 'members': guild['members'],
+                                                           'chunk_index': 0, 'chunk_count': 1, 'nonce': data.get('nonce')})
+
+    async def interact(self, guild: int, name: str, options: list[dict] | None = None) -> InteractionRecord:
+        """
+        Sends an application command interaction to the bot from a guild's listener.
+
+        Parameters
+        ----------
+        guild : `int`
+            The index of the guild to send it from.
+        name : `str`
+            The name of the command.
+        options : `list[dict]` | `None`, optional
+            The command options, in Discord's format.
+
+        Returns
+        -------
+        InteractionRecord
+            The record the interaction's responses are timed in.
+        """
+        guild = self.guilds[guild]
+        command = self.commands.get(name, {'id': self.snowflake(), 'type': 1})
+        interaction_id, token = self.snowflake(), f'mock-token-{self.snowflake()}'
+        record = self.interactions[interaction_id] = InteractionRecord(name)
+        self.__interaction_tokens[token] = record
+        await self.dispatch('INTERACTION_CREATE', {
+            'id': interaction_id, 'application_id': self.application_id, 'type': 2, 'token': token, 'version': 1,
+            'data': {'id': command['id'], 'name': name, 'type': command.get('type', 1), 'options': options or []},
+            'guild_id': guild['id'], 'channel_id': guild['text_channel']['id'],
+            'channel': {**guild['text_channel'], 'guild_id': guild['id']},
+            'member': {**self.__member(guild['listener']), 'permissions': '8'},
+            'app_permissions': '8', 'locale': 'en-US', 'guild_locale': 'en-US', 'entitlements': [],
+            'authorizing_integration_owners': {'0': guild['id']}, 'context': 0, 'attachment_size_limit': 8388608,
+        })
+        return record
+
+    async def reconnect(self, kind: str = 'reconnect') -> dict:
+        """
+        Makes the bot reconnect to the gateway.
+
+        Parameters
+        ----------
+        kind : `str`, optional
+            `reconnect` sends a RECONNECT, `drop` closes the connection with a resumable code
+            and `invalidate` invalidates the session so the bot has to identify again.
+
+        Returns
+        -------
+        dict
+            The reconnect's timings, filled in as the bot comes back.
+        """
+        entry = {'kind': kind, 'triggered': time.perf_counter(), 'connected': None, 'ready': None}
+        self.reconnects.append(entry)
+        ws, self.__ws = self.__ws, None
+        if ws is None:
+            return entry
+        match kind:
+            case 'reconnect':
+                await self.__send(ws, {'op': 7, 'd': None})
+            case 'drop':
+                await ws.close(code=4000, message=b'Unknown error')
+            case 'invalidate':
+                entry['connected'] = entry['triggered']
+                self.__ws = ws
+                await self.__send(ws, {'op': 9, 'd': False})
+            case default:
+                raise ValueError(f'Invalid reconnect kind supplied ({default})')
+        return entry
+
+    # REST
+
+    async def __rest(self, request: web.Request) -> web.Response:
+        path = '/' + request.match_info['path']
+        body = await self.__body(request)
+        bucket = self.__bucket(request.method, path)
+        headers, limited = self.rate_limiter.check(bucket)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if limited is not None:
+            status, data = 429, limited
+        else:
+            status, data = await self.__handle(request.method, path, body)
+        self.requests.append((request.method, bucket.split(':')[0].split(' ', 1)[1], status, time.perf_counter()))
+        # discord.py treats a 429 without Via as a Cloudflare ban
+        headers['Via'] = '1.1 google'
+        if status == 204:
+            return web.Response(status=204, headers=headers)
+        # discord.py only parses the body when the content type is exactly this, without a charset
+        headers['Content-Type'] = 'application/json'
+        return web.Response(body=json.dumps(data).encode('utf-8'), status=status, headers=headers)
+
+    async def __body(self, request: web.Request) -> dict:
+        if not request.can_read_body:
+            return {}
+        if request.content_type == 'application/json':
+            return await request.json()
+        # Multipart bodies carry their JSON in payload_json
+        form = await request.post()
+        return json.loads(form.get('payload_json', '{}'))
+
+    def __bucket(self, method: str, path: str) -> str:
+        """
+        Turns a path into a bucket in the same way Discord does, the route with only its major parameter kept.
+        """
+        template = re.sub(r'/\d{15,}', '/{id}', path)
+        template = re.sub(r'/mock-token-\d+', '/{token}', template)
+        major = re.match(r'/(channels|guilds|webhooks|interactions)/(\d+)', path)
+        return f'{method} {template}:{major.group(2) if major else ""}'
+
+    async def __handle(self, method: str, path: str, body: dict) -> tuple[int, dict | list | None]:
+        parts = path.strip('/').split('/')
+        match method, parts:
+            case 'GET', ['users', '@me']:
+                return 200, self.bot_user
+            case 'GET', ['oauth2', 'applications', '@me']:
+                return 200, {'id': self.application_id, 'name': 'MaBalls', 'icon': None, 'description': '',
+                             'rpc_origins': [], 'bot_public': True, 'bot_require_code_grant': False,
+                             'owner': self.guilds[0]['listener'] if self.guilds else self.bot_user,
+                             'verify_key': '', 'team': None, 'flags': 0, 'summary': '', 'bot': self.bot_user}
+            case 'GET', ['gateway', *_]:
+                return 200, {'url': self.gateway_url, 'shards': 1,
+                             'session_start_limit': {'total': 1000, 'remaining': 1000, 'reset_after': 0, 'max_concurrency': 1}}
+            case 'PUT', ['applications', _, 'commands'] | ['applications', _, 'guilds', _, 'commands']:
+                self.commands = {command['name']: {**command, 'id': self.snowflake(), 'application_id': self.application_id,
+                                                   'version': self.snowflake()} for command in body}
+                self.synced.set()
+                return 200, list(self.commands.values())
+            case 'GET', ['applications', _, 'commands'] | ['applications', _, 'guilds', _, 'commands']:
+                return 200, list(self.commands.values())
+            case 'POST', ['interactions', interaction_id, token, 'callback']:
+                return self.__callback(interaction_id, token, body)
+            case 'POST', ['webhooks', _, token]:
+                record = self.__interaction_tokens.get(token)
+                if record is None:
+                    return 404, {'message': 'Unknown Webhook', 'code': 10015}
+                record.respond(content=True)
+                return 200, self.__message(self.guilds[0]['text_channel']['id'] if self.guilds else '0', body)
+            case 'GET' | 'PATCH' | 'DELETE', ['webhooks', _, token, 'messages', message_id]:
+                record = self.__interaction_tokens.get(token)
+                if record is None:
+                    return 404, {'message': 'Unknown Webhook', 'code': 10015}
+                if method == 'PATCH':
+                    record.respond(content=True)
+                return self.__edit(method, message_id if message_id != '@original' else record.message_id, body)
+            case 'POST', ['channels', channel_id, 'messages']:
+                return 200, self.__message(channel_id, body)
+            case 'GET' | 'PATCH' | 'DELETE', ['channels', _, 'messages', message_id]:
+                return self.__edit(method, message_id, body)
+        return 404, {'message': f'Mock does not implement {method} {path}', 'code': 0}
+
+    def __callback(self, interaction_id: str, token: str, body: dict) -> tuple[int, dict]:
+        record = self.interactions.get(interaction_id)
+        if record is None:
+            return 404, {'message': 'Unknown interaction', 'code': 10062}
+        if record.acked is not None:
+            return 400, {'message': 'Interaction has already been acknowledged.', 'code': 40060}
+        callback_type, data = body.get('type'), body.get('data') or {}
+        # 4 sends a message and 7 edits the original one, 5 and 6 only defer
+        record.respond(content=callback_type in (4, 7))
+        message = self.__message(self.guilds[0]['text_channel']['id'], data) if callback_type == 4 else None
+        record.message_id = message['id'] if message else self.snowflake()
+        response = {'interaction': {'id': interaction_id, 'type': 2, 'response_message_id': record.message_id,
+                                    'response_message_loading': callback_type == 5,
+                                    'response_message_ephemeral': bool((data.get('flags') or 0) & 64)}}
+        if message is not None:
+            response['resource'] = {'type': callback_type, 'message': message}
+        return 200, response
+
+    def __edit(self, method: str, message_id: str, body: dict) -> tuple[int, dict | None]:
+        message = self.messages.get(message_id)
+        if message is None:
+            if method != 'PATCH':
+                return 404, {'message': 'Unknown Message', 'code': 10008}
+            # The original response to a defer only exists once it is edited
+            message = self.messages[message_id] = {**self.__message('0', {}), 'id': message_id}
+        match method:
+            case 'DELETE':
+                del self.messages[message_id]
+                return 204, None
+            case 'PATCH':
+                message.update({key: value for key, value in body.items() if key in ('content', 'embeds', 'components', 'flags')})
+                message['edited_timestamp'] = now_iso()
+        return 200, message
+
+
+# Scenario
+
+
+def summarize(records: list[InteractionRecord]) -> dict:
+    return {
+        'count': len(records),
+        'unanswered': sum(record.acked is None for record in records),
+        'ack': percentiles([record.acked - record.sent for record in records if record.acked is not None]),
+        'complete': percentiles([record.completed - record.sent for record in records if record.completed is not None]),
+    }
+
+
+def format_ms(stats: dict) -> str:
+    if not stats:
+        return '-'
+    return '/'.join(f'{stats[key] * 1000:.1f}' for key in ('p50', 'p99', 'max'))
+
+
+async def run_commands(mock: MockDiscord, commands: list[str], count: int, concurrency: int, timeout: float) -> list[InteractionRecord]:
+    """
+    Sends count interactions of every command, spread across the guilds, at most concurrency at a time.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    records = []
+
+    async def one(i: int, name: str) -> None:
+        async with semaphore:
+            record = await mock.interact(i % len(mock.guilds), name)
+            records.append(record)
+            try:
+                await asyncio.wait_for(record.done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+    await asyncio.gather(*(one(i, name) for name in commands for i in range(count)))
+    return records
+
+
+async def main(args: argparse.Namespace) -> dict:
+    limit, window = (int(args.rate_limit.split('/')[0]), float(args.rate_limit.split('/')[1])) if args.rate_limit else (None, 1.0)
+    mock = MockDiscord(guilds=args.guilds, latency=args.latency, rate_limiter=RateLimiter(limit, window, args.global_limit))
+    await mock.start()
+    print(f'Mock Discord listening on {mock.url}')
+
+    workdir = tempfile.mkdtemp(prefix='mock-discord-')
+    env = {**os.environ, 'key': 'mock-token', 'discord_api_url': mock.url, 'discord_gateway_url': mock.gateway_url,
+           'enable_GuildManagement': 'true', 'enable_QueueManagement': 'true', 'enable_PlaybackManagement': 'true',
+           'enable_PlayerManagement': 'true', 'extractor_backend': 'replay', 'PYTHONUNBUFFERED': '1'}
+    log = open(os.path.join(workdir, 'bot.log'), 'w')
+    print(f'Bot output is logged to {log.name}')
+    started = time.perf_counter()
+    bot = await asyncio.create_subprocess_exec(sys.executable, os.path.join(ROOT, 'musS_D.py'), cwd=workdir, env=env,
+                                               stdout=log, stderr=asyncio.subprocess.STDOUT)
+    results = {}
+    try:
+        await asyncio.wait_for(asyncio.gather(mock.identified.wait(), mock.synced.wait()), args.timeout)
+        results['startup_seconds'] = time.perf_counter() - started
+        # Give on_ready time to finish before measuring
+        await asyncio.sleep(1)
+
+        records = await run_commands(mock, args.commands, args.count, args.concurrency, args.timeout)
+        results['commands'] = {name: summarize([record for record in records if record.name == name]) for name in args.commands}
+
+        reconnects = []
+        for i in range(args.reconnects):
+            kind = ('reconnect', 'drop', 'invalidate')[i % 3]
+            entry = await mock.reconnect(kind)
+            # Sent while the bot is away, it has to be replayed or arrive after the new session is up
+            record = await mock.interact(0, args.commands[0])
+            try:
+                await asyncio.wait_for(record.done.wait(), args.timeout)
+            except asyncio.TimeoutError:
+                pass
+            reconnects.append({'kind': kind,
+                               'resumed': entry.get('resumed'),
+                               'reconnect_seconds': entry['ready'] - entry['triggered'] if entry.get('ready') else None,
+                               'interaction_seconds': record.completed - record.sent if record.completed else None})
+            await asyncio.sleep(1)
+        results['reconnects'] = reconnects
+    finally:
+        if bot.returncode is None:
+            bot.send_signal(signal.SIGINT)
+            try:
+                await asyncio.wait_for(bot.wait(), 10)
+            except asyncio.TimeoutError:
+                bot.kill()
+        await mock.stop()
+        log.close()
+
+    statuses = {}
+    for method, route, status, _ in mock.requests:
+        statuses.setdefault(f'{method} {route}', {}).setdefault(str(status), 0)
+        statuses[f'{method} {route}'][str(status)] += 1
+    results['requests'] = statuses
+    results['rate_limited'] = mock.rate_limiter.limited
+    return results
+
+
+def print_results(results: dict) -> None:
+    print(f"\nstartup to synced commands  {results.get('startup_seconds', 0):.2f}s")
+    for name, stats in results.get('commands', {}).items():
+        print(f"  /{name:<10} x{stats['count']:<5} ack p50/p99/max ms {format_ms(stats['ack']):<22} "
+              f"complete {format_ms(stats['complete']):<22} unanswered {stats['unanswered']}")
+    for reconnect in results.get('reconnects', []):
+        seconds = reconnect['reconnect_seconds']
+        interaction = reconnect['interaction_seconds']
+        print(f"  {reconnect['kind']:<10} back in {f'{seconds * 1000:.0f}ms' if seconds is not None else 'never':<8} "
+              f"({'resumed' if reconnect['resumed'] else 'identified'}), interaction sent meanwhile answered in "
+              f"{f'{interaction * 1000:.0f}ms' if interaction is not None else 'never'}")
+    print('  requests')
+    for route, statuses in sorted(results.get('requests', {}).items()):
+        print(f'    {route:<60} {statuses}')
+    if results.get('rate_limited'):
+        print(f"  429s by bucket {results['rate_limited']}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--guilds', type=int, default=5, help='guilds the bot is in')
+    parser.add_argument('--commands', type=lambda s: s.split(','), default=['help', 'now', 'queue'],
+                        help='comma separated commands to send, ones that need voice will not complete')
+    parser.add_argument('--count', type=int, default=20, help='interactions to send of every command')
+    parser.add_argument('--concurrency', type=int, default=5, help='interactions in flight at once')
+    parser.add_argument('--rate-limit', help='requests/seconds allowed per route bucket, ie: 5/1')
+    parser.add_argument('--global-limit', type=int, help='requests allowed every second across all routes')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every REST response')
+    parser.add_argument('--reconnects', type=int, default=3, help='gateway reconnects to trigger, cycling through RECONNECT, a dropped connection and an invalidated session')
+    parser.add_argument('--timeout', type=float, default=30.0, help='seconds to wait for the bot at every step')
+    parser.add_argument('--json', help='file to write the results to')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    results = asyncio.run(main(args))
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,123 @@
+"""
+Seek latency, how long ffmpeg takes to produce its first frame when started at different positions in long media.
+
+The media is an Opus WebM like the streams YouTube serves, generated once and served over local HTTP with range
+requests, and every position is started with the ffmpeg options the Player uses.  Input-side seeking (what the
+Player does for /seek, t= links and restarts) is compared with output-side seeking, which decodes everything
+before the position and throws it away.
+
+    python -m benchmarks.seek
+    python -m benchmarks.seek --length 7200 --positions 0,600,3600,7000 --repeat 5
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from aiohttp import web
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import discord
+
+from Timings import percentiles
+from YTDLInterface import YTDLInterface
+
+# The generated media is a clip this long looped, encoding an hour of audio would take minutes
+CLIP_SECONDS = 60
+
+
+def make_media(path: str, seconds: int) -> None:
+    """
+    Writes a stereo 48kHz Opus WebM of a tone, at least seconds long.
+    """
+    clip = f'{path}.clip.webm'
+    subprocess.run(['ffmpeg', '-v', 'error', '-y', '-f', 'lavfi', '-i', f'sine=frequency=440:sample_rate=48000:duration={CLIP_SECONDS}',
+                    '-ac', '2', '-c:a', 'libopus', '-b:a', '128k', clip], check=True)
+    # Remuxing the clip over and over is quick and keeps the cues ffmpeg seeks with
+    subprocess.run(['ffmpeg', '-v', 'error', '-y', '-stream_loop', str(-(-seconds // CLIP_SECONDS) - 1), '-i', clip,
+                    '-c', 'copy', path], check=True)
+    os.remove(clip)
+
+
+async def serve(path: str) -> tuple[web.AppRunner, str]:
+    """
+    Serves the media over HTTP on a free local port, FileResponse answers range requests like a CDN would.
+    """
+    app = web.Application()
+    app.router.add_get('/media.webm', lambda request: web.FileResponse(path))
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f'http://127.0.0.1:{port}/media.webm'
+
+
+def first_frame(url: str, position: float, input_side: bool) -> float:
+    """
+    Starts ffmpeg at a position and times how long the first 20ms frame takes to arrive.
+
+    Returns
+    -------
+    float
+        The seconds from starting the process to reading the frame.
+    """
+    options = dict(YTDLInterface.ffmpeg_options)
+    if input_side:
+        options['before_options'] = f"-ss {position:.3f} {options.get('before_options', '')}".rstrip()
+    else:
+        options['options'] = f"{options.get('options', '')} -ss {position:.3f}".lstrip()
+    start = time.perf_counter()
+    source = discord.FFmpegPCMAudio(url, **options)
+    try:
+        if not source.read():
+            raise RuntimeError(f'ffmpeg produced no audio at {position}s')
+        return time.perf_counter() - start
+    finally:
+        source.cleanup()
+
+
+async def main(args: argparse.Namespace) -> int:
+    path = os.path.join(tempfile.gettempdir(), f'seek-{args.length}.webm')
+    if not os.path.exists(path):
+        print(f'Generating {args.length}s of media at {path}...')
+        await asyncio.to_thread(make_media, path, args.length)
+    positions = [float(position) for position in args.positions.split(',')] if args.positions else \
+        [args.length * share for share in (0, 0.1, 0.25, 0.5, 0.9)]
+
+    runner, url = await serve(path)
+    try:
+        print(f"{'position':>10}{'input p50 ms':>16}{'input max ms':>16}{'output p50 ms':>16}{'output max ms':>16}")
+        for position in positions:
+            results = {}
+            for input_side in (True, False):
+                if not input_side and args.input_only:
+                    continue
+                # ffmpeg blocks while it reads, the server has to keep answering meanwhile
+                results[input_side] = percentiles([await asyncio.to_thread(first_frame, url, position, input_side) for _ in range(args.repeat)])
+            line = f'{position:>9.0f}s'
+            for input_side in (True, False):
+                stats = results.get(input_side)
+                line += f"{stats['p50'] * 1000:>16.1f}{stats['max'] * 1000:>16.1f}" if stats else f"{'-':>16}{'-':>16}"
+            print(line)
+    finally:
+        await runner.cleanup()
+    return 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--length', type=int, default=3600, help='seconds of media to seek in')
+    parser.add_argument('--positions', help='comma separated seconds to start at, defaults to 0, 10, 25, 50 and 90%% of the length')
+    parser.add_argument('--repeat', type=int, default=3, help='times every position is started')
+    parser.add_argument('--input-only', action='store_true', help="skip output-side seeking, it's slow far into long media")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main(parse_args())))
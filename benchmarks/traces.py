@@ -0,0 +1,99 @@
+"""
+Latency breakdowns from the spans the bot writes when `trace_file` is set.
+
+Every span is grouped by its name (the stage it timed) and optionally by one of its attributes,
+ie: the source of the song, and summarized as percentiles.  Traces can be filtered down to the
+ones started by a single command.
+
+    python -m benchmarks.traces traces.jsonl
+    python -m benchmarks.traces traces.jsonl --by source --command /play
+"""
+import argparse
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from Timings import percentiles
+
+
+def load(file: str) -> list[dict]:
+    """
+    Reads every span from a JSON lines file, skipping lines that were cut off.
+    """
+    spans = []
+    with open(file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                spans.append(json.loads(line))
+            except ValueError:
+                continue
+    return spans
+
+
+def breakdown(spans: list[dict], by: str | None = None, command: str | None = None) -> dict:
+    """
+    Groups spans by name and an attribute and summarizes their durations.
+
+    Parameters
+    ----------
+    spans : `list[dict]`
+        The spans to summarize.
+    by : `str` | `None`
+        The attribute to split every stage by, ie: source.
+    command : `str` | `None`
+        Only count traces whose root span has this name, ie: /play.
+
+    Returns
+    -------
+    dict
+        (name, attribute value) to the count, error count and duration percentiles in milliseconds.
+    """
+    if command is not None:
+        traces = {span['trace_id'] for span in spans if span['parent_span_id'] is None and span['name'] == command}
+        spans = [span for span in spans if span['trace_id'] in traces]
+
+    # Stages are split by the attribute of their trace when they don't have it themselves,
+    # ie: a /play's extraction phase is split by the source the yt-dlp span found
+    trace_values = {}
+    if by is not None:
+        for span in spans:
+            value = span['attributes'].get(by)
+            if value is not None:
+                trace_values.setdefault(span['trace_id'], value)
+
+    groups = {}
+    for span in spans:
+        value = span['attributes'].get(by, trace_values.get(span['trace_id'])) if by is not None else None
+        groups.setdefault((span['name'], value), []).append(span)
+
+    return {key: {
+        'count': len(group),
+        'errors': sum(span['status'] == 'error' for span in group),
+        **percentiles([span['duration_ms'] for span in group]),
+    } for key, group in groups.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Summarizes the spans written by the bot into per-stage latency breakdowns.')
+    parser.add_argument('file', help='the trace file')
+    parser.add_argument('--by', help='an attribute to split every stage by, ie: source or guild_id')
+    parser.add_argument('--command', help='only count traces started by this command, ie: /play')
+    parser.add_argument('--json', action='store_true', help='print JSON instead of a table')
+    args = parser.parse_args()
+
+    result = breakdown(load(args.file), args.by, args.command)
+    if args.json:
+        print(json.dumps([{'name': name, args.by or 'group': value, **stats} for (name, value), stats in result.items()], indent=2))
+        return
+
+    print(f"{'stage':<28}{args.by or '':<16}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for (name, value), stats in sorted(result.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+        print(f"{name:<28}{str(value) if value is not None else '':<16}{stats['count']:>7}{stats['errors']:>8}"
+              f"{stats['p50']:>10.1f}{stats['p90']:>10.1f}{stats['p99']:>10.1f}{stats['max']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+import asyncio
+import io
+import os
+import tracemalloc
+from datetime import datetime
+
+import discord
+from discord.ext import commands
+from discord import app_commands
+
+import Utils
+from Log import Log
+from MemoryStats import LeakTracker, MemoryStats
+from ProcStats import ProcStats
+from Profiler import SamplingProfiler
+from Servers import Servers
+from Timings import PlaybackStats
+
+
+class Diagnostics(commands.Cog):
+    """
+    Developer-only commands for finding out why the bot is slow.
+    """
+    def __init__(self, bot: discord.Client):
+        self.bot = bot
+
+    @app_commands.command(name="blocking", description="Developer only, dumps what has been blocking the event loop")
+    async def _blocking(self, interaction: discord.Interaction, reset: bool = False) -> None:
+        if not self.__is_developer(interaction):
+            await interaction.response.send_message("This command is only available to the bot's developers.", ephemeral=True)
+            return
+
+        lag = self.bot.lag_sampler.get_percentiles()
+        content = 'No lag recorded yet.' if not lag else ' '.join(f'{name} {value * 1000:.1f}ms' for name, value in lag.items())
+
+        detector = self.bot.block_detector
+        if detector is None:
+            await interaction.response.send_message(f"Event loop lag: {content}\nSet `block_threshold` in the .env file to record what blocks the loop.", ephemeral=True)
+            return
+
+        dump = detector.dump()
+        await interaction.response.send_message(
+            f"Event loop lag: {content}\n{len(detector.blocks)} block{'' if len(detector.blocks) == 1 else 's'} over {detector.threshold * 1000:.0f}ms recorded.",
+            file=discord.File(io.BytesIO(dump.encode('utf-8')), filename='blocking.txt'),
+            ephemeral=True)
+        if reset:
+            detector.reset()
+            self.bot.lag_sampler.reset()
+
+    @app_commands.command(name="playbackstats", description="Developer only, shows the time to first audio and the gaps between songs")
+    async def _playbackstats(self, interaction: discord.Interaction, everywhere: bool = False) -> None:
+        if not self.__is_developer(interaction):
+            await interaction.response.send_message("This command is only available to the bot's developers.", ephemeral=True)
+            return
+
+        summary = PlaybackStats.summary(None if everywhere else interaction.guild_id)
+        embed = discord.Embed(title=f"Playback timings {'across every server' if everywhere else 'in this server'}",
+                              description='Milliseconds, p50 / p90 / p99 / max of the most recent songs.' if summary else 'No songs have played yet.')
+        for (cache, source), stats in summary.items():
+            lines = [f"{name.replace('_', ' ')}: " + ' / '.join(f'{value * 1000:.0f}' for value in stats[name].values())
+                     for name in ('first_audio', 'gap', 'populate') if stats[name]]
+            embed.add_field(name=f"{source}, cache {cache} ({stats['count']} songs)", value='\n'.join(lines), inline=False)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="profile", description="Developer only, profiles every thread of the bot for a while")
+    async def _profile(self, interaction: discord.Interaction, seconds: app_commands.Range[int, 1, 120] = 15) -> None:
+        if not self.__is_developer(interaction):
+            await interaction.response.send_message("This command is only available to the bot's developers.", ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        profiler = SamplingProfiler()
+        # Sampling from another thread lets it see the event loop
+        await asyncio.to_thread(profiler.run, seconds)
+
+        os.makedirs('profiles', exist_ok=True)
+        path = os.path.join('profiles', f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}.collapsed")
+        collapsed = profiler.collapsed()
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(collapsed)
+        Utils.pront(f"Saved a {seconds}s profile to {path}", lvl="OKCYAN")
+
+        embed = discord.Embed(title=f"Profiled {seconds}s, {profiler.samples} samples",
+                              description=f"Saved to `{path}`, the attachment can be opened with flamegraph.pl or speedscope.")
+        for inclusive in (False, True):
+            top = profiler.top(10, inclusive)
+            embed.add_field(name='Including callees' if inclusive else 'Self',
+                            value='\n'.join(f'`{share * 100:5.1f}%` {frame[:80]}' for frame, share in top) or 'Nothing but waiting.',
+                            inline=False)
+        await interaction.followup.send(embed=embed, file=discord.File(io.BytesIO(collapsed.encode('utf-8')), filename=os.path.basename(path)),
+                                        ephemeral=True)
+
+    @app_commands.command(name="memory", description="Developer only, estimates the memory used by the Players and the bot's caches")
+    async def _memory(self, interaction: discord.Interaction) -> None:
+        if not self.__is_developer(interaction):
+            await interaction.response.send_message("This command is only available to the bot's developers.", ephemeral=True)
+            return
+
+        players = list(Servers.dict.values())
+        totals = MemoryStats.totals(self.bot, players)
+        rss = ProcStats.rss_bytes()
+        embed = discord.Embed(title="Memory", description=f"Process RSS {self.__format_bytes(rss) if rss is not None else 'unknown'}, estimates below.")
+        embed.add_field(name="Subsystems", value='\n'.join(f'{name}: {self.__format_bytes(size)}' for name, size in totals.items()), inline=False)
+
+        player = Servers.get_player(interaction.guild_id)
+        if player is not None:
+            parts = MemoryStats.player(player)
+            embed.add_field(name=f"This server's Player ({len(player.queue)} queued)",
+                            value='\n'.join(f'{name}: {self.__format_bytes(size)}' for name, size in parts.items()), inline=False)
+        if players:
+            largest = sorted(((MemoryStats.player(player)['total'], player) for player in players), key=lambda item: item[0], reverse=True)[:5]
+            embed.add_field(name=f"Largest of {len(players)} Player{'' if len(players) == 1 else 's'}",
+                            value='\n'.join(f'{player.vc.guild.id}: {self.__format_bytes(size)}' for size, player in largest), inline=False)
+
+        alive, released = LeakTracker.counts()
+        leaks = LeakTracker.leaks()
+        embed.add_field(name="Players in memory",
+                        value=f"{alive} alive, {released} cleaned but not freed yet, {len(leaks)} still alive {LeakTracker.grace:.0f}s after being cleaned",
+                        inline=False)
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            embed.set_footer(text=f"tracemalloc: {self.__format_bytes(current)} traced, {self.__format_bytes(peak)} peak")
+        if not leaks:
+            await interaction.response.send_message(embed=embed, ephemeral=True)
+            return
+        report = '\n\n'.join(f"{type(obj).__name__} cleaned {seconds:.0f}s ago, kept alive by:\n{LeakTracker.referrer_chain(obj) or 'nothing found'}"
+                              for obj, seconds in leaks[:5])
+        await interaction.response.send_message(embed=embed, file=discord.File(io.BytesIO(report.encode('utf-8')), filename='leaks.txt'), ephemeral=True)
+
+    @app_commands.command(name="tasks", description="Developer only, shows the background tasks every server's Player is running")
+    async def _tasks(self, interaction: discord.Interaction) -> None:
+        if not self.__is_developer(interaction):
+            await interaction.response.send_message("This command is only available to the bot's developers.", ephemeral=True)
+            return
+
+        players = list(Servers.dict.values())
+        owned = sum(len(player.tasks) for player in players)
+        embed = discord.Embed(title="Tasks", description=f"{len(asyncio.all_tasks())} running, {owned} of them owned by {len(players)} Player{'' if len(players) == 1 else 's'}.")
+        totals = self.bot.guild_task_counts()
+        if totals:
+            embed.add_field(name="By kind", value='\n'.join(f'{kind}: {count}' for (kind,), count in sorted(totals.items())), inline=False)
+            busiest = sorted(players, key=lambda player: len(player.tasks), reverse=True)[:10]
+            embed.add_field(name="Busiest servers",
+                            value='\n'.join(f"{player.vc.guild.id}: " + ', '.join(f'{count} {kind}' for kind, count in player.tasks.counts().items())
+                                            for player in busiest), inline=False)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="tracemalloc", description="Developer only, tracks allocations and shows what grew between snapshots")
+    @app_commands.choices(action=[app_commands.Choice(name=action, value=action) for action in ('start', 'snapshot', 'stop')])
+    async def _tracemalloc(self, interaction: discord.Interaction, action: str) -> None:
+        if not self.__is_developer(interaction):
+            await interaction.response.send_message("This command is only available to the bot's developers.", ephemeral=True)
+            return
+
+        if action == 'start':
+            MemoryStats.start_tracing()
+            Utils.pront(f"tracemalloc started by {interaction.user}", lvl="WARNING")
+            await interaction.response.send_message("Tracking allocations, everything is slower until `stop`. Take a snapshot now to use as the baseline.", ephemeral=True)
+            return
+        if action == 'stop':
+            MemoryStats.stop_tracing()
+            Utils.pront(f"tracemalloc stopped by {interaction.user}", lvl="WARNING")
+            await interaction.response.send_message("Stopped tracking allocations.", ephemeral=True)
+            return
+        if not tracemalloc.is_tracing():
+            await interaction.response.send_message("Allocations aren't being tracked, use `start` first.", ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        # Snapshots of a large heap take seconds, the comparisons are pure Python
+        taken = {'previous': MemoryStats.previous, 'baseline': MemoryStats.baseline}
+        diffs = await asyncio.to_thread(MemoryStats.snapshot)
+        current, peak = tracemalloc.get_traced_memory()
+        embed = discord.Embed(title="tracemalloc snapshot",
+                              description=f"{self.__format_bytes(current)} traced, {self.__format_bytes(peak)} peak."
+                                          + ('' if diffs else ' This is the baseline, take another snapshot later to see what grew.'))
+        for name, stats in diffs.items():
+            embed.add_field(name=f"Grown since the {name} ({taken[name][0].strftime('%X')})",
+                            value='\n'.join(f'`{self.__format_bytes(stat.size_diff):>10}` {stat.count_diff:+} {str(stat.traceback)[-80:]}' for stat in stats)
+                                  or 'Nothing grew.',
+                            inline=False)
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+    @app_commands.command(name="loglevel", description="Developer only, changes which log levels are written")
+    @app_commands.choices(level=[app_commands.Choice(name=level, value=level) for level in ('DEBUG', 'LOG', 'WARNING', 'ERROR')])
+    async def _loglevel(self, interaction: discord.Interaction, level: str) -> None:
+        if not self.__is_developer(interaction):
+            await interaction.response.send_message("This command is only available to the bot's developers.", ephemeral=True)
+            return
+
+        Log.set_level(level)
+        Utils.pront(f"Log level set to {level} by {interaction.user}", lvl="WARNING")
+        await interaction.response.send_message(f"Only logging {level} and above.", ephemeral=True)
+
+    @staticmethod
+    def __format_bytes(size: int) -> str:
+        """
+        Formats a number of bytes with the largest fitting unit, ie: 1.5 MiB.
+        """
+        for unit in ('B', 'KiB', 'MiB'):
+            if abs(size) < 1024:
+                return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+            size /= 1024
+        return f'{size:.1f} GiB'
+
+    @staticmethod
+    def __is_developer(interaction: discord.Interaction) -> bool:
+        """
+        Checks if the interaction.user is one of the bot's developers.
+
+        Parameters
+        ----------
+        interaction: `discord.Interaction`
+
+        Returns
+        -------
+        bool
+            Whether the interaction.user is listed in the developers .env key.
+        """
+        return str(interaction.user.id) in os.environ.get('developers', "").split(",")
+
+
+async def setup(bot):
+    Utils.pront("Cog Diagnostics loading...")
+    await bot.add_cog(Diagnostics(bot))
+    Utils.pront("Cog Diagnostics loaded!")
@@ -65,6 +65,7 @@ class GuildManagement(commands.Cog):
                 embed.add_field(name='Remove Orphaned Songs', value=f"Whether the bot should remove all the songs a user queued when they leave the VC. The current value is: `{bool(DB.GuildSettings.get(interaction.guild_id, 'remove_orphaned_songs'))}`")
                 embed.add_field(name='Allow Playlist', value=f"Whether the bot should allow users to queue playlists. The current value is: `{('No', 'Yes', 'DJ Only')[DB.GuildSettings.get(interaction.guild_id, 'allow_playlist')]}`")
                 embed.add_field(name='Leave Song Breadcrumbs', value=f"Whether the bot should leave breadcrumbs to previously played songs to be able trace back the queue. The current value is: `{bool(DB.GuildSettings.get(interaction.guild_id, 'song_breadcrumbs'))}`")
+                embed.add_field(name='Crossfade', value=f"How many seconds songs fade into each other for. The current value is: `{DB.GuildSettings.get(interaction.guild_id, 'crossfade') or 'Off'}`")
                 await interaction.response.send_message(ephemeral=True, embed=embed, view=Buttons.GuildSettingsView(interaction))
                 return
         await Utils.send(interaction, title='Insufficient permissions!', ephemeral=True)
@@ -4,6 +4,7 @@ from discord import app_commands
 
 import Utils
 from Servers import Servers
+from Song import Song
 
 class PlaybackManagement(commands.Cog):
     def __init__(self, bot: discord.Client):
@@ -46,12 +47,44 @@ class PlaybackManagement(commands.Cog):
                             content="You don't have the correct permissions to use this command!  Please refer to /help for more information.")
             return
         
+        # Seeking can repopulate the Song and wait on ffmpeg, longer than an interaction can go unanswered
+        await interaction.response.defer(thinking=True)
+        if not await player.seek(0):
+            await interaction.followup.send(embed=Utils.get_embed(interaction, title='Nothing to seek in!', content="The song hasn't started yet."), ephemeral=True)
+            return
+        await interaction.followup.send(embed=Utils.get_embed(interaction, title='⏪ Rewound'))
+
+    @app_commands.command(name="seek", description="Skips to a point in the current song, ie: 1:30 or 90")
+    async def _seek(self, interaction: discord.Interaction, timestamp: str) -> None:
+        if not await Utils.Pretests.playing_audio(interaction):
+            return
+
         player = Servers.get_player(interaction.guild_id)
-        # Just add it to the top of the queue and skip to it
-        # Dirty, but it works.
-        player.queue.add_at(player.song, 0)
-        player.vc.stop()
-        await Utils.send(interaction, title='⏪ Rewound')
+
+        if not Utils.Pretests.has_song_authority(interaction, player.song):
+            await Utils.send(interaction, title='Insufficient permissions!', 
+                            content="You don't have the correct permissions to use this command!  Please refer to /help for more information.")
+            return
+
+        if player.song.is_live:
+            await Utils.send(interaction, title="Can't seek in a livestream!", content="It always plays what is live right now.", ephemeral=True)
+            return
+
+        position = Song.parse_timestamp(timestamp)
+        if position is None:
+            await Utils.send(interaction, title='Invalid timestamp!', content="Use a timestamp like 1:30, 1m30s or 90.", ephemeral=True)
+            return
+        if player.song.duration and position >= player.song.duration:
+            await Utils.send(interaction, title='Invalid timestamp!',
+                             content=f"The song is only {Song.parse_duration_short_hand(player.song.duration)} long.", ephemeral=True)
+            return
+
+        # Seeking can repopulate the Song and wait on ffmpeg, longer than an interaction can go unanswered
+        await interaction.response.defer(thinking=True)
+        if not await player.seek(position):
+            await interaction.followup.send(embed=Utils.get_embed(interaction, title='Nothing to seek in!', content="The song hasn't started yet."), ephemeral=True)
+            return
+        await interaction.followup.send(embed=Utils.get_embed(interaction, title=f'⏩ Skipped to {Song.parse_duration_short_hand(int(position))}'))
 
     @app_commands.command(name="pause", description="Pauses the current song")
     async def _pause(self, interaction: discord.Interaction) -> None:
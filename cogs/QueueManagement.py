@@ -1,3 +1,4 @@
+import asyncio
 import discord
 import random
 from discord.ext import commands
@@ -11,7 +12,8 @@ from Servers import Servers
 from Song import Song
 from YTDLInterface import YTDLInterface
 from DB import DB
-from cogs import Update
+from LinkResolver import LinkResolver
+from Timings import PhaseTimer
 
 
 
@@ -21,67 +23,82 @@ class QueueManagement(commands.Cog):
 
     @app_commands.command(name="play", description="Plays a song from youtube(or other sources somtimes) in the voice channel you are in")
     async def _play(self, interaction: discord.Interaction, link: str, top: bool = False) -> None:
-        # checks if correct permissions are set
-        perm_check = await Utils.Pretests.check_perms(interaction)
-        if perm_check is not None:
-            await interaction.response.send_message(f"My install link was not set up correctly, I am missing: {perm_check}")
-            return
-        
-        # check if yt-dlp is out of date
-        if await Utils.Pretests.update_check():
-            await interaction.response.send_message("YT-DLP is out of date, please run /update.")
-            return
+        timer = PhaseTimer(f'/play in {interaction.guild_id}')
 
-        # Check if author is in VC
-        if interaction.user.voice is None:
-            await interaction.response.send_message('You are not in a voice channel', ephemeral=True)
-            return
+        with timer.phase('checks'):
+            # Check if author is in VC
+            if interaction.user.voice is None:
+                await interaction.response.send_message('You are not in a voice channel', ephemeral=True)
+                return
 
-        # Check if author is in the *right* vc if it applies
-        if interaction.guild.voice_client is not None and interaction.user.voice.channel != interaction.guild.voice_client.channel:
-            await interaction.response.send_message("You must be in the same voice channel in order to use MaBalls", ephemeral=True)
-            return
+            # Check if author is in the *right* vc if it applies
+            if interaction.guild.voice_client is not None and interaction.user.voice.channel != interaction.guild.voice_client.channel:
+                await interaction.response.send_message("You must be in the same voice channel in order to use MaBalls", ephemeral=True)
+                return
 
-        await interaction.response.defer(thinking=True)
+            # checks if correct permissions are set
+            perm_check = await Utils.Pretests.check_perms(interaction)
+            if perm_check is not None:
+                await interaction.response.send_message(f"My install link was not set up correctly, I am missing: {perm_check}")
+                return
 
-        # create song
-        scrape = await YTDLInterface.scrape_link(link)
-        song = Song(interaction, link, scrape)
+            if top and Servers.get_player(interaction.guild_id) is not None and not Utils.Pretests.has_discretionary_authority(interaction):
+                await interaction.response.send_message(embed=Utils.get_embed(interaction, title='Insufficient permissions!', 
+                            content="You don't have the correct permissions to use this command!  Please refer to /help for more information."))
+                return
 
-        # Check if song didn't initialize properly via scrape
-        if song.uploader is None:
-            # If it didn't, query the link instead (resolves searches in the link field)
-            query = await YTDLInterface.query_link(link)
-            song = Song(interaction, query.get('original_url'), query)
+        # Defer right away, everything after this can take a while
+        await timer.measure('defer', interaction.response.defer(thinking=True))
+
+        # None of these depend on each other so they run at the same time
+        update_task = asyncio.create_task(timer.measure('update check', Utils.Pretests.update_check()))
+        song_task = asyncio.create_task(timer.measure('extraction', self.__create_song(interaction, link)))
+        connect_task = None
+        if interaction.guild.voice_client is None:
+            connect_task = asyncio.create_task(timer.measure('voice connect', self.__connect(interaction)))
+        tasks = [task for task in (update_task, song_task, connect_task) if task is not None]
+
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception() is not None:
+                    raise task.exception()
+        except BaseException:
+            # If anything failed, don't leave the others running or the bot sitting in an empty VC
+            await self.__abort_play(interaction, tasks, connect_task)
+            raise
+        out_of_date, song = update_task.result(), song_task.result()
+
+        # check if yt-dlp is out of date
+        if out_of_date:
+            await self.__abort_play(interaction, tasks, connect_task)
+            await interaction.followup.send("YT-DLP is out of date, please run /update.")
+            return
 
         # Checks if valid link as been returned from query
         if "https://" not in song.original_url:
+            await self.__abort_play(interaction, tasks, connect_task)
             await interaction.followup.send(
                 embed=Utils.get_embed(interaction, title="No results found from search string!", content=":x:",
                                       progress=False))
             return
 
-        # If not in a VC, join
-        if interaction.guild.voice_client is None:
-            await interaction.user.voice.channel.connect(self_deaf=True)
-
-        # If player does not exist, create one.
-        if Servers.get_player(interaction.guild_id) is None:
-            Servers.add(interaction.guild_id, Player(
-                interaction.guild.voice_client, song))
-            position = 0
+        with timer.phase('enqueue'):
+            # If player does not exist, create one.
+            if Servers.get_player(interaction.guild_id) is None:
+                # The Player reports the rest of the timings once it starts playing the song
+                song.request_timer = timer
+                Servers.add(interaction.guild_id, Player(
+                    interaction.guild.voice_client, song))
+                position = 0
 
-        # If it does, add the song to queue
-        elif top:
-            if not Utils.Pretests.has_discretionary_authority(interaction):
-                await interaction.followup.send(embed=Utils.get_embed(interaction, title='Insufficient permissions!', 
-                            content="You don't have the correct permissions to use this command!  Please refer to /help for more information."))
-                return
-            Servers.get_player(interaction.guild_id).queue.add_at(song, 0)
-            position = 1
-        else:
-            Servers.get_player(interaction.guild_id).queue.add(song)
-            position = len(Servers.get_player(interaction.guild_id).queue.get())
+            # If it does, add the song to queue
+            elif top:
+                Servers.get_player(interaction.guild_id).queue.add_at(song, 0)
+                position = 1
+            else:
+                Servers.get_player(interaction.guild_id).queue.add(song)
+                position = len(Servers.get_player(interaction.guild_id).queue.get())
 
         embed = Utils.get_embed(
             interaction,
@@ -91,9 +108,77 @@ class QueueManagement(commands.Cog):
         )
         embed.add_field(name=song.uploader, value=song.title, inline=False)
         embed.add_field(name='Requested by:', value=song.requester.mention)
-        embed.add_field(name='Duration:', value=Song.parse_duration(song.duration))
+        embed.add_field(name='Duration:', value='🔴 Live' if song.is_live else Song.parse_duration(song.duration))
         embed.set_thumbnail(url=song.thumbnail)
-        await interaction.followup.send(embed=embed)
+        await timer.measure('respond', interaction.followup.send(embed=embed))
+
+        # Only report here if the Player isn't going to
+        if song.request_timer is None:
+            Utils.pront(timer.summary())
+
+    async def __create_song(self, interaction: discord.Interaction, link: str) -> Song:
+        """
+        Creates a Song from the link given to /play.
+
+        Parameters
+        ----------
+        interaction : `discord.Interaction`
+            The Interaction the Song is being created for.
+        link : `str`
+            The link or search query.
+
+        Returns
+        -------
+        Song
+            The created Song.
+        """
+        # One extraction, picked by what kind of link or query this is
+        data = await LinkResolver.resolve(link)
+        song = Song(interaction, data.get('original_url'), data)
+        # ie: a YouTube link shared from a timestamp
+        offset = Song.parse_link_offset(link)
+        if not song.duration or offset < song.duration:
+            song.start_offset = offset
+        return song
+
+    async def __connect(self, interaction: discord.Interaction) -> None:
+        """
+        Connects to the voice channel of the user who ran the command.
+
+        Parameters
+        ----------
+        interaction : `discord.Interaction`
+            The Interaction to get the user from.
+        """
+        try:
+            await interaction.user.voice.channel.connect(self_deaf=True)
+        # Another command connected while this one was waiting
+        except discord.ClientException:
+            if interaction.guild.voice_client is None:
+                raise
+
+    async def __abort_play(self, interaction: discord.Interaction, tasks: list[asyncio.Task], connect_task: asyncio.Task | None) -> None:
+        """
+        Cancels the remaining /play stages and leaves VC if /play joined it for nothing.
+
+        Parameters
+        ----------
+        interaction : `discord.Interaction`
+            The Interaction of the /play that is being aborted.
+        tasks : `list[asyncio.Task]`
+            Every stage that was started concurrently.
+        connect_task : `asyncio.Task` | `None`
+            The voice connection stage, if /play started one.
+        """
+        for task in tasks:
+            task.cancel()
+        # Wait for the cancellations to go through so nothing is left half done
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        if connect_task is None or Servers.get_player(interaction.guild_id) is not None:
+            return
+        if interaction.guild.voice_client is not None:
+            await interaction.guild.voice_client.disconnect()
 
     @app_commands.command(name="playlist", description="Adds a playlist to the queue")
     async def _playlist(self, interaction: discord.Interaction, link: str, shuffle: bool = False) -> None:
@@ -189,7 +274,9 @@ class QueueManagement(commands.Cog):
         await interaction.followup.send(embed=embed)
 
         # Once all is said and done, start the populator thread
-        Utils.populate_song_list(songs, interaction.guild_id)
+        player = Servers.get_player(interaction.guild_id)
+        if player is not None:
+            Utils.populate_song_list(songs, player)
 
     @app_commands.command(name="search", description="Searches YouTube for a given query")
     async def _search(self, interaction: discord.Interaction, query: str) -> None:
@@ -2,7 +2,6 @@ import os
 import subprocess
 
 import discord
-import requests
 from discord.ext import commands
 from discord import app_commands
 
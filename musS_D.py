@@ -1,8 +1,16 @@
+# Imported first so the startup timer also counts the time spent importing everything else
+from Timings import Startup
+
+import asyncio
+import hashlib
+import json
 import logging
+import time
 
 import discord
 import os
 import traceback
+import yarl
 from discord.ext import commands
 from dotenv import load_dotenv
 
@@ -13,10 +21,17 @@ import Buttons
 from Pages import Pages
 from Servers import Servers
 from DB import DB
-
-# imports for error type checking
-import yt_dlp
-# needed to add it to a var bc of pylint on my laptop but i delete it right after
+from YTDLInterface import YTDLInterface
+import ExtractorBackends
+from LoopMonitor import BlockDetector, LagSampler
+from MemoryStats import LeakTracker, MemoryStats
+from Metrics import Metrics
+from ProcStats import ProcStats
+from Tracing import Tracer
+from Log import Log
+
+# yt-dlp is not imported here, YTDLInterface defers it until the first extraction
+Startup.timer.record('imports', Startup.timer.elapsed())
 
 handler = logging.FileHandler(filename='recent.log', encoding='utf-8', mode='w')
 
@@ -46,6 +61,30 @@ del XX
 load_dotenv()  # getting the key from the .env file
 key = os.environ.get('key')
 
+# Logs are written by a background thread, only the level check and queueing happen where pront is called
+Log.configure(os.environ.get('log_level'), os.environ.get('log_file'),
+              int(os.environ.get('log_max_bytes', 10_000_000)), int(os.environ.get('log_backups', 5)))
+
+# Point the bot at a different Discord, ie: the mock in benchmarks/mock_discord.py
+if os.environ.get('discord_api_url'):
+    discord.http.Route.BASE = os.environ.get('discord_api_url').rstrip('/') + f'/api/v{discord.http.INTERNAL_API_VERSION}'
+if os.environ.get('discord_gateway_url'):
+    discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(os.environ.get('discord_gateway_url'))
+
+# Where the hash of the last synced command tree is kept between restarts
+TREE_HASH_FILE = 'tree_hash.json'
+
+
+class Tree(discord.app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # Name the task running the command so the BlockDetector can tell who blocked the loop
+        task = asyncio.current_task()
+        if task is not None and interaction.command is not None:
+            task.set_name(f'/{interaction.command.qualified_name} in {interaction.guild_id}')
+        # Everything the command does from here on is part of its trace
+        Tracer.start_trace(interaction.id)
+        return True
+
 
 class Bot(commands.Bot):  # initiates the bots intents and on_ready event
     def __init__(self):
@@ -53,42 +92,167 @@ class Bot(commands.Bot):  # initiates the bots intents and on_ready event
         intents.members = True
         intents.message_content = True
 
-        super().__init__(command_prefix="​", intents=intents)
+        super().__init__(command_prefix="​", intents=intents, tree_cls=Tree)
+
+        # on_ready can fire again after a reconnect, only sync once per process
+        self.tree_synced = False
+        self.warm_up_task = None
+        # Feeds the event loop lag metric, started in setup_hook
+        self.lag_sampler = LagSampler(on_sample=lambda lag: Metrics.loop_lag_seconds.observe(value=lag))
+        # Records what blocked the loop, only if block_threshold is set
+        self.block_detector = BlockDetector(float(os.environ.get('block_threshold'))) if os.environ.get('block_threshold') else None
+
+    async def login(self, token: str) -> None:
+        # setup_hook runs inside of login, its phases are subtracted from this one
+        with Startup.phase('login'):
+            await super().login(token)
 
     async def setup_hook(self):
         #adding cogs
-        if os.environ.get('enable_GuildManagement') == "true":
-            await self.load_extension("cogs.GuildManagement")
-        if os.environ.get('enable_QueueManagement') == "true":
-            await self.load_extension("cogs.QueueManagement")
-        if os.environ.get('enable_PlaybackManagement') == "true":
-            await self.load_extension("cogs.PlaybackManagement")
-        if os.environ.get('enable_PlayerManagement') == "true":
-            await self.load_extension("cogs.PlayerManagement")
-        if os.environ.get('enable_Update') == "true":
-            await self.load_extension("cogs.Update")
-        # await self.load_extension("cogs.DebugCog")
+        with Startup.phase('cog load'):
+            if os.environ.get('enable_GuildManagement') == "true":
+                await self.load_extension("cogs.GuildManagement")
+            if os.environ.get('enable_QueueManagement') == "true":
+                await self.load_extension("cogs.QueueManagement")
+            if os.environ.get('enable_PlaybackManagement') == "true":
+                await self.load_extension("cogs.PlaybackManagement")
+            if os.environ.get('enable_PlayerManagement') == "true":
+                await self.load_extension("cogs.PlayerManagement")
+            if os.environ.get('enable_Update') == "true":
+                await self.load_extension("cogs.Update")
+            if os.environ.get('enable_Diagnostics') == "true":
+                await self.load_extension("cogs.Diagnostics")
+            # await self.load_extension("cogs.DebugCog")
         Utils.pront("Cogs loaded!")
 
         # Database loading
         Utils.pront("Attempting to locate or create database")
-        DB.create_tables()
-        
+        with Startup.phase('DB init'):
+            DB.create_tables()
+
+        # Extractor backend selection, live yt-dlp unless recording or replaying fixtures
+        backend = os.environ.get('extractor_backend', 'live')
+        if backend != 'live':
+            Utils.pront(f"Using the {backend} extractor backend", lvl="WARNING")
+            YTDLInterface.set_backend(ExtractorBackends.create_backend(
+                backend,
+                fixture_dir=os.environ.get('extractor_fixtures', 'fixtures'),
+                latency=float(os.environ.get('replay_latency', 0)),
+                error_rate=float(os.environ.get('replay_error_rate', 0))))
+
+        # Prime yt-dlp in the background so the first /play doesn't pay for it
+        if backend == 'live' and os.environ.get('enable_warmup') == "true":
+            Utils.pront("Warming up yt-dlp in the background")
+            warm_up_link = os.environ.get('warmup_link')
+            self.warm_up_task = asyncio.create_task(YTDLInterface.warm_up(warm_up_link) if warm_up_link else YTDLInterface.warm_up())
+
+        if os.environ.get('trace_file'):
+            Tracer.configure(os.environ.get('trace_file'))
+            Utils.pront(f"Writing traces to {os.environ.get('trace_file')}", lvl="OKCYAN")
+
+        # Metrics, the gauges are computed from the bot's own state whenever they are scraped
+        Metrics.active_players.set_function(lambda: len(Servers.dict))
+        Metrics.queued_songs.set_function(lambda: sum(len(player.queue) for player in list(Servers.dict.values())))
+        Metrics.ffmpeg_processes.set_function(lambda: sum(ProcStats.name(pid) == 'ffmpeg' for pid in ProcStats.children()))
+        Metrics.memory_bytes.set_function(lambda: {(subsystem,): size for subsystem, size in
+                                                   MemoryStats.totals(self, list(Servers.dict.values())).items()} | {('process_rss',): ProcStats.rss_bytes() or 0})
+        Metrics.guild_tasks.set_function(self.guild_task_counts)
+        # Per guild, sampled by every Player's watchdog
+        Metrics.ffmpeg_cpu_percent.set_function(lambda: {(str(guild),): player.audio.cpu_percent for guild, player in list(Servers.dict.items())
+                                                         if player.audio is not None and player.audio.cpu_percent is not None})
+        Metrics.ffmpeg_rss_bytes.set_function(lambda: {(str(guild),): player.audio.rss_bytes for guild, player in list(Servers.dict.items())
+                                                       if player.audio is not None and player.audio.rss_bytes is not None})
+        Metrics.ffmpeg_read_age_seconds.set_function(lambda: {(str(guild),): time.monotonic() - player.audio.last_read
+                                                              for guild, player in list(Servers.dict.items()) if player.audio is not None})
+        self.lag_sampler.start()
+        LeakTracker.start(float(os.environ.get('leak_check_interval', 60)), float(os.environ.get('leak_grace', 60)))
+        if self.block_detector is not None:
+            self.block_detector.start()
+            Utils.pront(f"Recording event loop blocks over {self.block_detector.threshold * 1000:.0f}ms", lvl="OKCYAN")
+        if os.environ.get('metrics_port'):
+            host = os.environ.get('metrics_host', '127.0.0.1')
+            await Metrics.start_server(host, int(os.environ.get('metrics_port')))
+            Utils.pront(f"Serving metrics at http://{host}:{os.environ.get('metrics_port')}/metrics", lvl="OKCYAN")
+
+
+    def guild_task_counts(self) -> dict[tuple[str], int]:
+        """
+        How many background tasks every Player is running combined, by kind.
+
+        Returns
+        -------
+        dict[tuple[str], int]
+            (kind,) to the number of tasks, as the guild_tasks gauge wants it.
+        """
+        totals = {}
+        for player in list(Servers.dict.values()):
+            for kind, count in player.tasks.counts().items():
+                totals[(kind,)] = totals.get((kind,), 0) + count
+        return totals
+
+    def get_tree_hash(self) -> str:
+        """
+        Computes a stable hash of the payloads of every registered global app command.
+
+        Returns
+        -------
+        str
+            The hex digest of the command payloads, salted with the application id.
+        """
+        payload = sorted((command.to_dict(self.tree) for command in self.tree.get_commands()), key=lambda c: (c.get('type', 1), c['name']))
+        dump = json.dumps({'application_id': self.application_id, 'commands': payload}, sort_keys=True, default=str)
+        return hashlib.sha256(dump.encode('utf-8')).hexdigest()
+
+    async def sync_tree(self) -> None:
+        """
+        Syncs the command tree with Discord only if the registered commands changed since the last sync.
+
+        Setting `force_tree_sync` to true in the .env file always syncs.
+        """
+        tree_hash = self.get_tree_hash()
+        try:
+            with open(TREE_HASH_FILE, 'r', encoding='utf-8') as file:
+                last_sync = json.load(file)
+        except (OSError, ValueError):
+            last_sync = {}
+
+        if os.environ.get('force_tree_sync') != "true" and last_sync.get('hash') == tree_hash:
+            Metrics.cache_lookups.inc('command_tree', 'hit')
+            Utils.pront(f"Command tree unchanged, skipped sync (saved ~{last_sync.get('sync_seconds', 0):.2f}s)", lvl="OKCYAN")
+            return
+
+        Metrics.cache_lookups.inc('command_tree', 'miss')
+        Utils.pront("Syncing tree")
+        start = time.perf_counter()
+        await self.tree.sync()
+        sync_seconds = time.perf_counter() - start
+        Utils.pront(f"Tree synced in {sync_seconds:.2f}s!")
+
+        try:
+            with open(TREE_HASH_FILE, 'w', encoding='utf-8') as file:
+                json.dump({'hash': tree_hash, 'sync_seconds': sync_seconds}, file)
+        except OSError as e:
+            Utils.pront(f"Unable to save the command tree hash ({e})", lvl="WARNING")
 
     async def on_ready(self):
+        # Everything between login and the first on_ready is spent connecting to the gateway
+        if not Startup.finished:
+            Startup.timer.record('gateway', Startup.timer.elapsed() - sum(Startup.timer.phases.values()))
 
         # Command syncing
-        Utils.pront("Syncing tree")
-        await self.tree.sync()
-        Utils.pront("Tree synced!")
-
-        # Fixing column values
-        Utils.pront("Fixing column values if needed")
-        DB.fix_column_values()
-        
-        # Adding existing servers to database
-        Utils.pront("Adding servers to database if any are missing")
-        DB.initalize_servers_in_DB(bot.guilds)
+        if not self.tree_synced:
+            with Startup.phase('tree sync'):
+                await self.sync_tree()
+            self.tree_synced = True
+
+        with Startup.phase('guild init'):
+            # Fixing column values
+            Utils.pront("Fixing column values if needed")
+            DB.fix_column_values()
+            
+            # Adding existing servers to database
+            Utils.pront("Adding servers to database if any are missing")
+            DB.initalize_servers_in_DB(bot.guilds)
 
         # Setting status
         Utils.pront("Setting bot status")
@@ -96,25 +260,40 @@ class Bot(commands.Bot):  # initiates the bots intents and on_ready event
             type=discord.ActivityType.watching, name=f"you in {len(bot.guilds):,} servers."))
         
         Utils.pront("Bot is ready", lvl="OKGREEN")
+        if not Startup.finished:
+            Utils.pront(Startup.finish().summary(), lvl="OKCYAN")
         stringBuilder = ""
         for i in self.guilds:
             stringBuilder += str(i.name) + "\n"
         print(stringBuilder)
 
+    async def on_app_command_completion(self, interaction: discord.Interaction, command: discord.app_commands.Command) -> None:
+        Metrics.command_seconds.observe(command.qualified_name, 'ok', value=command_seconds(interaction))
+        Tracer.record_root(f'/{command.qualified_name}', interaction.id, interaction.created_at.timestamp(), time.time(), guild_id=interaction.guild_id)
+
     async def on_resumed(self):
         Utils.pront("Updating bot status")
         await self.change_presence(activity=discord.Activity(
             type=discord.ActivityType.watching, name=f"you in {len(bot.guilds):,} servers."))
 
+def command_seconds(interaction: discord.Interaction) -> float:
+    """
+    The seconds since Discord created an interaction, which includes the time it took to reach the bot.
+    """
+    return max(0.0, (discord.utils.utcnow() - interaction.created_at).total_seconds())
+
 # Initialize bot object
 bot = Bot()
 
 # Custom error handler
 @bot.tree.error
 async def on_tree_error(interaction: discord.Interaction, error: discord.app_commands.AppCommandError):
+    command = interaction.command.qualified_name if interaction.command is not None else 'unknown'
+    Metrics.command_seconds.observe(command, 'error', value=command_seconds(interaction))
+    Tracer.record_root(f'/{command}', interaction.id, interaction.created_at.timestamp(), time.time(), error, guild_id=interaction.guild_id)
 
     # If a yt_dlp DownloadError was raised
-    if isinstance(error.original, yt_dlp.utils.DownloadError):
+    if YTDLInterface.is_dlp_error(error.original, 'DownloadError'):
         await interaction.followup.send(embed=Utils.get_embed(interaction, "An error occurred while trying to parse the link.",
                                                               content=f'```ansi\n{error.original.exc_info[1]}```'))
         # Return here because we don't want to print an obvious error like this.